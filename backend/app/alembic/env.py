@@ -29,6 +29,31 @@ target_metadata = SQLModel.metadata
 # ... etc.
 
 
+# Postgres-only indexes (GIN, trigram, expression) that live only in migrations:
+# 7b1e4d9a2c55 full-text search, c5a8e2f71d09 user name trigrams, 3f9a1c6e2d84 extra_data
+MIGRATION_ONLY_INDEXES = {
+    "ix_item_search_vector",
+    "ix_community_search_vector",
+    "ix_item_title_trgm",
+    "ix_community_name_trgm",
+    "ix_user_full_name_trgm",
+    "ix_userprofile_alias_trgm",
+    "ix_item_extra_data",
+    "ix_item_extra_data_category",
+    "ix_item_extra_data_genre",
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Generated search columns live only in migrations (see 7b1e4d9a2c55)
+    if type_ == "column" and reflected and name == "search_vector":
+        return False
+    # Otherwise autogenerate would emit drop_index for them
+    if type_ == "index" and reflected and name in MIGRATION_ONLY_INDEXES:
+        return False
+    return True
+
+
 def get_url():
     return str(settings.SQLALCHEMY_DATABASE_URI)
 
@@ -47,7 +72,11 @@ def run_migrations_offline():
     """
     url = get_url()
     context.configure(
-        url=url, target_metadata=target_metadata, literal_binds=True, compare_type=True
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        compare_type=True,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -71,7 +100,10 @@ def run_migrations_online():
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata, compare_type=True
+            connection=connection,
+            target_metadata=target_metadata,
+            compare_type=True,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,48 @@
+"""extra_data jsonb and indexes
+
+Revision ID: 3f9a1c6e2d84
+Revises: c0419d49bb02
+Create Date: 2026-10-16 10:02:17.530412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c6e2d84'
+down_revision = 'c0419d49bb02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The json default cannot be cast in place, so swap it around the type change
+    op.alter_column('item', 'extra_data', server_default=None)
+    op.alter_column('item', 'extra_data',
+               existing_type=postgresql.JSON(astext_type=sa.Text()),
+               type_=postgresql.JSONB(astext_type=sa.Text()),
+               existing_nullable=True,
+               postgresql_using='extra_data::jsonb')
+    op.alter_column('item', 'extra_data', server_default=sa.text("'{}'::jsonb"))
+
+    # Containment filters (filter[extra.<key>]=...) use the GIN index,
+    # the category / genre filters use the expression indexes
+    op.create_index('ix_item_extra_data', 'item', ['extra_data'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'extra_data': 'jsonb_path_ops'})
+    op.create_index('ix_item_extra_data_category', 'item', [sa.text("(extra_data ->> 'category')")], unique=False)
+    op.create_index('ix_item_extra_data_genre', 'item', [sa.text("(extra_data ->> 'genre')")], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_item_extra_data_genre', table_name='item')
+    op.drop_index('ix_item_extra_data_category', table_name='item')
+    op.drop_index('ix_item_extra_data', table_name='item')
+    op.alter_column('item', 'extra_data', server_default=None)
+    op.alter_column('item', 'extra_data',
+               existing_type=postgresql.JSONB(astext_type=sa.Text()),
+               type_=postgresql.JSON(astext_type=sa.Text()),
+               existing_nullable=True,
+               postgresql_using='extra_data::json')
+    op.alter_column('item', 'extra_data', server_default=sa.text("'{}'::json"))
@@ -0,0 +1,53 @@
+"""postgres full text search
+
+Revision ID: 7b1e4d9a2c55
+Revises: e3b9f6d1c470
+Create Date: 2026-10-16 18:40:09.113627
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7b1e4d9a2c55'
+down_revision = 'e3b9f6d1c470'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Generated, weighted tsvectors for the postgres search backend (app/search_backends.py).
+    # They are not on the models, env.py keeps autogenerate from dropping them.
+    op.execute(
+        "ALTER TABLE item ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+        ") STORED"
+    )
+    op.execute(
+        "ALTER TABLE community ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+        ") STORED"
+    )
+    op.create_index('ix_item_search_vector', 'item', ['search_vector'], unique=False,
+                    postgresql_using='gin')
+    op.create_index('ix_community_search_vector', 'community', ['search_vector'], unique=False,
+                    postgresql_using='gin')
+    # Fuzzy matches (title % q) and similarity() ranking
+    op.create_index('ix_item_title_trgm', 'item', ['title'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index('ix_community_name_trgm', 'community', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_community_name_trgm', table_name='community')
+    op.drop_index('ix_item_title_trgm', table_name='item')
+    op.drop_index('ix_community_search_vector', table_name='community')
+    op.drop_index('ix_item_search_vector', table_name='item')
+    op.drop_column('community', 'search_vector')
+    op.drop_column('item', 'search_vector')
@@ -0,0 +1,165 @@
+"""add item dedup keys
+
+Revision ID: 9d2e7b4c1a63
+Revises: 3f9a1c6e2d84
+Create Date: 2026-10-16 11:24:51.208733
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '9d2e7b4c1a63'
+down_revision = '3f9a1c6e2d84'
+branch_labels = None
+depends_on = None
+
+
+# Frozen copies of app.models.normalize_title / normalize_isbn and app.dedup as of
+# this revision: the migration must keep working whatever the application becomes.
+def normalize_title(title):
+    return " ".join(title.split()).lower()
+
+
+def normalize_isbn(value):
+    if not value:
+        return None
+    digits = re.sub(r"[^0-9X]", "", str(value).upper())
+    if len(digits) == 10 and digits[:9].isdigit():
+        digits = "978" + digits[:9]
+        total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits))
+        return digits + str((10 - total % 10) % 10)
+    if len(digits) == 13 and digits.isdigit():
+        return digits
+    return None
+
+
+def find_duplicate_groups(bind):
+    rows = bind.execute(sa.text("""
+        SELECT id, item_type, normalized_title, isbn FROM item
+        WHERE (item_type, normalized_title) IN (
+                SELECT item_type, normalized_title FROM item
+                GROUP BY item_type, normalized_title HAVING count(*) > 1)
+           OR (item_type, isbn) IN (
+                SELECT item_type, isbn FROM item WHERE isbn IS NOT NULL
+                GROUP BY item_type, isbn HAVING count(*) > 1)
+        ORDER BY created_at, id
+    """)).all()
+
+    # Union-find over the two keys; each group lists ids oldest first
+    parent = {}
+
+    def root(item_id):
+        while parent[item_id] != item_id:
+            parent[item_id] = parent[parent[item_id]]
+            item_id = parent[item_id]
+        return item_id
+
+    first_with_key = {}
+    for item_id, item_type, normalized_title, isbn in rows:
+        parent[item_id] = item_id
+        keys = [(item_type, "title", normalized_title)]
+        if isbn:
+            keys.append((item_type, "isbn", isbn))
+        for key in keys:
+            a, b = root(first_with_key.setdefault(key, item_id)), root(item_id)
+            if a != b:
+                parent[b] = a
+
+    groups = {}
+    for item_id, *_ in rows:
+        groups.setdefault(root(item_id), []).append(item_id)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+# Link tables keyed by (other side, item_id): rows move to the kept item
+# unless it already has the same link
+LINKS = (
+    ("useritem", "user_id"),
+    ("communityitem", "community_id"),
+    ("collectionitem", "collection_id"),
+    ("feeditem", "viewer_id"),
+)
+ITEM_FIELDS = "description, author, image_url, extra_data, count, created_at"
+EXTRA_DATA = postgresql.JSONB().with_variant(sa.JSON(), "sqlite")
+
+
+def merge_items(bind, keep_id, duplicate_id):
+    ids = {"keep": keep_id, "duplicate": duplicate_id}
+    fetch = sa.text(f"SELECT {ITEM_FIELDS} FROM item WHERE id = :id").columns(extra_data=EXTRA_DATA)
+    keep = bind.execute(fetch, {"id": keep_id}).one()
+    duplicate = bind.execute(fetch, {"id": duplicate_id}).one()
+
+    # Owners of both copies only count once
+    shared_owners = bind.execute(sa.text("""
+        SELECT count(*) FROM useritem
+        WHERE item_id = :duplicate
+          AND user_id IN (SELECT user_id FROM useritem WHERE item_id = :keep)
+    """), ids).scalar_one()
+
+    for table, other in LINKS:
+        feed_date = ", created_at = :created_at" if table == "feeditem" else ""
+        bind.execute(sa.text(f"""
+            UPDATE {table} SET item_id = :keep{feed_date}
+            WHERE item_id = :duplicate
+              AND {other} NOT IN (SELECT {other} FROM {table} WHERE item_id = :keep)
+        """), {**ids, "created_at": keep.created_at})
+        bind.execute(sa.text(f"DELETE FROM {table} WHERE item_id = :duplicate"), ids)
+    bind.execute(sa.text("UPDATE loan SET item_id = :keep WHERE item_id = :duplicate"), ids)
+    bind.execute(sa.text("DELETE FROM item WHERE id = :duplicate"), ids)
+
+    extra_data = {**(duplicate.extra_data or {}), **(keep.extra_data or {})}
+    bind.execute(
+        sa.text("""
+            UPDATE item SET description = :description, author = :author, image_url = :image_url,
+                extra_data = :extra_data, isbn = :isbn, count = :count
+            WHERE id = :keep
+        """).bindparams(sa.bindparam("extra_data", type_=EXTRA_DATA)),
+        {
+            "keep": keep_id,
+            "description": keep.description or duplicate.description,
+            "author": keep.author or duplicate.author,
+            "image_url": keep.image_url or duplicate.image_url,
+            "extra_data": extra_data,
+            "isbn": normalize_isbn(extra_data.get("isbn")),
+            "count": keep.count + duplicate.count - shared_owners,
+        },
+    )
+
+
+def upgrade():
+    op.add_column('item', sa.Column('normalized_title', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=True))
+    op.add_column('item', sa.Column('isbn', sqlmodel.sql.sqltypes.AutoString(length=13), nullable=True))
+
+    # Backfill with the same normalization the application applies on write
+    bind = op.get_bind()
+    rows = bind.execute(sa.text("SELECT id, title, extra_data ->> 'isbn' FROM item")).all()
+    if rows:
+        bind.execute(
+            sa.text("UPDATE item SET normalized_title = :normalized_title, isbn = :isbn WHERE id = :id"),
+            [
+                {"id": id, "normalized_title": normalize_title(title), "isbn": normalize_isbn(isbn)}
+                for id, title, isbn in rows
+            ],
+        )
+
+    # Existing duplicates have to go before the unique indexes can be built
+    for keep_id, *duplicate_ids in find_duplicate_groups(bind):
+        for duplicate_id in duplicate_ids:
+            merge_items(bind, keep_id, duplicate_id)
+
+    op.alter_column('item', 'normalized_title', existing_type=sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False)
+    op.create_index('ix_item_item_type_normalized_title', 'item', ['item_type', 'normalized_title'], unique=True)
+    op.create_index('ix_item_item_type_isbn', 'item', ['item_type', 'isbn'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_item_item_type_isbn', table_name='item')
+    op.drop_index('ix_item_item_type_normalized_title', table_name='item')
+    op.drop_column('item', 'isbn')
+    op.drop_column('item', 'normalized_title')
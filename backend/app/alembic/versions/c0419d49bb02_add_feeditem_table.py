@@ -0,0 +1,53 @@
+"""add feeditem table
+
+Revision ID: c0419d49bb02
+Revises: 7b85b87802aa
+Create Date: 2026-10-16 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+
+
+# revision identifiers, used by Alembic.
+revision = 'c0419d49bb02'
+down_revision = '7b85b87802aa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('feeditem',
+    sa.Column('viewer_id', sa.Uuid(), nullable=False),
+    sa.Column('item_id', sa.Uuid(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['item.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['viewer_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('viewer_id', 'item_id')
+    )
+    op.create_index('ix_feeditem_viewer_id_created_at', 'feeditem', ['viewer_id', 'created_at', 'item_id'], unique=False)
+
+    # Backfill: own items plus items of accepted friends (in either direction)
+    op.execute("""
+        INSERT INTO feeditem (viewer_id, item_id, created_at)
+        SELECT pairs.viewer_id, pairs.item_id, item.created_at
+        FROM (
+            SELECT useritem.user_id AS viewer_id, useritem.item_id
+            FROM useritem
+            UNION
+            SELECT friendship.user_id, useritem.item_id
+            FROM friendship JOIN useritem ON useritem.user_id = friendship.friend_id
+            WHERE friendship.status = 'ACCEPTED'
+            UNION
+            SELECT friendship.friend_id, useritem.item_id
+            FROM friendship JOIN useritem ON useritem.user_id = friendship.user_id
+            WHERE friendship.status = 'ACCEPTED'
+        ) AS pairs
+        JOIN item ON item.id = pairs.item_id
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_feeditem_viewer_id_created_at', table_name='feeditem')
+    op.drop_table('feeditem')
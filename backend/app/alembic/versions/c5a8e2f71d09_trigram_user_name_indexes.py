@@ -0,0 +1,29 @@
+"""trigram user name indexes
+
+Revision ID: c5a8e2f71d09
+Revises: 7b1e4d9a2c55
+Create Date: 2026-10-16 19:22:51.608314
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a8e2f71d09'
+down_revision = '7b1e4d9a2c55'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # User search inside the globe: ILIKE '%q%', similarity (%) and similarity() ranking
+    op.create_index('ix_user_full_name_trgm', 'user', ['full_name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'})
+    op.create_index('ix_userprofile_alias_trgm', 'userprofile', ['alias'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'alias': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_userprofile_alias_trgm', table_name='userprofile')
+    op.drop_index('ix_user_full_name_trgm', table_name='user')
@@ -0,0 +1,28 @@
+"""reindex items with sort fields
+
+Revision ID: d8f3a6b2e914
+Revises: c5a8e2f71d09
+Create Date: 2026-10-16 20:05:37.284190
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f3a6b2e914'
+down_revision = 'c5a8e2f71d09'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Item documents gained created_at / available, which search filters and
+    # sorts on: queue every item so the outbox worker rewrites its document
+    op.execute(
+        "INSERT INTO searchoutbox (index_name, document_id, attempts) "
+        "SELECT 'items', id, 0 FROM item"
+    )
+
+
+def downgrade():
+    pass
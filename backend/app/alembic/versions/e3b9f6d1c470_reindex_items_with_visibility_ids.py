@@ -0,0 +1,28 @@
+"""reindex items with visibility ids
+
+Revision ID: e3b9f6d1c470
+Revises: a4d7c2e9f815
+Create Date: 2026-10-16 17:12:44.902518
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3b9f6d1c470'
+down_revision = 'a4d7c2e9f815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Item documents gained owner_ids / community_ids, which search filters on:
+    # queue every item so the outbox worker rewrites its document
+    op.execute(
+        "INSERT INTO searchoutbox (index_name, document_id, attempts) "
+        "SELECT 'items', id, 0 FROM item"
+    )
+
+
+def downgrade():
+    pass
@@ -0,0 +1,28 @@
+"""reindex items with facets
+
+Revision ID: f1c7b3e8a526
+Revises: d8f3a6b2e914
+Create Date: 2026-10-17 09:14:26.551873
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7b3e8a526'
+down_revision = 'd8f3a6b2e914'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Item documents gained the category / genre facets: queue every item so
+    # the outbox worker rewrites its document
+    op.execute(
+        "INSERT INTO searchoutbox (index_name, document_id, attempts) "
+        "SELECT 'items', id, 0 FROM item"
+    )
+
+
+def downgrade():
+    pass
@@ -0,0 +1,191 @@
+import hashlib
+import uuid
+from collections.abc import Callable
+from datetime import datetime
+
+from fastapi import HTTPException, Request
+from sqlalchemy import Select, union_all
+from sqlmodel import Session, col, func, select
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.api.deps import CurrentUser, SessionDep
+from app.models import (
+    Collection,
+    CollectionItem,
+    Community,
+    CommunityItem,
+    CommunityMember,
+    Item,
+    User,
+    UserItem,
+)
+
+# Builds a statement returning the latest updated_at among the rows a response
+# is serialized from, or NULL when the resource does not exist
+VersionQuery = Callable[[uuid.UUID], Select]
+# Whether the user may read the resource; routes that restrict reads pass the
+# same check so that a 304 never answers for a resource the caller cannot see
+ReadCheck = Callable[[Session, User, uuid.UUID], bool]
+
+
+def _latest(*statements: Select) -> Select:
+    versions = union_all(*statements).subquery()
+    return select(func.max(versions.c.updated_at))
+
+
+def _items_versions(item_ids) -> tuple[Select, ...]:
+    # Items embed their owners and communities
+    return (
+        select(Item.updated_at.label("updated_at")).where(col(Item.id).in_(item_ids)),
+        select(User.updated_at)
+        .join(UserItem, col(UserItem.user_id) == User.id)
+        .where(col(UserItem.item_id).in_(item_ids)),
+        select(Community.updated_at)
+        .join(CommunityItem, col(CommunityItem.community_id) == Community.id)
+        .where(col(CommunityItem.item_id).in_(item_ids)),
+    )
+
+
+def item_version(id: uuid.UUID) -> Select:
+    return _latest(*_items_versions([id]))
+
+
+def collection_version(id: uuid.UUID) -> Select:
+    item_ids = select(CollectionItem.item_id).where(CollectionItem.collection_id == id)
+    return _latest(
+        select(Collection.updated_at.label("updated_at")).where(Collection.id == id),
+        *_items_versions(item_ids),
+    )
+
+
+def community_version(id: uuid.UUID) -> Select:
+    return _latest(select(Community.updated_at.label("updated_at")).where(Community.id == id))
+
+
+def user_version(id: uuid.UUID) -> Select:
+    # Users embed the communities they belong to
+    return _latest(
+        select(User.updated_at.label("updated_at")).where(User.id == id),
+        select(Community.updated_at)
+        .join(CommunityMember, col(CommunityMember.community_id) == Community.id)
+        .where(CommunityMember.user_id == id),
+    )
+
+
+def weak_etag(*parts: object) -> str:
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored
+    return any(
+        candidate.strip().removeprefix("W/") == etag.removeprefix("W/")
+        for candidate in if_none_match.split(",")
+    )
+
+
+def _check_etag(request: Request, version: datetime | None) -> None:
+    if version is None:
+        # Missing resource: let the route answer
+        return
+    # Responses can depend on the caller (roles, friendship status), so the
+    # credentials are part of the tag
+    etag = weak_etag(request.url.path, version.isoformat(), request.headers.get("authorization"))
+    request.state.etag = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+
+
+def conditional_get(
+    version: VersionQuery, param: str = "id", can_read: ReadCheck | None = None
+) -> Callable[..., None]:
+    """
+    Route dependency answering 304 Not Modified before the route runs when the
+    client's If-None-Match still matches the resource named by path parameter `param`.
+    The caller must be authenticated and, with `can_read`, allowed to read the
+    resource; otherwise the route answers as usual.
+    """
+
+    def dependency(request: Request, session: SessionDep, current_user: CurrentUser) -> None:
+        try:
+            resource_id = uuid.UUID(request.path_params[param])
+        except ValueError:
+            return
+        if can_read is not None and not can_read(session, current_user, resource_id):
+            return
+        _check_etag(request, session.exec(version(resource_id)).one())
+
+    return dependency
+
+
+def conditional_get_current_user(request: Request, session: SessionDep, current_user: CurrentUser) -> None:
+    """
+    conditional_get for routes serializing the current user.
+    """
+    _check_etag(request, session.exec(user_version(current_user.id)).one())
+
+
+class ETagMiddleware:
+    """
+    Adds an ETag to successful GET responses: the version-derived one set by
+    conditional_get, or else a hash of the JSON body (list pages). A body hash
+    matching If-None-Match is replaced by an empty 304.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start: Message | None = None
+        chunks: list[bytes] = []
+
+        async def send_with_etag(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=list(message.get("headers", [])))
+                message["headers"] = headers.raw
+                etag = scope.get("state", {}).get("etag")
+                if message["status"] == 200 and etag and "etag" not in headers:
+                    headers["ETag"] = etag
+                if (
+                    message["status"] == 200
+                    and "etag" not in headers
+                    and headers.get("content-type", "").startswith("application/json")
+                ):
+                    # Hold the response until the whole body is known
+                    start = message
+                    return
+                await send(message)
+                return
+
+            if start is None:
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+            if etag_matches(if_none_match, etag):
+                await send({"type": "http.response.start", "status": 304, "headers": [(b"etag", etag.encode())]})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            headers = MutableHeaders(raw=start["headers"])
+            headers["ETag"] = etag
+            start["headers"] = headers.raw
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_with_etag)
@@ -0,0 +1,55 @@
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.strategy_options import _AbstractLoad
+
+from app.models import (
+    Collection,
+    CollectionPublic,
+    CommunityAnnouncement,
+    CommunityAnnouncementPublic,
+    CommunityMessage,
+    CommunityMessagePublic,
+    Item,
+    ItemPublic,
+    Loan,
+    LoanPublic,
+    User,
+    UserPublic,
+)
+
+# Relationships each response model reads while being serialized. Routes
+# returning ORM rows as one of these models add the matching options to their
+# query so a page costs a fixed number of statements instead of one per row:
+# selectinload for collections, joinedload for many-to-one.
+USER_PUBLIC_LOADERS: tuple[_AbstractLoad, ...] = (
+    selectinload(User.communities),
+    selectinload(User.interests),
+    selectinload(User.profile),
+)
+
+ITEM_PUBLIC_LOADERS: tuple[_AbstractLoad, ...] = (
+    selectinload(Item.owners),
+    selectinload(Item.communities),
+)
+
+LOADER_POLICIES: dict[type, tuple[_AbstractLoad, ...]] = {
+    UserPublic: USER_PUBLIC_LOADERS,
+    ItemPublic: ITEM_PUBLIC_LOADERS,
+    LoanPublic: (
+        joinedload(Loan.item).options(*ITEM_PUBLIC_LOADERS),
+        joinedload(Loan.owner).options(*USER_PUBLIC_LOADERS),
+        joinedload(Loan.requester).options(*USER_PUBLIC_LOADERS),
+        joinedload(Loan.community),
+    ),
+    CollectionPublic: (selectinload(Collection.items).options(*ITEM_PUBLIC_LOADERS),),
+    CommunityAnnouncementPublic: (
+        joinedload(CommunityAnnouncement.author).options(*USER_PUBLIC_LOADERS),
+    ),
+    CommunityMessagePublic: (joinedload(CommunityMessage.author).options(*USER_PUBLIC_LOADERS),),
+}
+
+
+def loader_options(response_model: type) -> tuple[_AbstractLoad, ...]:
+    """
+    Loader options for ORM rows that will be serialized as `response_model`.
+    """
+    return LOADER_POLICIES[response_model]
@@ -0,0 +1,142 @@
+import base64
+import binascii
+import json
+import uuid
+from collections.abc import Callable, Sequence
+from datetime import datetime
+from enum import Enum
+from typing import Annotated, Any, TypeVar
+
+from fastapi import HTTPException, Query
+from sqlalchemy import tuple_
+from sqlmodel import Session, func, select
+from sqlmodel.sql.expression import SelectOfScalar
+
+T = TypeVar("T")
+
+# Above this many rows an estimated count just reports the cap ("1000+")
+COUNT_ESTIMATE_CAP = 1000
+
+
+class CountMode(str, Enum):
+    exact = "exact"
+    estimate = "estimate"
+    none = "none"
+
+
+CountModeQuery = Annotated[
+    CountMode,
+    Query(
+        alias="count",
+        description="How to compute `count`: exact, estimate (capped at "
+        f"{COUNT_ESTIMATE_CAP}, see `count_estimated`) or none (skip the count).",
+    ),
+]
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if hasattr(value, "value"):  # Enums
+        return value.value
+    return value
+
+
+def _from_json(value: Any, column: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is uuid.UUID:
+        return uuid.UUID(value)
+    return value
+
+
+def count_rows(
+    session: Session, statement: Any, mode: CountMode = CountMode.exact
+) -> tuple[int | None, bool]:
+    """
+    Count the rows `statement` would return according to `mode`.
+    Returns the count (None when skipped) and whether it is only a lower bound.
+    """
+    if mode == CountMode.none:
+        return None, False
+    if mode == CountMode.estimate:
+        # Stop scanning after the cap instead of walking the whole result
+        statement = statement.limit(COUNT_ESTIMATE_CAP + 1)
+    count = session.exec(select(func.count()).select_from(statement.subquery())).one()
+    if mode == CountMode.estimate and count > COUNT_ESTIMATE_CAP:
+        return COUNT_ESTIMATE_CAP, True
+    return count, False
+
+
+def encode_cursor(key: str, values: Sequence[Any]) -> str:
+    """
+    Encode the sort key values of the last row of a page into an opaque cursor.
+    """
+    payload = json.dumps({"k": key, "v": [_to_json(v) for v in values]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str, columns: Sequence[Any]) -> list[Any]:
+    """
+    Decode a cursor produced by `encode_cursor` for the same sort key.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["k"] != key or len(payload["v"]) != len(columns):
+            raise ValueError("cursor does not match sort order")
+        return [_from_json(v, c) for v, c in zip(payload["v"], columns, strict=True)]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_paginate(
+    session: Session,
+    statement: SelectOfScalar[T],
+    columns: Sequence[Any],
+    *,
+    cursor: str | None,
+    limit: int,
+    skip: int = 0,
+    descending: bool = True,
+    key: str | None = None,
+    cursor_values: Callable[[T], Sequence[Any]] | None = None,
+) -> tuple[list[T], str | None]:
+    """
+    Fetch one page of `statement` ordered by `columns` (the last one must be unique).
+
+    With a cursor the page starts right after the row it encodes, so the cost
+    depends on the page size only. Without one, `skip` is applied as a plain
+    OFFSET for backwards compatibility. Returns the rows and the cursor of the
+    next page (None on the last page).
+    """
+    key = key or ",".join(c.key for c in columns) + (":desc" if descending else ":asc")
+
+    if cursor:
+        values = decode_cursor(cursor, key, columns)
+        row = tuple_(*columns)
+        boundary = tuple_(*values)
+        statement = statement.where(row < boundary if descending else row > boundary)
+    elif skip:
+        statement = statement.offset(skip)
+
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = list(session.exec(statement.order_by(*order).limit(limit + 1)).all())
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        values = cursor_values(last) if cursor_values else [getattr(last, c.key) for c in columns]
+        next_cursor = encode_cursor(key, values)
+    return rows, next_cursor
@@ -2,9 +2,12 @@ import uuid
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, func
+from sqlmodel import Session, select
 
 from app.api.deps import get_current_active_superuser, get_current_user, get_db
+from app.api.etag import collection_version, conditional_get
+from app.api.loaders import loader_options
+from app.api.pagination import CountMode, CountModeQuery, count_rows
 from app.models import (
     Collection,
     CollectionCreate,
@@ -26,6 +29,7 @@ def read_collections(
     limit: int = 100,
     current_user: User = Depends(get_current_user),
     owner_id: uuid.UUID | None = None,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Retrieve collections.
@@ -45,22 +49,14 @@ def read_collections(
         if not is_friend and not current_user.is_superuser:
             raise HTTPException(status_code=403, detail="Not enough permissions to view this user's collections")
 
-    count_statement = (
-        select(func.count())
-        .select_from(Collection)
-        .where(Collection.owner_id == target_owner_id)
-    )
-    count = session.exec(count_statement).one()
-    
-    statement = (
-        select(Collection)
-        .where(Collection.owner_id == target_owner_id)
-        .offset(skip)
-        .limit(limit)
-    )
-    collections = session.exec(statement).all()
+    statement = select(Collection).where(Collection.owner_id == target_owner_id)
+    count, count_estimated = count_rows(session, statement, count_mode)
 
-    return CollectionsPublic(data=collections, count=count)
+    collections = session.exec(
+        statement.options(*loader_options(CollectionPublic)).offset(skip).limit(limit)
+    ).all()
+
+    return CollectionsPublic(data=collections, count=count, count_estimated=count_estimated)
 
 
 @router.post("/", response_model=CollectionPublic)
@@ -79,7 +75,9 @@ def create_collection(
     return collection
 
 
-@router.get("/{id}", response_model=CollectionPublic)
+@router.get(
+    "/{id}", response_model=CollectionPublic, dependencies=[Depends(conditional_get(collection_version))]
+)
 def read_collection(
     *,
     session: Session = Depends(get_db),
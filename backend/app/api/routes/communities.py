@@ -1,12 +1,18 @@
 import uuid
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
+from sqlmodel import select
 
-from app import crud
+from app import crud, feed
 from app.api.deps import CurrentUser, SessionDep
+from app.api.etag import community_version, conditional_get
+from app.api.loaders import loader_options
+from app.api.pagination import CountMode, CountModeQuery, count_rows, keyset_paginate
+from app.api.serializers import ITEM_COLUMNS, serialize_item_rows
 from app.api.websocket_manager import notification_manager
+from app.availability import get_item_availability
 from app.models import (
     CommunitiesPublic,
     Community,
@@ -29,34 +35,34 @@ from app.models import (
     Friendship,
     FriendshipStatus,
     Item,
-    ItemOwnerPublic,
-    ItemPublic,
     ItemsPublic,
     Loan,
+    LoanPublic,
     LoansPublic,
-    LoanStatus,
     Message,
     NotificationType,
     User,
     UserPublic,
     UsersPublic,
 )
-from app.search import delete_community_from_search, sync_community_to_search
 
 router = APIRouter()
 
 
 @router.get("/", response_model=CommunitiesPublic)
 def read_communities(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Retrieve communities.
     """
-    count_statement = select(func.count()).select_from(Community)
-    count = session.exec(count_statement).one()
-    statement = select(Community).offset(skip).limit(limit)
-    communities = session.exec(statement).all()
+    statement = select(Community)
+    count, count_estimated = count_rows(session, statement, count_mode)
+    communities = session.exec(statement.offset(skip).limit(limit)).all()
 
     # Populate current_user_role and notifications_enabled
     communities_public = []
@@ -82,7 +88,9 @@ def read_communities(
             comm_pub.notifications_enabled = meta["notif"]
         communities_public.append(comm_pub)
 
-    return CommunitiesPublic(data=communities_public, count=count)
+    return CommunitiesPublic(
+        data=communities_public, count=count, count_estimated=count_estimated
+    )
 
 
 @router.post("/", response_model=CommunityPublic)
@@ -98,7 +106,9 @@ def create_community(
     return community
 
 
-@router.get("/{id}", response_model=CommunityPublic)
+@router.get(
+    "/{id}", response_model=CommunityPublic, dependencies=[Depends(conditional_get(community_version))]
+)
 def read_community(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
     """
     Get community by ID.
@@ -152,7 +162,6 @@ def update_community(
     session.add(community)
     session.commit()
     session.refresh(community)
-    sync_community_to_search(community)
     return community
 
 
@@ -173,7 +182,6 @@ def delete_community(
 
     session.delete(community)
     session.commit()
-    delete_community_from_search(id)
     return Message(message="Community deleted successfully")
 
 
@@ -210,20 +218,16 @@ async def join_community(
             CommunityMember.community_id == id,
             CommunityMember.role == CommunityMemberRole.ADMIN
         )
-        admins = session.exec(admin_statement).all()
-        for admin in admins:
-            crud.create_notification(
-                session=session,
-                recipient_id=admin.user_id,
-                title="New Join Request",
-                message=f"{current_user.full_name or current_user.email} wants to join {community.name}.",
-                type=NotificationType.INFO,
-                link=f"/communities/{id}"
-            )
-            await notification_manager.send_personal_message(
-                {"type": "new_notification"},
-                admin.user_id
-            )
+        admin_ids = [admin.user_id for admin in session.exec(admin_statement).all()]
+        crud.create_notifications_bulk(
+            session=session,
+            recipient_ids=admin_ids,
+            title="New Join Request",
+            message=f"{current_user.full_name or current_user.email} wants to join {community.name}.",
+            type=NotificationType.INFO,
+            link=f"/communities/{id}"
+        )
+        await notification_manager.send_multicast({"type": "new_notification"}, admin_ids)
 
     return Message(message="Joined community successfully")
 
@@ -261,7 +265,13 @@ def leave_community(
 
 @router.get("/{id}/members", response_model=UsersPublic)
 def read_community_members(
-    *, session: SessionDep, current_user: CurrentUser, id: uuid.UUID, skip: int = 0, limit: int = 100
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    skip: int = 0,
+    limit: int = 100,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Get members of a community.
@@ -284,14 +294,15 @@ def read_community_members(
                 detail="This community is closed. You must be a member to view the member list."
             )
 
-    count = session.exec(
-        select(func.count()).where(CommunityMember.community_id == id)
-    ).one()
+    count, count_estimated = count_rows(
+        session, select(CommunityMember).where(CommunityMember.community_id == id), count_mode
+    )
 
     statement = (
         select(User, CommunityMember)
         .join(CommunityMember, User.id == CommunityMember.user_id)
         .where(CommunityMember.community_id == id)
+        .options(*loader_options(UserPublic))
     )
     results = session.exec(statement.offset(skip).limit(limit)).all()
 
@@ -323,7 +334,7 @@ def read_community_members(
 
         users_with_meta.append(user_public)
 
-    return UsersPublic(data=users_with_meta, count=count)
+    return UsersPublic(data=users_with_meta, count=count, count_estimated=count_estimated)
 
 
 @router.patch("/{id}/members/{user_id}", response_model=UserPublic)
@@ -424,183 +435,57 @@ def update_community_notifications(
 
 
 @router.get("/{id}/items", response_model=ItemsPublic)
-
-
 def read_community_items(
-
-
-    *, session: SessionDep, current_user: CurrentUser, id: uuid.UUID, skip: int = 0, limit: int = 100
-
-
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    skip: int = 0,
+    limit: int = 100,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
-
-
     """
-
-
     Get items belonging to a community.
-
-
     """
-
-
     community = session.get(Community, id)
-
-
     if not community:
-
-
         raise HTTPException(status_code=404, detail="Community not found")
 
-
-
-
-
     # Access check: member or admin
-
-
     statement = select(CommunityMember).where(
-
-
         CommunityMember.community_id == id,
-
-
         CommunityMember.user_id == current_user.id,
-
-
         CommunityMember.status == CommunityMemberStatus.ACCEPTED,
-
-
     )
-
-
     membership = session.exec(statement).first()
-
-
     if not membership and not current_user.is_superuser:
-
-
         raise HTTPException(status_code=403, detail="Must be a member to view community items")
 
-
-
-
-
     # Fetch items linked to community
-
-
     statement = (
-
-
-        select(Item, CommunityItem)
-
-
+        select(*ITEM_COLUMNS, CommunityItem.added_by, CommunityItem.is_donation_pending)
         .join(CommunityItem, Item.id == CommunityItem.item_id)
-
-
         .where(CommunityItem.community_id == id)
-
-
     )
-
-
     results = session.exec(statement.offset(skip).limit(limit)).all()
 
-
-    
-
-
-    count_statement = (
-
-
-        select(func.count())
-
-
-        .select_from(CommunityItem)
-
-
-        .where(CommunityItem.community_id == id)
-
-
+    count, count_estimated = count_rows(
+        session, select(CommunityItem).where(CommunityItem.community_id == id), count_mode
     )
 
-
-    count = session.exec(count_statement).one()
-
-
-    
-
-
-    items_public = []
-
-
-    for item, comm_item in results:
-
-
-        item_pub = ItemPublic.model_validate(item)
-
-
-        item_pub.added_by_id = comm_item.added_by
-
-
-        item_pub.is_donation_pending = comm_item.is_donation_pending
-
-
-        
-
-
-        # Add owners info
-
-
-        item_pub.owners = [
-
-
-            ItemOwnerPublic(id=owner.id, full_name=owner.full_name, email=owner.email)
-
-
-            for owner in item.owners
-
-
-        ]
-
-
-        # Check availability
-
-
-        active_loan = session.exec(
-
-
-            select(Loan).where(
-
-
-                Loan.item_id == item.id,
-
-
-                Loan.status.in_([LoanStatus.ACTIVE, LoanStatus.ACCEPTED, LoanStatus.PENDING])
-
-
-            )
-
-
-        ).first()
-
-
-        item_pub.is_available = not active_loan
-
-
-        items_public.append(item_pub)
-
-
-
-
-
-    return ItemsPublic(data=items_public, count=count)
-
-
-
-
-
-
+    items_public = serialize_item_rows(
+        session,
+        results,
+        with_communities=True,
+        item_availability=get_item_availability(session, [row.id for row in results]),
+        extra={
+            row.id: {"added_by_id": row.added_by, "is_donation_pending": row.is_donation_pending}
+            for row in results
+        },
+    )
+    return ORJSONResponse(
+        {"data": items_public, "count": count, "count_estimated": count_estimated, "next_cursor": None}
+    )
 
 
 @router.post("/{id}/items/{item_id}", response_model=Message)
@@ -750,7 +635,7 @@ def add_item_to_community(
 @router.post("/{id}/items/{item_id}/donate", response_model=Message)
 
 
-def initiate_donation(
+async def initiate_donation(
 
 
     *, session: SessionDep, current_user: CurrentUser, id: uuid.UUID, item_id: uuid.UUID
@@ -828,37 +713,16 @@ def initiate_donation(
     )
 
 
-    admins = session.exec(admin_statement).all()
-
-
-    for admin in admins:
-
-
-        crud.create_notification(
-
-
-            session=session,
-
-
-            recipient_id=admin.user_id,
-
-
-            title="Item Donation Pending",
-
-
-            message=f"{current_user.full_name or current_user.email} wants to donate an item to the community.",
-
-
-            type=NotificationType.INFO,
-
-
-            link=f"/communities/{id}"
-
-
-        )
-
-
-    
+    admin_ids = [admin.user_id for admin in session.exec(admin_statement).all()]
+    crud.create_notifications_bulk(
+        session=session,
+        recipient_ids=admin_ids,
+        title="Item Donation Pending",
+        message=f"{current_user.full_name or current_user.email} wants to donate an item to the community.",
+        type=NotificationType.INFO,
+        link=f"/communities/{id}"
+    )
+    await notification_manager.send_multicast({"type": "new_notification"}, admin_ids)
 
 
     return Message(message="Donation request sent to admins")
@@ -871,122 +735,48 @@ def initiate_donation(
 
 
 @router.post("/{id}/items/{item_id}/ratify-donation", response_model=Message)
-
-
 def ratify_donation(
-
-
     *, session: SessionDep, current_user: CurrentUser, id: uuid.UUID, item_id: uuid.UUID
-
-
 ) -> Any:
-
-
     """
-
-
     Ratify a donation (Admin only).
-
-
     """
-
-
     # Admin check
-
-
     statement = select(CommunityMember).where(
-
-
         CommunityMember.community_id == id,
-
-
         CommunityMember.user_id == current_user.id,
-
-
         CommunityMember.role == CommunityMemberRole.ADMIN
-
-
     )
-
-
     if not session.exec(statement).first() and not current_user.is_superuser:
-
-
         raise HTTPException(status_code=403, detail="Only admins can ratify donations")
 
-
-
-
-
     statement = select(CommunityItem).where(
-
-
         CommunityItem.community_id == id,
-
-
         CommunityItem.item_id == item_id
-
-
     )
-
-
     comm_item = session.exec(statement).first()
-
-
     if not comm_item or not comm_item.is_donation_pending:
-
-
         raise HTTPException(status_code=400, detail="No pending donation found")
 
-
-
-
-
     item = session.get(Item, item_id)
-
-
+    previous_owner_ids = [o.id for o in item.owners]
     # Change ownership
-
-
     item.community_owner_id = id
-
-
     item.owners = [] # Clear personal owners
 
-
-    
-
-
     # Update comm_item status
-
-
     comm_item.is_donation_pending = False
 
-
-    
-
-
     session.add(item)
-
-
     session.add(comm_item)
-
-
+    session.flush()
+    for owner_id in previous_owner_ids:
+        feed.remove_owned_items(session, owner_id, [item_id])
     session.commit()
 
-
-    
-
-
     return Message(message="Donation ratified! The community now owns this item.")
 
 
-
-
-
-
-
-
 @router.delete("/{id}/items/{item_id}", response_model=Message)
 
 
@@ -1100,7 +890,13 @@ def remove_item_from_community(
 
 @router.get("/{id}/announcements", response_model=CommunityAnnouncementsPublic)
 def read_community_announcements(
-    *, session: SessionDep, current_user: CurrentUser, id: uuid.UUID, skip: int = 0, limit: int = 100
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    skip: int = 0,
+    limit: int = 100,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Get announcements for a community.
@@ -1119,18 +915,17 @@ def read_community_announcements(
     if not membership and not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Must be a member to view announcements")
 
-    count = session.exec(
-        select(func.count()).where(CommunityAnnouncement.community_id == id)
-    ).one()
-    statement = (
-        select(CommunityAnnouncement)
-        .where(CommunityAnnouncement.community_id == id)
+    statement = select(CommunityAnnouncement).where(CommunityAnnouncement.community_id == id)
+    count, count_estimated = count_rows(session, statement, count_mode)
+    announcements = session.exec(
+        statement.options(*loader_options(CommunityAnnouncementPublic))
         .order_by(CommunityAnnouncement.created_at.desc())
         .offset(skip)
         .limit(limit)
+    ).all()
+    return CommunityAnnouncementsPublic(
+        data=announcements, count=count, count_estimated=count_estimated
     )
-    announcements = session.exec(statement).all()
-    return CommunityAnnouncementsPublic(data=announcements, count=count)
 
 
 @router.post("/{id}/announcements", response_model=CommunityAnnouncementPublic)
@@ -1169,34 +964,36 @@ async def create_community_announcement(
     session.refresh(announcement)
 
     # Notify all members who have notifications enabled
-    member_statement = select(CommunityMember).where(
+    member_statement = select(CommunityMember.user_id).where(
         CommunityMember.community_id == id,
         CommunityMember.status == CommunityMemberStatus.ACCEPTED,
         CommunityMember.user_id != current_user.id,
         CommunityMember.notifications_enabled,
     )
-    members = session.exec(member_statement).all()
-    for member in members:
-        crud.create_notification(
-            session=session,
-            recipient_id=member.user_id,
-            title=f"New Announcement in {community.name}",
-            message=announcement.title,
-            type=NotificationType.INFO,
-            link=f"/communities/{id}"
-        )
-        # Notify via websocket
-        await notification_manager.send_personal_message(
-            {"type": "new_notification"},
-            member.user_id
-        )
+    member_ids = session.exec(member_statement).all()
+    crud.create_notifications_bulk(
+        session=session,
+        recipient_ids=member_ids,
+        title=f"New Announcement in {community.name}",
+        message=announcement.title,
+        type=NotificationType.INFO,
+        link=f"/communities/{id}"
+    )
+    await notification_manager.send_multicast({"type": "new_notification"}, member_ids)
 
     return announcement
 
 
 @router.get("/{id}/messages", response_model=CommunityMessagesPublic)
 def read_community_messages(
-    *, session: SessionDep, current_user: CurrentUser, id: uuid.UUID, skip: int = 0, limit: int = 100
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Get messages for a community board.
@@ -1215,18 +1012,19 @@ def read_community_messages(
     if not membership and not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Must be a member to view messages")
 
-    count = session.exec(
-        select(func.count()).where(CommunityMessage.community_id == id)
-    ).one()
-    statement = (
-        select(CommunityMessage)
-        .where(CommunityMessage.community_id == id)
-        .order_by(CommunityMessage.created_at.desc())
-        .offset(skip)
-        .limit(limit)
+    statement = select(CommunityMessage).where(CommunityMessage.community_id == id)
+    count, count_estimated = count_rows(session, statement, count_mode)
+    messages, next_cursor = keyset_paginate(
+        session,
+        statement.options(*loader_options(CommunityMessagePublic)),
+        [CommunityMessage.created_at, CommunityMessage.id],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+    )
+    return CommunityMessagesPublic(
+        data=messages, count=count, count_estimated=count_estimated, next_cursor=next_cursor
     )
-    messages = session.exec(statement).all()
-    return CommunityMessagesPublic(data=messages, count=count)
 
 
 @router.post("/{id}/messages", response_model=CommunityMessagePublic)
@@ -1267,7 +1065,13 @@ def create_community_message(
 
 @router.get("/{id}/loans", response_model=LoansPublic)
 def read_community_loans(
-    *, session: SessionDep, current_user: CurrentUser, id: uuid.UUID, skip: int = 0, limit: int = 100
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    skip: int = 0,
+    limit: int = 100,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Get loans for a community (Admin only).
@@ -1287,15 +1091,13 @@ def read_community_loans(
     if not membership and not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Only admins can view community loans")
 
-    count_statement = select(func.count()).select_from(Loan).where(Loan.community_id == id)
-    count = session.exec(count_statement).one()
+    statement = select(Loan).where(Loan.community_id == id)
+    count, count_estimated = count_rows(session, statement, count_mode)
 
-    statement = (
-        select(Loan)
-        .where(Loan.community_id == id)
+    loans = session.exec(
+        statement.options(*loader_options(LoanPublic))
         .order_by(Loan.created_at.desc())
         .offset(skip)
         .limit(limit)
-    )
-    loans = session.exec(statement).all()
-    return LoansPublic(data=loans, count=count)
+    ).all()
+    return LoansPublic(data=loans, count=count, count_estimated=count_estimated)
@@ -2,10 +2,12 @@ import uuid
 from typing import Any
 
 from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select, or_
+from sqlmodel import select, or_
 
-from app import crud
+from app import crud, feed
 from app.api.deps import CurrentUser, SessionDep
+from app.api.loaders import loader_options
+from app.api.pagination import CountMode, CountModeQuery, count_rows
 from app.api.websocket_manager import notification_manager
 from app.models import (
     Friendship,
@@ -53,7 +55,11 @@ def search_user_by_id(
 
 @router.get("/", response_model=UsersPublic)
 def read_friends(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Retrieve friends.
@@ -66,24 +72,21 @@ def read_friends(
             Friendship.status == FriendshipStatus.ACCEPTED,
         )
     )
-    count_statement = (
-        select(func.count())
-        .select_from(Friendship)
-        .where(
-            Friendship.user_id == current_user.id,
-            Friendship.status == FriendshipStatus.ACCEPTED,
-        )
-    )
-    
-    count = session.exec(count_statement).one()
-    friends = session.exec(statement.offset(skip).limit(limit)).all()
+    count, count_estimated = count_rows(session, statement, count_mode)
+    friends = session.exec(
+        statement.options(*loader_options(UserPublic)).offset(skip).limit(limit)
+    ).all()
 
-    return UsersPublic(data=friends, count=count)
+    return UsersPublic(data=friends, count=count, count_estimated=count_estimated)
 
 
 @router.get("/requests", response_model=UsersPublic)
 def read_friend_requests(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Retrieve pending friend requests sent to current user (Incoming).
@@ -96,24 +99,21 @@ def read_friend_requests(
             Friendship.status == FriendshipStatus.PENDING,
         )
     )
-    count_statement = (
-        select(func.count())
-        .select_from(Friendship)
-        .where(
-            Friendship.friend_id == current_user.id,
-            Friendship.status == FriendshipStatus.PENDING,
-        )
-    )
-    
-    count = session.exec(count_statement).one()
-    users = session.exec(statement.offset(skip).limit(limit)).all()
+    count, count_estimated = count_rows(session, statement, count_mode)
+    users = session.exec(
+        statement.options(*loader_options(UserPublic)).offset(skip).limit(limit)
+    ).all()
 
-    return UsersPublic(data=users, count=count)
+    return UsersPublic(data=users, count=count, count_estimated=count_estimated)
 
 
 @router.get("/requests/sent", response_model=UsersPublic)
 def read_sent_friend_requests(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Retrieve pending friend requests sent by current user (Outgoing).
@@ -126,19 +126,12 @@ def read_sent_friend_requests(
             Friendship.status == FriendshipStatus.PENDING,
         )
     )
-    count_statement = (
-        select(func.count())
-        .select_from(Friendship)
-        .where(
-            Friendship.user_id == current_user.id,
-            Friendship.status == FriendshipStatus.PENDING,
-        )
-    )
-    
-    count = session.exec(count_statement).one()
-    users = session.exec(statement.offset(skip).limit(limit)).all()
+    count, count_estimated = count_rows(session, statement, count_mode)
+    users = session.exec(
+        statement.options(*loader_options(UserPublic)).offset(skip).limit(limit)
+    ).all()
 
-    return UsersPublic(data=users, count=count)
+    return UsersPublic(data=users, count=count, count_estimated=count_estimated)
 
 
 @router.post("/request/{friend_id}", response_model=Message)
@@ -226,6 +219,8 @@ def remove_friend(
     
     for f in friendships:
         session.delete(f)
+    session.flush()
+    feed.unlink_friends(session, current_user.id, friend_id)
     session.commit()
     
     return Message(message="Friend removed")
@@ -1,16 +1,27 @@
 import uuid
 import json
+import math
+import re
 from typing import Any, Annotated
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from sqlmodel import func, select, col, or_
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlmodel import and_, col, exists, or_, select
 
+from app import crud, feed, item_import
 from app.api.deps import CurrentUser, SessionDep
+from app.api.etag import conditional_get, item_version
+from app.api.pagination import CountMode, CountModeQuery, count_rows, keyset_paginate
+from app.api.serializers import ITEM_COLUMNS, serialize_item, serialize_item_rows
 from app.storage import upload_image, delete_image
-from app.search import sync_item_to_search, delete_item_from_search
 from app.models import (
+    Collection,
+    CollectionItem,
+    FeedItem,
     Item,
     ItemCreate,
+    ItemImportReport,
     ItemPublic,
     ItemsPublic,
     ItemUpdate,
@@ -18,14 +29,16 @@ from app.models import (
     Message,
     Friendship,
     FriendshipStatus,
-    ItemOwnerPublic,
     UserItem,
     Loan,
     LoanStatus,
+    extra_data_text,
 )
 
 router = APIRouter(prefix="/items", tags=["items"])
 
+EXTRA_FILTER_PARAM = re.compile(r"^filter\[extra\.([A-Za-z0-9_\-]+)\]$")
+
 
 def check_item_availability(session: SessionDep, item_id: uuid.UUID) -> bool:
     """
@@ -39,18 +52,41 @@ def check_item_availability(session: SessionDep, item_id: uuid.UUID) -> bool:
     ).first()
     return active_loan is None
 
-def check_owner_item_availability(session: SessionDep, item_id: uuid.UUID, owner_id: uuid.UUID) -> bool:
+def get_extra_data_filters(request: Request) -> dict[str, str]:
     """
-    Check if a specific owner's copy of an item is available.
+    Collect `filter[extra.<key>]=<value>` query parameters into a containment document.
     """
-    active_loan = session.exec(
-        select(Loan).where(
-            Loan.item_id == item_id,
-            Loan.owner_id == owner_id,
-            Loan.status.in_([LoanStatus.ACTIVE, LoanStatus.PENDING, LoanStatus.ACCEPTED, LoanStatus.RETURN_PENDING])
-        )
-    ).first()
-    return active_loan is None
+    filters = {}
+    for name, value in request.query_params.items():
+        match = EXTRA_FILTER_PARAM.match(name)
+        if match:
+            filters[match.group(1)] = value
+    return filters
+
+
+def extra_data_condition(filters: dict[str, str]):
+    """
+    Containment (@>) predicate for `filter[extra.<key>]` values. Query strings carry no
+    types, so a value that parses as a JSON number, boolean or null also matches the
+    typed value (`pageCount=300` finds {"pageCount": 300} as well as "300").
+    """
+    conditions = []
+    for key, value in filters.items():
+        try:
+            typed = json.loads(value)
+        except ValueError:
+            typed = value
+        # NaN, Infinity and overflowing numbers (1e999) do not fit in jsonb
+        if isinstance(typed, float) and not math.isfinite(typed):
+            typed = value
+        if isinstance(typed, int | float | bool) or typed is None:
+            conditions.append(or_(
+                col(Item.extra_data).contains({key: value}),
+                col(Item.extra_data).contains({key: typed}),
+            ))
+        else:
+            conditions.append(col(Item.extra_data).contains({key: value}))
+    return and_(*conditions)
 
 
 @router.get("/", response_model=ItemsPublic)
@@ -59,111 +95,115 @@ def read_items(
     current_user: CurrentUser, 
     skip: int = 0, 
     limit: int = 100,
+    cursor: str | None = None,
     owner_id: uuid.UUID | None = None,
     sort_by: str = "created_at",
     sort_order: str = "desc",
     exclude_collections: bool = False,
     category: str | None = None,
-    genre: str | None = None
+    genre: str | None = None,
+    extra_filters: Annotated[dict[str, str] | None, Depends(get_extra_data_filters)] = None,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Retrieve items.
+    Pass the returned `next_cursor` as `cursor` to fetch the following page.
+    Filter on any metadata key with `filter[extra.<key>]=<value>`.
     """
     
     if owner_id:
-        all_visible_user_ids = [owner_id]
+        statement = select(*ITEM_COLUMNS).where(
+            exists().where(UserItem.item_id == Item.id, UserItem.user_id == owner_id)
+        )
+        collection_owner = Collection.owner_id == owner_id
+        sort_columns = [Item.created_at, Item.id]
     else:
-        friends_stmt = select(Friendship.friend_id).where(
-            Friendship.user_id == current_user.id,
-            Friendship.status == FriendshipStatus.ACCEPTED
+        # Own and friends' items come from the precomputed feed, so the
+        # default ordering is a single range scan over the viewer's rows
+        statement = (
+            select(*ITEM_COLUMNS)
+            .join(FeedItem, FeedItem.item_id == Item.id)
+            .where(FeedItem.viewer_id == current_user.id)
         )
-        friend_ids = session.exec(friends_stmt).all()
-        
-        friends_stmt_2 = select(Friendship.user_id).where(
-            Friendship.friend_id == current_user.id,
-            Friendship.status == FriendshipStatus.ACCEPTED
+        collection_owner = or_(
+            Collection.owner_id == current_user.id,
+            col(Collection.owner_id).in_(feed.friend_ids_of(current_user.id)),
         )
-        friend_ids_2 = session.exec(friends_stmt_2).all()
-        
-        all_visible_user_ids = list(set([current_user.id] + list(friend_ids) + list(friend_ids_2)))
-
-    # Get distinct item IDs first
-    item_ids_query = (
-        select(Item.id)
-        .join(UserItem)
-        .where(UserItem.user_id.in_(all_visible_user_ids))
-    )
+        sort_columns = [FeedItem.created_at, FeedItem.item_id]
 
     if category:
-        item_ids_query = item_ids_query.where(
-            func.json_extract_path_text(Item.extra_data, 'category') == category
-        )
+        statement = statement.where(extra_data_text("category") == category)
     
     if genre:
-        item_ids_query = item_ids_query.where(
-            func.json_extract_path_text(Item.extra_data, 'genre') == genre
-        )
+        statement = statement.where(extra_data_text("genre") == genre)
+
+    if extra_filters:
+        # Containment (@>) is served by the GIN index on extra_data
+        statement = statement.where(extra_data_condition(extra_filters))
 
     if exclude_collections:
-        from app.models import CollectionItem, Collection
-        # Subquery for items that ARE in a collection owned by any of the visible users
+        # Items that ARE in a collection owned by any of the visible users
         in_collections_stmt = (
             select(CollectionItem.item_id)
             .join(Collection)
-            .where(Collection.owner_id.in_(all_visible_user_ids))
+            .where(collection_owner)
         )
-        item_ids_query = item_ids_query.where(Item.id.not_in(in_collections_stmt))
+        statement = statement.where(col(Item.id).not_in(in_collections_stmt))
 
-    item_ids = session.exec(item_ids_query).all()
-    unique_item_ids = list(set(item_ids))
-    count = len(unique_item_ids)
+    count, count_estimated = count_rows(session, statement, count_mode)
 
-    # Fetch actual items with pagination and sorting
-    items_query = select(Item).where(Item.id.in_(unique_item_ids))
-    
-    # Apply sorting
-    sort_column = Item.created_at
     if sort_by == "title":
-        sort_column = Item.title
-        
-    if sort_order == "desc":
-        items_query = items_query.order_by(sort_column.desc())
-    else:
-        items_query = items_query.order_by(sort_column.asc())
-
-    items = session.exec(items_query.offset(skip).limit(limit)).all()
+        sort_columns = [Item.title, Item.id]
+    items, next_cursor = keyset_paginate(
+        session,
+        statement,
+        sort_columns,
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+        descending=sort_order == "desc",
+        key=f"{sort_by}:{sort_order}",
+        cursor_values=lambda item: (item.title if sort_by == "title" else item.created_at, item.id),
+    )
     
-    public_items = []
-    for item in items:
-        owners_public = []
-        any_available = False
-        for owner in item.owners:
-            is_avail = check_owner_item_availability(session, item.id, owner.id)
-            if is_avail:
-                any_available = True
-            owners_public.append(
-                ItemOwnerPublic(id=owner.id, full_name=owner.full_name, email=owner.email, is_available=is_avail)
-            )
-        
-        public_items.append(
-            ItemPublic(
-                id=item.id,
-                title=item.title,
-                description=item.description,
-                item_type=item.item_type,
-                image_url=item.image_url,
-                extra_data=item.extra_data,
-                count=item.count,
-                owners=owners_public,
-                created_at=item.created_at,
-                is_available=any_available
-            )
-        )
+    return ORJSONResponse(
+        {
+            "data": serialize_item_rows(session, items),
+            "count": count,
+            "count_estimated": count_estimated,
+            "next_cursor": next_cursor,
+        }
+    )
 
-    return ItemsPublic(data=public_items, count=count)
 
+def can_read_item(session: SessionDep, user: CurrentUser, item_id: uuid.UUID) -> bool:
+    """
+    Superusers, owners and accepted friends of an owner can read an item.
+    """
+    if user.is_superuser:
+        return True
+    owner_ids = session.exec(select(UserItem.user_id).where(UserItem.item_id == item_id)).all()
+    if user.id in owner_ids:
+        return True
+    stmt = select(Friendship).where(
+        (
+            (Friendship.user_id == user.id) &
+            (Friendship.friend_id.in_(owner_ids)) &
+            (Friendship.status == FriendshipStatus.ACCEPTED)
+        ) | (
+            (Friendship.user_id.in_(owner_ids)) &
+            (Friendship.friend_id == user.id) &
+            (Friendship.status == FriendshipStatus.ACCEPTED)
+        )
+    )
+    return session.exec(stmt).first() is not None
 
-@router.get("/{id}", response_model=ItemPublic)
+
+@router.get(
+    "/{id}",
+    response_model=ItemPublic,
+    dependencies=[Depends(conditional_get(item_version, can_read=can_read_item))],
+)
 def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
     """
     Get item by ID.
@@ -171,50 +211,10 @@ def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) ->
     item = session.get(Item, id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
-        
-    owner_ids = [o.id for o in item.owners]
-    
-    if current_user.is_superuser or current_user.id in owner_ids:
-        pass 
-    else:
-        stmt = select(Friendship).where(
-            (
-                (Friendship.user_id == current_user.id) & 
-                (Friendship.friend_id.in_(owner_ids)) & 
-                (Friendship.status == FriendshipStatus.ACCEPTED)
-            ) | (
-                (Friendship.user_id.in_(owner_ids)) & 
-                (Friendship.friend_id == current_user.id) & 
-                (Friendship.status == FriendshipStatus.ACCEPTED)
-            )
-        )
-        friendship = session.exec(stmt).first()
-        
-        if not friendship:
-             raise HTTPException(status_code=400, detail="Not enough permissions (Not a friend of owner)")
-
-    owners_public = []
-    any_available = False
-    for owner in item.owners:
-        is_avail = check_owner_item_availability(session, item.id, owner.id)
-        if is_avail:
-            any_available = True
-        owners_public.append(
-            ItemOwnerPublic(id=owner.id, full_name=owner.full_name, email=owner.email, is_available=is_avail)
-        )
-    
-    return ItemPublic(
-        id=item.id,
-        title=item.title,
-        description=item.description,
-        item_type=item.item_type,
-        image_url=item.image_url,
-        extra_data=item.extra_data,
-        count=item.count,
-        owners=owners_public,
-        created_at=item.created_at,
-        is_available=any_available
-    )
+    if not can_read_item(session, current_user, item.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions (Not a friend of owner)")
+
+    return serialize_item(session, item.id)
 
 
 @router.post("/", response_model=ItemPublic)
@@ -262,12 +262,9 @@ async def create_item(
     # Avoid enum casing issues in query by using lowercase string
     item_type_val = item_type.lower()
 
-    existing_item = session.exec(
-        select(Item).where(
-            Item.title == title,
-            Item.item_type == item_type_val
-        )
-    ).first()
+    existing_item = crud.get_duplicate_item(
+        session=session, title=title, item_type=ItemType(item_type_val), extra_data=extra_data_dict
+    )
     
     if existing_item:
         item = existing_item
@@ -295,10 +292,11 @@ async def create_item(
             if not item.image_url and final_image_url:
                 item.image_url = final_image_url
             session.add(item)
+            session.flush()
+            feed.add_owned_items(session, current_user.id, [item.id])
         
         session.commit()
         session.refresh(item)
-        sync_item_to_search(item)
     else:
         item = Item(
             title=title,
@@ -324,32 +322,37 @@ async def create_item(
             session.add(comm_item)
 
         session.add(item)
+        if not community_owner_id:
+            session.flush()
+            feed.add_owned_items(session, current_user.id, [item.id])
         session.commit()
         session.refresh(item)
-        sync_item_to_search(item)
-
-    owners_public = []
-    any_available = False
-    for owner in item.owners:
-        is_avail = check_owner_item_availability(session, item.id, owner.id)
-        if is_avail:
-            any_available = True
-        owners_public.append(
-            ItemOwnerPublic(id=owner.id, full_name=owner.full_name, email=owner.email, is_available=is_avail)
-        )
 
-    return ItemPublic(
-        id=item.id,
-        title=item.title,
-        description=item.description,
-        item_type=item.item_type,
-        image_url=item.image_url,
-        extra_data=item.extra_data,
-        count=item.count,
-        owners=owners_public,
-        community_owner_id=item.community_owner_id,
-        created_at=item.created_at,
-        is_available=any_available
+    return serialize_item(session, item.id)
+
+
+@router.post("/import", response_model=ItemImportReport)
+async def import_items(
+    session: SessionDep,
+    current_user: CurrentUser,
+    file: Annotated[UploadFile, File()],
+    format: Annotated[str | None, Form()] = None,
+) -> Any:
+    """
+    Bulk-add items to the current user's library from a CSV (with a header row) or JSON Lines file.
+    Rows are matched on title + item_type like single item creation. Unknown columns go to extra_data.
+    Returns a result for every row.
+    """
+    fmt = (format or item_import.guess_import_format(file.filename, file.content_type) or "").lower()
+    if fmt not in item_import.IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported import format, use csv or jsonl")
+
+    # Parsing and the chunked writes are blocking, keep them off the event loop
+    return await run_in_threadpool(
+        item_import.import_items,
+        session,
+        current_user.id,
+        item_import.read_import_rows(file.file, fmt),
     )
 
 
@@ -392,6 +395,18 @@ async def update_item(
     if image_url is not None:
         item.image_url = image_url
 
+    # Renames must not collide with another catalogue entry (unique dedup keys)
+    with session.no_autoflush:
+        duplicate = crud.get_duplicate_item(
+            session=session,
+            title=item.title,
+            item_type=item.item_type,
+            extra_data=item.extra_data,
+            exclude_id=item.id,
+        )
+    if duplicate:
+        raise HTTPException(status_code=409, detail="An item with this title or ISBN already exists")
+
     if image:
         contents = await image.read()
         final_image_url = await upload_image(contents, image.filename)
@@ -401,30 +416,8 @@ async def update_item(
     session.add(item)
     session.commit()
     session.refresh(item)
-    sync_item_to_search(item)
-    
-    owners_public = []
-    any_available = False
-    for owner in item.owners:
-        is_avail = check_owner_item_availability(session, item.id, owner.id)
-        if is_avail:
-            any_available = True
-        owners_public.append(
-            ItemOwnerPublic(id=owner.id, full_name=owner.full_name, email=owner.email, is_available=is_avail)
-        )
     
-    return ItemPublic(
-        id=item.id,
-        title=item.title,
-        description=item.description,
-        item_type=item.item_type,
-        image_url=item.image_url,
-        extra_data=item.extra_data,
-        count=item.count,
-        owners=owners_public,
-        created_at=item.created_at,
-        is_available=any_available
-    )
+    return serialize_item(session, item.id)
 
 
 @router.delete("/{id}")
@@ -449,10 +442,11 @@ async def delete_item(
             if item.image_url:
                 await delete_image(item.image_url)
             session.delete(item)
-            delete_item_from_search(id)
         else:
             session.add(item)
             
+        session.flush()
+        feed.remove_owned_items(session, current_user.id, [id])
         session.commit()
     
     return Message(message="Item ownership removed successfully")
@@ -3,9 +3,11 @@ from typing import Any
 from datetime import datetime, timedelta
 
 from fastapi import APIRouter, HTTPException
-from sqlmodel import select, func, or_
+from sqlmodel import select, or_
 
 from app.api.deps import CurrentUser, SessionDep
+from app.api.loaders import loader_options
+from app.api.pagination import CountMode, CountModeQuery, count_rows, keyset_paginate
 from app.models import (
     Loan,
     LoanCreate,
@@ -99,22 +101,16 @@ async def create_loan_request(
             CommunityMember.community_id == community_id,
             CommunityMember.role == CommunityMemberRole.ADMIN
         )
-        admins = session.exec(admin_statement).all()
-        for admin in admins:
-            if admin.user_id == current_user.id:
-                continue
-            crud.create_notification(
-                session=session,
-                recipient_id=admin.user_id,
-                title="New Community Loan Request",
-                message=f"{current_user.full_name or current_user.email} wants to borrow '{item.title}' from {community.name}.",
-                type=NotificationType.INFO,
-                link="/loans"
-            )
-            await notification_manager.send_personal_message(
-                {"type": "new_notification"},
-                admin.user_id
-            )
+        admin_ids = [admin.user_id for admin in session.exec(admin_statement).all() if admin.user_id != current_user.id]
+        crud.create_notifications_bulk(
+            session=session,
+            recipient_ids=admin_ids,
+            title="New Community Loan Request",
+            message=f"{current_user.full_name or current_user.email} wants to borrow '{item.title}' from {community.name}.",
+            type=NotificationType.INFO,
+            link="/loans"
+        )
+        await notification_manager.send_multicast({"type": "new_notification"}, admin_ids)
     else:
         # Notify single owner
         crud.create_notification(
@@ -135,7 +131,12 @@ async def create_loan_request(
 
 @router.get("/incoming", response_model=LoansPublic)
 def read_incoming_loan_requests(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Retrieve loan requests for items owned by the current user or their communities.
@@ -158,42 +159,47 @@ def read_incoming_loan_requests(
                 Loan.community_id.in_(admin_communities) if admin_communities else False
             )
         )
-        .order_by(Loan.created_at.desc())
     )
     
-    count_statement = (
-        select(func.count())
-        .select_from(Loan)
-        .where(
-            or_(
-                Loan.owner_id == current_user.id,
-                Loan.community_id.in_(admin_communities) if admin_communities else False
-            )
-        )
+    count, count_estimated = count_rows(session, statement, count_mode)
+    loans, next_cursor = keyset_paginate(
+        session,
+        statement.options(*loader_options(LoanPublic)),
+        [Loan.created_at, Loan.id],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+    )
+    return LoansPublic(
+        data=loans, count=count, count_estimated=count_estimated, next_cursor=next_cursor
     )
-    
-    count = session.exec(count_statement).one()
-    loans = session.exec(statement.offset(skip).limit(limit)).all()
-    return LoansPublic(data=loans, count=count)
 
 
 @router.get("/outgoing", response_model=LoansPublic)
 def read_outgoing_loan_requests(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Retrieve loan requests submitted by the current user.
     """
-    statement = (
-        select(Loan)
-        .where(Loan.requester_id == current_user.id)
-        .order_by(Loan.created_at.desc())
+    statement = select(Loan).where(Loan.requester_id == current_user.id)
+    count, count_estimated = count_rows(session, statement, count_mode)
+    loans, next_cursor = keyset_paginate(
+        session,
+        statement.options(*loader_options(LoanPublic)),
+        [Loan.created_at, Loan.id],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
+    )
+    return LoansPublic(
+        data=loans, count=count, count_estimated=count_estimated, next_cursor=next_cursor
     )
-    count_statement = select(func.count()).select_from(Loan).where(Loan.requester_id == current_user.id)
-    
-    count = session.exec(count_statement).one()
-    loans = session.exec(statement.offset(skip).limit(limit)).all()
-    return LoansPublic(data=loans, count=count)
 
 
 @router.patch("/{id}/respond", response_model=LoanPublic)
@@ -277,20 +283,16 @@ async def ratify_loan(
             CommunityMember.community_id == loan.community_id,
             CommunityMember.role == CommunityMemberRole.ADMIN
         )
-        admins = session.exec(admin_statement).all()
-        for admin in admins:
-            crud.create_notification(
-                session=session,
-                recipient_id=admin.user_id,
-                title="Loan Ratified",
-                message=f"{current_user.full_name or current_user.email} confirmed receipt of '{loan.item.title}' from the community.",
-                type=NotificationType.INFO,
-                link="/loans"
-            )
-            await notification_manager.send_personal_message(
-                {"type": "new_notification"},
-                admin.user_id
-            )
+        admin_ids = [admin.user_id for admin in session.exec(admin_statement).all()]
+        crud.create_notifications_bulk(
+            session=session,
+            recipient_ids=admin_ids,
+            title="Loan Ratified",
+            message=f"{current_user.full_name or current_user.email} confirmed receipt of '{loan.item.title}' from the community.",
+            type=NotificationType.INFO,
+            link="/loans"
+        )
+        await notification_manager.send_multicast({"type": "new_notification"}, admin_ids)
     elif loan.owner_id:
         crud.create_notification(
             session=session,
@@ -335,20 +337,16 @@ async def signal_return(
             CommunityMember.community_id == loan.community_id,
             CommunityMember.role == CommunityMemberRole.ADMIN
         )
-        admins = session.exec(admin_statement).all()
-        for admin in admins:
-            crud.create_notification(
-                session=session,
-                recipient_id=admin.user_id,
-                title="Return Signaled",
-                message=f"{current_user.full_name or current_user.email} signaled that they have returned '{loan.item.title}' to the community.",
-                type=NotificationType.INFO,
-                link="/loans"
-            )
-            await notification_manager.send_personal_message(
-                {"type": "new_notification"},
-                admin.user_id
-            )
+        admin_ids = [admin.user_id for admin in session.exec(admin_statement).all()]
+        crud.create_notifications_bulk(
+            session=session,
+            recipient_ids=admin_ids,
+            title="Return Signaled",
+            message=f"{current_user.full_name or current_user.email} signaled that they have returned '{loan.item.title}' to the community.",
+            type=NotificationType.INFO,
+            link="/loans"
+        )
+        await notification_manager.send_multicast({"type": "new_notification"}, admin_ids)
     elif loan.owner_id:
         crud.create_notification(
             session=session,
@@ -453,20 +451,16 @@ async def create_extension_request(
             CommunityMember.community_id == loan.community_id,
             CommunityMember.role == CommunityMemberRole.ADMIN
         )
-        admins = session.exec(admin_statement).all()
-        for admin in admins:
-            crud.create_notification(
-                session=session,
-                recipient_id=admin.user_id,
-                title="Extension Requested",
-                message=message_text,
-                type=NotificationType.INFO,
-                link="/loans"
-            )
-            await notification_manager.send_personal_message(
-                {"type": "new_notification"},
-                admin.user_id
-            )
+        admin_ids = [admin.user_id for admin in session.exec(admin_statement).all()]
+        crud.create_notifications_bulk(
+            session=session,
+            recipient_ids=admin_ids,
+            title="Extension Requested",
+            message=message_text,
+            type=NotificationType.INFO,
+            link="/loans"
+        )
+        await notification_manager.send_multicast({"type": "new_notification"}, admin_ids)
     elif loan.owner_id:
         crud.create_notification(
             session=session,
@@ -8,6 +8,7 @@ from pydantic import ValidationError
 from sqlmodel import select, func
 
 from app.api.deps import CurrentUser, SessionDep
+from app.api.pagination import CountMode, CountModeQuery, count_rows, keyset_paginate
 from app.api.websocket_manager import notification_manager
 from app.core import security
 from app.core.config import settings
@@ -43,18 +44,20 @@ async def get_current_user_ws(
 
 @router.get("/", response_model=NotificationsPublic)
 def read_notifications(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: SessionDep,
+    current_user: CurrentUser,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    count_mode: CountModeQuery = CountMode.exact,
 ) -> Any:
     """
     Retrieve notifications.
     """
-    count_statement = (
-        select(func.count())
-        .select_from(Notification)
-        .where(Notification.recipient_id == current_user.id)
-    )
-    count = session.exec(count_statement).one()
-    
+    statement = select(Notification).where(Notification.recipient_id == current_user.id)
+    count, count_estimated = count_rows(session, statement, count_mode)
+
+    # The unread badge is always exact
     unread_count_statement = (
         select(func.count())
         .select_from(Notification)
@@ -62,16 +65,22 @@ def read_notifications(
     )
     unread_count = session.exec(unread_count_statement).one()
 
-    statement = (
-        select(Notification)
-        .where(Notification.recipient_id == current_user.id)
-        .order_by(Notification.created_at.desc())
-        .offset(skip)
-        .limit(limit)
+    notifications, next_cursor = keyset_paginate(
+        session,
+        statement,
+        [Notification.created_at, Notification.id],
+        cursor=cursor,
+        skip=skip,
+        limit=limit,
     )
-    notifications = session.exec(statement).all()
 
-    return NotificationsPublic(data=notifications, count=count, unread_count=unread_count)
+    return NotificationsPublic(
+        data=notifications,
+        count=count,
+        count_estimated=count_estimated,
+        unread_count=unread_count,
+        next_cursor=next_cursor,
+    )
 
 
 @router.patch("/{id}/read", response_model=NotificationPublic)
@@ -152,4 +161,7 @@ async def websocket_endpoint(
                 data = await websocket.receive_text()
                 # We could handle client messages here if needed
         except WebSocketDisconnect:
+            pass
+        finally:
+            # Also stops the socket's send task
             notification_manager.disconnect(websocket, user.id)
@@ -1,111 +1,110 @@
-from typing import Any
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any, Literal
 import uuid
 
-from fastapi import APIRouter
-from sqlmodel import col, select
+from fastapi import APIRouter, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session, col, func, or_, select
 
 from app.api.deps import CurrentUser, SessionDep
-from app.search import client as meili_client
+from app.api.loaders import loader_options
+from app.api.serializers import serialize_items
+from app.cache import LRUCache
+from app.globe import Globe, get_globe, id_filter
+from app.search_backends import ItemFilters, run_in_session, search_with_fallback
+from app.search_cache import result_cache, suggestion_cache
+from app.search_outbox import index_versions
 from app.models import (
     Community,
+    CommunityPublic,
     Friendship,
     FriendshipStatus,
-    Item,
+    ItemType,
     SearchResults,
+    SearchSuggestions,
     User,
+    UserProfile,
     UserPublic,
-    CommunityMember,
-    CommunityMemberStatus,
-    UserItem,
-    CollectionItem,
-    ItemPublic,
-    ItemOwnerPublic,
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/search", tags=["search"])
 
+# Seconds each sub-search may take before the response goes out without it
+SEARCH_PHASE_TIMEOUT = 2.0
+# Autocomplete runs on every keystroke, so it gets a tight budget
+SUGGEST_TIMEOUT = 0.3
 
-@router.get("/", response_model=SearchResults)
-def search(
-    *,
-    session: SessionDep,
-    current_user: CurrentUser,
-    q: str,
-    limit: int = 10,
-) -> Any:
+
+def _user_name_match(session: Session, q: str):
     """
-    Search for users, items, and communities.
+    (match, rank) of users whose full name or profile alias contains `q` or, on
+    Postgres, is trigram-similar to it. Both are served by the trigram indexes.
     """
-    
-    # Define the user's "globe"
-    # 1. Direct friends
-    friends_stmt = select(Friendship.friend_id).where(
-        Friendship.user_id == current_user.id,
-        Friendship.status == FriendshipStatus.ACCEPTED
-    )
-    friend_ids = set(session.exec(friends_stmt).all())
-    
-    # 2. Communities I am in
-    my_communities_stmt = select(CommunityMember.community_id).where(
-        CommunityMember.user_id == current_user.id,
-        CommunityMember.status == CommunityMemberStatus.ACCEPTED
-    )
-    my_community_ids = set(session.exec(my_communities_stmt).all())
-    
-    # 3. Communities my friends are in
-    friend_communities_stmt = select(CommunityMember.community_id).where(
-        CommunityMember.user_id.in_(list(friend_ids)),
-        CommunityMember.status == CommunityMemberStatus.ACCEPTED
-    )
-    friend_community_ids = set(session.exec(friend_communities_stmt).all())
-    
-    all_globe_community_ids = list(my_community_ids | friend_community_ids)
-    
-    # 4. All users in these globe communities
-    globe_users_in_comms_stmt = select(CommunityMember.user_id).where(
-        CommunityMember.community_id.in_(all_globe_community_ids),
-        CommunityMember.status == CommunityMemberStatus.ACCEPTED
-    )
-    globe_users_in_comms = set(session.exec(globe_users_in_comms_stmt).all())
-    
-    # Final set of user IDs in the "globe"
-    globe_user_ids = globe_users_in_comms | friend_ids | {current_user.id}
-
-    # 1. Search Users
-    user_ids_to_fetch = set()
-    
+    names = (User.full_name, UserProfile.alias)
+    match = or_(*(col(name).ilike(f"%{q}%") for name in names))
+    if session.get_bind().dialect.name != "postgresql":
+        return match, None
+    match = or_(match, *(col(name).op("%")(q) for name in names))
+    rank = func.greatest(*(func.similarity(name, q) for name in names))
+    return match, rank
+
+
+def _search_users(
+    session: Session, current_user_id: uuid.UUID, q: str, limit: int, globe: Globe
+) -> list[dict]:
+    # Ids in result order: an exact public_id match first, then names by similarity
+    user_ids_to_fetch: dict[uuid.UUID, None] = {}
+
     normalized_q = q.lower().strip()
     # Case A: Accurate match by public_id (Global)
     exact_user = session.exec(
         select(User).where(User.public_id == normalized_q)
     ).first()
-    
+
     if not exact_user and not normalized_q.startswith("u-"):
         exact_user = session.exec(
             select(User).where(User.public_id == f"u-{normalized_q}")
         ).first()
-        
+
     if exact_user:
-        user_ids_to_fetch.add(exact_user.id)
+        user_ids_to_fetch[exact_user.id] = None
 
     # Case B: Search by name (ONLY if in the globe)
+    match, rank = _user_name_match(session, q)
     globe_name_users_stmt = (
         select(User.id)
+        .outerjoin(UserProfile, col(UserProfile.user_id) == User.id)
         .where(
-            User.id.in_(list(globe_user_ids)),
-            col(User.full_name).ilike(f"%{q}%"),
-            User.id != current_user.id
+            id_filter(session, User.id, globe.user_ids),
+            match,
+            User.id != current_user_id
         )
+        .limit(limit)
     )
+    if rank is not None:
+        globe_name_users_stmt = globe_name_users_stmt.order_by(rank.desc())
     globe_name_user_ids = session.exec(globe_name_users_stmt).all()
     for uid in globe_name_user_ids:
-        user_ids_to_fetch.add(uid)
+        user_ids_to_fetch.setdefault(uid, None)
 
     users = []
     if user_ids_to_fetch:
-        users = session.exec(
-            select(User).where(User.id.in_(list(user_ids_to_fetch))).limit(limit)
-        ).all()
+        ranked_ids = list(user_ids_to_fetch)[:limit]
+        by_id = {
+            user.id: user
+            for user in session.exec(
+                select(User)
+                .where(col(User.id).in_(ranked_ids))
+                .options(*loader_options(UserPublic))
+            ).all()
+        }
+        users = [by_id[user_id] for user_id in ranked_ids if user_id in by_id]
 
     # Get friendship statuses for found users
     found_user_ids = [u.id for u in users]
@@ -113,7 +112,7 @@ def search(
     if found_user_ids:
         friendships = session.exec(
             select(Friendship).where(
-                Friendship.user_id == current_user.id,
+                Friendship.user_id == current_user_id,
                 Friendship.friend_id.in_(found_user_ids)
             )
         ).all()
@@ -124,95 +123,166 @@ def search(
         u_pub = UserPublic.model_validate(user)
         status = friendship_map.get(user.id)
         u_pub.friendship_status = status
-        
+
         # Restrict data if not friends
-        if user.id != current_user.id and status != FriendshipStatus.ACCEPTED:
+        if user.id != current_user_id and status != FriendshipStatus.ACCEPTED:
             u_pub.communities = []
             u_pub.interests = []
-            
-        users_public.append(u_pub)
-
-    # 2. Search Items using Meilisearch
-    meili_items_raw = []
-    try:
-        item_index = meili_client.index("items")
-        search_res = item_index.search(q, {
-            "limit": limit * 2, # Fetch slightly more
-            "attributesToSearchOn": ["title", "author", "description"]
-        })
-        item_ids = [hit["id"] for hit in search_res["hits"]]
-        
-        if item_ids:
-            # Fetch items that are in the globe
-            stmt = (
-                select(Item)
-                .join(UserItem)
-                .where(
-                    Item.id.in_(item_ids),
-                    UserItem.user_id.in_(list(globe_user_ids))
-                )
-                .limit(limit)
-            )
-            meili_items_raw = session.exec(stmt).all()
-            
-            # Sort back by meili relevance
-            id_to_item = {str(item.id): item for item in meili_items_raw}
-            meili_items_raw = [id_to_item[id_str] for id_str in item_ids if id_str in id_to_item][:limit]
-            
-    except Exception:
-        # Fallback to SQL
-        item_statement = (
-            select(Item)
-            .join(UserItem)
-            .where(
-                col(Item.title).ilike(f"%{q}%"),
-                UserItem.user_id.in_(list(globe_user_ids))
-            )
-            .limit(limit)
-        )
-        meili_items_raw = session.exec(item_statement).all()
-
-    # Convert raw items to ItemPublic and add collection info
-    items_public = []
-    for item in meili_items_raw:
-        item_pub = ItemPublic.model_validate(item)
-        item_pub.owners = [
-            ItemOwnerPublic(id=owner.id, full_name=owner.full_name, email=owner.email)
-            for owner in item.owners
-        ]
-        
-        # Check for collection
-        collection_link = session.exec(
-            select(CollectionItem).where(CollectionItem.item_id == item.id)
-        ).first()
-        if collection_link:
-            item_pub.collection_id = collection_link.collection_id
-            
-        items_public.append(item_pub)
-
-    # 3. Search Communities using Meilisearch (Expansion: Global search)
-    meili_communities = []
-    try:
-        comm_index = meili_client.index("communities")
-        search_res = comm_index.search(q, {
-            "limit": limit,
-            "attributesToSearchOn": ["name", "description"]
-        })
-        comm_ids = [hit["id"] for hit in search_res["hits"]]
-        if comm_ids:
-            meili_communities = session.exec(
-                select(Community).where(col(Community.id).in_(comm_ids))
-            ).all()
-            # Sort results back to match Meilisearch relevance
-            id_to_comm = {str(c.id): c for c in meili_communities}
-            meili_communities = [id_to_comm[id_str] for id_str in comm_ids if id_str in id_to_comm]
-    except Exception:
-        # Fallback to SQL
-        community_statement = select(Community).where(col(Community.name).ilike(f"%{q}%")).limit(limit)
-        meili_communities = session.exec(community_statement).all()
-
-    return SearchResults(
-        users=users_public,
-        items=items_public,
-        communities=meili_communities,
+
+        users_public.append(u_pub.model_dump(mode="json"))
+    return users_public
+
+
+def _serialize_items(session: Session, item_ids: list[uuid.UUID]) -> list[dict]:
+    return serialize_items(session, item_ids, with_communities=True, with_collection=True)
+
+
+async def _search_items(
+    bind: Engine | Connection, q: str, limit: int, globe: Globe, filters: ItemFilters
+) -> tuple[list[dict], dict[str, dict[str, int]]]:
+    hits = await search_with_fallback("search_items", bind, q, limit, globe, filters)
+    return await run_in_session(bind, _serialize_items, hits.ids), hits.facets
+
+
+def _communities_by_id(session: Session, community_ids: list[uuid.UUID]) -> list[dict]:
+    communities = session.exec(
+        select(Community).where(col(Community.id).in_(community_ids))
+    ).all()
+    # Sort results back to match search relevance
+    id_to_comm = {c.id: c for c in communities}
+    return [
+        CommunityPublic.model_validate(id_to_comm[community_id]).model_dump(mode="json")
+        for community_id in community_ids
+        if community_id in id_to_comm
+    ]
+
+
+async def _search_communities(bind: Engine | Connection, q: str, limit: int) -> list[dict]:
+    # Expansion: Global search
+    community_ids = await search_with_fallback("search_communities", bind, q, limit)
+    if not community_ids:
+        return []
+    return await run_in_session(bind, _communities_by_id, community_ids)
+
+
+async def _cached(cache: LRUCache, key: tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+    # Only successful results are stored, a failed or timed out section is retried
+    result = cache.get(key)
+    if result is None:
+        result = await compute()
+        cache.set(key, result)
+    return result
+
+
+@router.get("/", response_model=SearchResults)
+async def search(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    q: str,
+    limit: int = 10,
+    item_type: ItemType | None = None,
+    category: str | None = None,
+    genre: str | None = None,
+    available: bool | None = None,
+    sort: Literal["relevance", "newest"] = "relevance",
+    facets: bool = False,
+) -> Any:
+    """
+    Search for users, items, and communities. The three run concurrently; one
+    that fails or exceeds its time budget comes back empty and is listed in
+    `incomplete`. Item and community results are cached until the index changes,
+    items shared between users with the same globe.
+    `item_type`, `category`, `genre`, `available` and `sort` narrow and order the
+    items; with `facets` the match counts per value of each come back in the same response.
+    """
+    # The user's "globe": themselves, friends, and members of their and their friends' communities
+    globe = await run_in_threadpool(get_globe, session, current_user.id)
+    bind = session.get_bind()
+    normalized_q = " ".join(q.split()).lower()
+    versions = index_versions(["items", "communities"])
+    filters = ItemFilters(
+        item_type=item_type,
+        category=category,
+        genre=genre,
+        available=available,
+        newest=sort == "newest",
+        facets=facets,
+    )
+
+    phases = {
+        "users": run_in_session(bind, _search_users, current_user.id, q, limit, globe),
+        "items": _cached(
+            result_cache,
+            ("items", normalized_q, limit, filters, globe.fingerprint, versions),
+            lambda: _search_items(bind, normalized_q, limit, globe, filters),
+        ),
+        "communities": _cached(
+            result_cache,
+            ("communities", normalized_q, limit, versions),
+            lambda: _search_communities(bind, normalized_q, limit),
+        ),
+    }
+    results = await asyncio.gather(
+        *(asyncio.wait_for(phase, SEARCH_PHASE_TIMEOUT) for phase in phases.values()),
+        return_exceptions=True,
     )
+
+    response: dict[str, Any] = {"incomplete": [], "facets": {}}
+    for name, result in zip(phases, results, strict=True):
+        if isinstance(result, BaseException):
+            logger.error(f"Search phase {name} failed: {result!r}")
+            response[name] = []
+            response["incomplete"].append(name)
+        elif name == "items":
+            response["items"], response["facets"] = result
+        else:
+            response[name] = result
+    return ORJSONResponse(response)
+
+
+@router.get("/suggest", response_model=SearchSuggestions)
+async def suggest(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    q: str = Query(max_length=100),
+    limit: int = Query(default=5, ge=1, le=10),
+) -> Any:
+    """
+    Autocomplete: ids and labels of items and communities starting with `q`.
+    Empty when the user has turned autocomplete off; a section that misses the
+    latency budget comes back empty.
+    """
+    prefix = " ".join(q.split()).lower()
+    if not prefix or not (current_user.settings or {}).get("autocomplete_enabled", True):
+        return ORJSONResponse({"items": [], "communities": []})
+
+    # Hot prefixes are cached, items per globe since visibility depends on it
+    globe = await run_in_threadpool(get_globe, session, current_user.id)
+    bind = session.get_bind()
+    versions = index_versions(["items", "communities"])
+    sections = {
+        "items": _cached(
+            suggestion_cache,
+            ("items", globe.fingerprint, prefix, limit, versions),
+            lambda: search_with_fallback("suggest_items", bind, prefix, limit, globe),
+        ),
+        "communities": _cached(
+            suggestion_cache,
+            ("communities", prefix, limit, versions),
+            lambda: search_with_fallback("suggest_communities", bind, prefix, limit),
+        ),
+    }
+    results = await asyncio.gather(
+        *(asyncio.wait_for(section, SUGGEST_TIMEOUT) for section in sections.values()),
+        return_exceptions=True,
+    )
+
+    response: dict[str, Any] = {}
+    for name, result in zip(sections, results, strict=True):
+        if isinstance(result, BaseException):
+            logger.error(f"Suggestions for {name} failed: {result!r}")
+            result = []
+        response[name] = result
+    return ORJSONResponse(response)
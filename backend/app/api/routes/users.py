@@ -2,14 +2,17 @@ import uuid
 from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlmodel import col, delete, func, select, or_
+from sqlmodel import col, delete, select, or_
 
-from app import crud
+from app import crud, feed
 from app.api.deps import (
     CurrentUser,
     SessionDep,
     get_current_active_superuser,
 )
+from app.api.etag import conditional_get, conditional_get_current_user, user_version
+from app.api.loaders import loader_options
+from app.api.pagination import CountMode, CountModeQuery, count_rows
 from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
 from app.storage import upload_image
@@ -43,18 +46,24 @@ router = APIRouter(prefix="/users", tags=["users"])
     dependencies=[Depends(get_current_active_superuser)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_users(
+    session: SessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    count_mode: CountModeQuery = CountMode.exact,
+) -> Any:
     """
     Retrieve users.
     """
 
-    count_statement = select(func.count()).select_from(User)
-    count = session.exec(count_statement).one()
+    statement = select(User)
+    count, count_estimated = count_rows(session, statement, count_mode)
 
-    statement = select(User).offset(skip).limit(limit)
-    users = session.exec(statement).all()
+    users = session.exec(
+        statement.options(*loader_options(UserPublic)).offset(skip).limit(limit)
+    ).all()
 
-    return UsersPublic(data=users, count=count)
+    return UsersPublic(data=users, count=count, count_estimated=count_estimated)
 
 
 @router.post(
@@ -125,7 +134,7 @@ def update_password_me(
     return Message(message="Password updated successfully")
 
 
-@router.get("/me", response_model=UserPublic)
+@router.get("/me", response_model=UserPublic, dependencies=[Depends(conditional_get_current_user)])
 def read_user_me(current_user: CurrentUser) -> Any:
     """
     Get current user.
@@ -237,6 +246,7 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         )
     
     # Handle items ownership before deleting user
+    owned_item_ids = [item.id for item in current_user.items]
     for item in list(current_user.items):
         item.owners.remove(current_user)
         item.count = max(0, item.count - 1)
@@ -244,6 +254,9 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
             session.delete(item)
         else:
             session.add(item)
+    session.flush()
+    # Friends lose the items only this user made visible to them
+    feed.remove_owned_items(session, current_user.id, owned_item_ids)
             
     session.delete(current_user)
     session.commit()
@@ -278,7 +291,11 @@ def register_user(session: SessionDep, user_in: UserRegister) -> Any:
     return user
 
 
-@router.get("/{user_id}", response_model=UserPublic)
+@router.get(
+    "/{user_id}",
+    response_model=UserPublic,
+    dependencies=[Depends(conditional_get(user_version, param="user_id"))],
+)
 def read_user_by_id(
     user_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
 ) -> Any:
@@ -371,6 +388,7 @@ def delete_user(
         )
     
     # Handle items ownership before deleting user
+    owned_item_ids = [item.id for item in user.items]
     for item in list(user.items):
         item.owners.remove(user)
         item.count = max(0, item.count - 1)
@@ -378,6 +396,9 @@ def delete_user(
             session.delete(item)
         else:
             session.add(item)
+    session.flush()
+    # Friends lose the items only this user made visible to them
+    feed.remove_owned_items(session, user.id, owned_item_ids)
             
     session.delete(user)
     session.commit()
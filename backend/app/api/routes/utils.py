@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
-from app.api.deps import get_current_active_superuser
-from app.models import Message
+from app.api.deps import SessionDep, get_current_active_superuser
+from app.models import Message, SearchCacheStats, SearchIndexLag
+from app.search_cache import search_cache_stats
+from app.search_outbox import search_index_lag
 from app.utils import generate_test_email, send_email
 
 router = APIRouter(prefix="/utils", tags=["utils"])
@@ -29,3 +31,28 @@ def test_email(email_to: EmailStr) -> Message:
 @router.get("/health-check/")
 async def health_check() -> bool:
     return True
+
+
+@router.get(
+    "/search-lag/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=SearchIndexLag,
+)
+def search_lag(session: SessionDep) -> SearchIndexLag:
+    """
+    Search indexing lag: pending outbox entries, how many are being retried and
+    the age in seconds of the oldest change not yet pushed to Meilisearch.
+    """
+    return search_index_lag(session)
+
+
+@router.get(
+    "/search-cache/",
+    dependencies=[Depends(get_current_active_superuser)],
+    response_model=list[SearchCacheStats],
+)
+def search_cache() -> list[SearchCacheStats]:
+    """
+    Size and hit/miss counts of this process's search result caches.
+    """
+    return search_cache_stats()
@@ -0,0 +1,146 @@
+import uuid
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+from sqlmodel import Session, col, select
+
+from app.availability import get_owner_availability
+from app.models import CollectionItem, Community, CommunityItem, Item, User, UserItem
+
+# Exactly the columns ItemPublic exposes. Rows selected this way bypass the
+# identity map and are turned into response dicts without Pydantic validation.
+ITEM_COLUMNS = (
+    Item.id,
+    Item.title,
+    Item.description,
+    Item.author,
+    Item.item_type,
+    Item.image_url,
+    Item.extra_data,
+    Item.community_owner_id,
+    Item.count,
+    Item.created_at,
+)
+
+
+def _owners_by_item(session: Session, item_ids: list[uuid.UUID]) -> dict[uuid.UUID, list[dict]]:
+    rows = session.exec(
+        select(UserItem.item_id, User.id, User.full_name, User.email)
+        .join(User, User.id == UserItem.user_id)
+        .where(col(UserItem.item_id).in_(item_ids))
+    ).all()
+    availability = get_owner_availability(session, [(item_id, user_id) for item_id, user_id, *_ in rows])
+    owners: dict[uuid.UUID, list[dict]] = {}
+    for item_id, user_id, full_name, email in rows:
+        owners.setdefault(item_id, []).append(
+            {
+                "id": user_id,
+                "full_name": full_name,
+                "email": email,
+                "is_available": availability.get((item_id, user_id), True),
+            }
+        )
+    return owners
+
+
+def _communities_by_item(session: Session, item_ids: list[uuid.UUID]) -> dict[uuid.UUID, list[dict]]:
+    rows = session.exec(
+        select(
+            CommunityItem.item_id,
+            Community.id,
+            Community.name,
+            Community.description,
+            Community.is_closed,
+            Community.created_by,
+        )
+        .join(Community, Community.id == CommunityItem.community_id)
+        .where(col(CommunityItem.item_id).in_(item_ids))
+    ).all()
+    communities: dict[uuid.UUID, list[dict]] = {}
+    for item_id, id, name, description, is_closed, created_by in rows:
+        communities.setdefault(item_id, []).append(
+            {
+                "id": id,
+                "name": name,
+                "description": description,
+                "is_closed": is_closed,
+                "created_by": created_by,
+                "current_user_role": None,
+                "notifications_enabled": None,
+            }
+        )
+    return communities
+
+
+def _collections_by_item(session: Session, item_ids: list[uuid.UUID]) -> dict[uuid.UUID, uuid.UUID]:
+    rows = session.exec(
+        select(CollectionItem.item_id, CollectionItem.collection_id).where(
+            col(CollectionItem.item_id).in_(item_ids)
+        )
+    ).all()
+    collections: dict[uuid.UUID, uuid.UUID] = {}
+    for item_id, collection_id in rows:
+        collections.setdefault(item_id, collection_id)
+    return collections
+
+
+def serialize_item_rows(
+    session: Session,
+    rows: Sequence[Any],
+    *,
+    with_communities: bool = False,
+    with_collection: bool = False,
+    item_availability: Mapping[uuid.UUID, bool] | None = None,
+    extra: Mapping[uuid.UUID, dict] | None = None,
+) -> list[dict]:
+    """
+    Build ItemPublic-shaped dicts from rows selected with ITEM_COLUMNS, keeping their order.
+    Owners (with per-owner availability), communities and collection ids are each
+    fetched with one query for the whole page. An item is available when any owner
+    is, unless `item_availability` provides item-level values.
+    """
+    item_ids = [row.id for row in rows]
+    if not item_ids:
+        return []
+    owners = _owners_by_item(session, item_ids)
+    communities = _communities_by_item(session, item_ids) if with_communities else {}
+    collections = _collections_by_item(session, item_ids) if with_collection else {}
+
+    data = []
+    for row in rows:
+        item = {column.key: getattr(row, column.key) for column in ITEM_COLUMNS}
+        item_owners = owners.get(row.id, [])
+        if item_availability is not None:
+            is_available = item_availability.get(row.id, True)
+        else:
+            is_available = not item_owners or any(o["is_available"] for o in item_owners)
+        item.update(
+            owners=item_owners,
+            communities=communities.get(row.id, []),
+            collection_id=collections.get(row.id),
+            is_available=is_available,
+            added_by_id=None,
+            is_donation_pending=False,
+        )
+        if extra:
+            item.update(extra.get(row.id, {}))
+        data.append(item)
+    return data
+
+
+def serialize_items(session: Session, item_ids: Sequence[uuid.UUID], **kwargs: Any) -> list[dict]:
+    """
+    Serialize items by id, in the order given. Unknown ids are skipped.
+    """
+    if not item_ids:
+        return []
+    rows = session.exec(select(*ITEM_COLUMNS).where(col(Item.id).in_(item_ids))).all()
+    by_id = {row.id: row for row in rows}
+    return serialize_item_rows(
+        session, [by_id[item_id] for item_id in item_ids if item_id in by_id], **kwargs
+    )
+
+
+def serialize_item(session: Session, item_id: uuid.UUID, **kwargs: Any) -> ORJSONResponse:
+    return ORJSONResponse(serialize_items(session, [item_id], **kwargs)[0])
@@ -1,35 +1,271 @@
+import asyncio
+import contextlib
 import json
+import logging
 import uuid
-from typing import Dict, List
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterable
+from typing import Dict, List, Protocol
+
+import psycopg
 from fastapi import WebSocket
 
+from app.core.config import settings
+
+try:
+    from redis import asyncio as redis_asyncio
+except ImportError:  # optional dependency, see the "redis" extra
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+PUBSUB_CHANNEL = "websocket_push"
+# Recipients per published multicast, keeping payloads under the 8000-byte NOTIFY limit
+MULTICAST_CHUNK_SIZE = 150
+# Seconds to open a pub/sub connection (libpq's minimum is 2)
+PUBSUB_CONNECT_TIMEOUT = 2
+# Pause before resubscribing after the pub/sub connection drops
+PUBSUB_RETRY_INTERVAL = 1.0
+# Messages waiting per socket; the oldest is dropped when a slow client falls behind
+SEND_QUEUE_SIZE = 64
+# Seconds a single send may take before the client is considered dead
+SEND_TIMEOUT = 5.0
+
+
+class PubSubBackbone(Protocol):
+    """
+    Channel shared by every API process: a payload published by one worker is
+    received by all of them, the publisher included.
+    """
+
+    async def publish(self, payload: str) -> None: ...
+
+    def listen(self) -> AsyncIterator[str]: ...
+
+    async def close(self) -> None: ...
+
+
+class PostgresBackbone:
+    """
+    LISTEN/NOTIFY on the application database. Payloads are limited to 8000 bytes.
+    """
+
+    def __init__(self, dsn: str, channel: str = PUBSUB_CHANNEL) -> None:
+        self.dsn = dsn
+        self.channel = channel
+        self._publisher: psycopg.AsyncConnection | None = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> psycopg.AsyncConnection:
+        return await psycopg.AsyncConnection.connect(
+            self.dsn, autocommit=True, connect_timeout=PUBSUB_CONNECT_TIMEOUT
+        )
+
+    async def publish(self, payload: str) -> None:
+        async with self._lock:
+            for attempt in range(2):
+                if self._publisher is None or self._publisher.closed:
+                    self._publisher = await self._connect()
+                try:
+                    await self._publisher.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+                    return
+                except psycopg.OperationalError:
+                    # The kept connection may have gone stale (idle timeout, pgbouncer):
+                    # try once more on a fresh one before giving up
+                    await self._publisher.close()
+                    self._publisher = None
+                    if attempt:
+                        raise
+
+    async def listen(self) -> AsyncIterator[str]:
+        async with await self._connect() as conn:
+            await conn.execute(f'LISTEN "{self.channel}"')
+            async for notify in conn.notifies():
+                yield notify.payload
+
+    async def close(self) -> None:
+        if self._publisher is not None:
+            await self._publisher.close()
+            self._publisher = None
+
+
+class RedisBackbone:
+    """
+    Redis PUBLISH/SUBSCRIBE, for deployments that already run Redis.
+    """
+
+    def __init__(self, url: str, channel: str = PUBSUB_CHANNEL) -> None:
+        self.client = redis_asyncio.Redis.from_url(url)
+        self.channel = channel
+
+    async def publish(self, payload: str) -> None:
+        await self.client.publish(self.channel, payload)
+
+    async def listen(self) -> AsyncIterator[str]:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield message["data"].decode()
+        finally:
+            await pubsub.reset()
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class ConnectionSender:
+    """
+    Outbound queue of one websocket, drained by its own task so that a slow or
+    half-dead client never holds up the code pushing to it. A message identical to
+    one still waiting is coalesced into it, and when the queue is full the oldest
+    message is dropped. A send that fails or times out closes the connection.
+    """
+
+    def __init__(self, websocket: WebSocket, on_failure: Callable[["ConnectionSender"], None]) -> None:
+        self.websocket = websocket
+        self.dropped = 0
+        self._pending: deque[str] = deque()
+        self._wakeup = asyncio.Event()
+        self._on_failure = on_failure
+        self._task = asyncio.create_task(self._drain())
+
+    def enqueue(self, text: str) -> None:
+        if text in self._pending:
+            return
+        if len(self._pending) >= SEND_QUEUE_SIZE:
+            self._pending.popleft()
+            self.dropped += 1
+        self._pending.append(text)
+        self._wakeup.set()
+
+    def close(self) -> None:
+        self._task.cancel()
+
+    async def _drain(self) -> None:
+        try:
+            while True:
+                while not self._pending:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                await asyncio.wait_for(self.websocket.send_text(self._pending.popleft()), SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Dropping websocket after a failed send: {e!r}")
+            with contextlib.suppress(Exception):
+                await asyncio.wait_for(self.websocket.close(code=1011), SEND_TIMEOUT)
+            self._on_failure(self)
+
+
+def create_backbone() -> PubSubBackbone | None:
+    """
+    Backbone selected by WEBSOCKET_PUBSUB, None to deliver within this process only.
+    """
+    if settings.WEBSOCKET_PUBSUB == "postgres":
+        return PostgresBackbone(str(settings.SQLALCHEMY_DATABASE_URI).replace("+psycopg", "", 1))
+    if settings.WEBSOCKET_PUBSUB == "redis":
+        if redis_asyncio is None or not settings.REDIS_URL:
+            logger.error("WEBSOCKET_PUBSUB is redis but REDIS_URL or the redis package is missing")
+            return None
+        return RedisBackbone(settings.REDIS_URL)
+    return None
+
 
 class ConnectionManager:
+    """
+    Websockets of the users connected to this process. Once started, messages go
+    through the pub/sub backbone and every process delivers them to its own sockets,
+    so a push reaches the user whichever worker holds their connection. Delivery only
+    enqueues on each socket's ConnectionSender.
+    """
+
     def __init__(self):
-        # user_id -> list of websockets (a user can have multiple tabs open)
-        self.active_connections: Dict[uuid.UUID, List[WebSocket]] = {}
+        # user_id -> senders of the user's websockets (a user can have multiple tabs open)
+        self.active_connections: Dict[uuid.UUID, List[ConnectionSender]] = {}
+        self.backbone: PubSubBackbone | None = None
+        self._listener: asyncio.Task | None = None
+
+    async def start(self, backbone: PubSubBackbone | None = None) -> None:
+        self.backbone = backbone or create_backbone()
+        if self.backbone is not None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self.backbone is not None:
+            await self.backbone.close()
+            self.backbone = None
+        for senders in self.active_connections.values():
+            for sender in senders:
+                sender.close()
+        self.active_connections.clear()
 
     async def connect(self, websocket: WebSocket, user_id: uuid.UUID):
         await websocket.accept()
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+        sender = ConnectionSender(websocket, lambda failed: self.disconnect(failed.websocket, user_id))
+        self.active_connections[user_id].append(sender)
 
     def disconnect(self, websocket: WebSocket, user_id: uuid.UUID):
-        if user_id in self.active_connections:
-            self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
+        senders = self.active_connections.get(user_id, [])
+        for sender in [sender for sender in senders if sender.websocket is websocket]:
+            senders.remove(sender)
+            sender.close()
+        if user_id in self.active_connections and not senders:
+            del self.active_connections[user_id]
 
     async def send_personal_message(self, message: dict, user_id: uuid.UUID):
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                await connection.send_text(json.dumps(message))
+        await self._publish({"user_ids": [str(user_id)], "message": message})
+
+    async def send_multicast(self, message: dict, user_ids: Iterable[uuid.UUID]):
+        """
+        Send the same message to many users with one publish per chunk of recipients.
+        """
+        user_ids = [str(user_id) for user_id in user_ids]
+        for start in range(0, len(user_ids), MULTICAST_CHUNK_SIZE):
+            await self._publish(
+                {"user_ids": user_ids[start : start + MULTICAST_CHUNK_SIZE], "message": message}
+            )
 
     async def broadcast(self, message: dict):
-        for user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                await connection.send_text(json.dumps(message))
+        await self._publish({"user_ids": None, "message": message})
+
+    async def _publish(self, envelope: dict) -> None:
+        if self._listener is None:
+            self._deliver(envelope)
+            return
+        try:
+            await self.backbone.publish(json.dumps(envelope))
+        except Exception as e:
+            # Other workers miss this one, but the sockets held here still get it
+            logger.error(f"Could not publish websocket message: {e}")
+            self._deliver(envelope)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async for payload in self.backbone.listen():
+                    self._deliver(json.loads(payload))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Websocket pub/sub subscription failed: {e}")
+            await asyncio.sleep(PUBSUB_RETRY_INTERVAL)
+
+    def _deliver(self, envelope: dict) -> None:
+        if envelope["user_ids"] is None:
+            senders = [sender for senders in self.active_connections.values() for sender in senders]
+        else:
+            user_ids = (uuid.UUID(user_id) for user_id in envelope["user_ids"])
+            senders = [sender for user_id in user_ids for sender in self.active_connections.get(user_id, [])]
+        text = json.dumps(envelope["message"])
+        for sender in senders:
+            sender.enqueue(text)
 
 
 notification_manager = ConnectionManager()
@@ -0,0 +1,107 @@
+import uuid
+from collections.abc import Iterable
+
+from sqlmodel import Session, and_, col, exists, or_, select
+
+from app.models import Item, Loan, LoanStatus, UserItem
+
+# A personal copy is unavailable from the moment a loan is requested until it
+# has been handed back.
+OWNER_UNAVAILABLE_STATUSES = [
+    LoanStatus.ACTIVE,
+    LoanStatus.PENDING,
+    LoanStatus.ACCEPTED,
+    LoanStatus.RETURN_PENDING,
+]
+
+# Community items only track the pooled copy, so a return signal frees it.
+ITEM_UNAVAILABLE_STATUSES = [
+    LoanStatus.ACTIVE,
+    LoanStatus.ACCEPTED,
+    LoanStatus.PENDING,
+]
+
+
+def get_owner_availability(
+    session: Session, pairs: Iterable[tuple[uuid.UUID, uuid.UUID]]
+) -> dict[tuple[uuid.UUID, uuid.UUID], bool]:
+    """
+    Resolve availability for a set of (item_id, owner_id) pairs in one query.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+
+    item_ids = {item_id for item_id, _ in pairs}
+    owner_ids = {owner_id for _, owner_id in pairs}
+    busy = session.exec(
+        select(Loan.item_id, Loan.owner_id)
+        .where(
+            Loan.item_id.in_(item_ids),
+            Loan.owner_id.in_(owner_ids),
+            Loan.status.in_(OWNER_UNAVAILABLE_STATUSES),
+        )
+        .group_by(Loan.item_id, Loan.owner_id)
+    ).all()
+    busy_pairs = set(busy)
+    return {pair: pair not in busy_pairs for pair in pairs}
+
+
+def get_item_availability(
+    session: Session, item_ids: Iterable[uuid.UUID]
+) -> dict[uuid.UUID, bool]:
+    """
+    Resolve item-level availability (any open loan, regardless of owner) in one query.
+    """
+    item_ids = set(item_ids)
+    if not item_ids:
+        return {}
+
+    busy_ids = set(
+        session.exec(
+            select(Loan.item_id)
+            .where(
+                Loan.item_id.in_(item_ids),
+                Loan.status.in_(ITEM_UNAVAILABLE_STATUSES),
+            )
+            .group_by(Loan.item_id)
+        ).all()
+    )
+    return {item_id: item_id not in busy_ids for item_id in item_ids}
+
+
+def get_any_copy_availability(
+    session: Session, owners: dict[uuid.UUID, Iterable[uuid.UUID]]
+) -> dict[uuid.UUID, bool]:
+    """
+    Whether some copy of each item is free: one of its owners' copies, or for an
+    item without owners the pooled copy. `owners` maps item ids to owner ids.
+    """
+    owner_free = get_owner_availability(
+        session, ((item_id, owner_id) for item_id, owner_ids in owners.items() for owner_id in owner_ids)
+    )
+    available = {item_id: False for item_id in owners}
+    for (item_id, _), free in owner_free.items():
+        available[item_id] = available[item_id] or free
+    ownerless = [item_id for item_id, owner_ids in owners.items() if not owner_ids]
+    available.update(get_item_availability(session, ownerless))
+    return available
+
+
+def available_clause():
+    """
+    SQL counterpart of `get_any_copy_availability` for filtering `Item` rows.
+    """
+    owner_free = exists().where(
+        UserItem.item_id == Item.id,
+        ~exists().where(
+            Loan.item_id == UserItem.item_id,
+            Loan.owner_id == UserItem.user_id,
+            col(Loan.status).in_(OWNER_UNAVAILABLE_STATUSES),
+        ),
+    )
+    pooled_free = and_(
+        ~exists().where(UserItem.item_id == Item.id),
+        ~exists().where(Loan.item_id == Item.id, col(Loan.status).in_(ITEM_UNAVAILABLE_STATUSES)),
+    )
+    return or_(owner_free, pooled_free)
@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import settings
+
+try:
+    import redis
+except ImportError:  # optional dependency, see the "redis" extra
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire `ttl` seconds after being set.
+    Counts hits and misses of `get`.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+@lru_cache
+def get_shared_cache() -> "redis.Redis | None":
+    """
+    Redis client shared by all API processes, None when REDIS_URL is unset or the
+    redis package is not installed. Callers treat its errors as cache misses.
+    """
+    if not settings.REDIS_URL:
+        return None
+    if redis is None:
+        logger.error("REDIS_URL is set but the redis package is not installed")
+        return None
+    return redis.Redis.from_url(settings.REDIS_URL, socket_timeout=0.5)
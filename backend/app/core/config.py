@@ -104,6 +104,19 @@ class Settings(BaseSettings):
 
     MEILI_URL: str = "http://meilisearch:7700"
     MEILI_MASTER_KEY: str = "changethis"
+    # Run the search outbox drainer inside the API process
+    SEARCH_OUTBOX_WORKER: bool = True
+    # Push changed index settings (app.search.INDEX_SETTINGS) to Meilisearch at startup
+    SEARCH_RECONCILE_SETTINGS: bool = True
+    # Engine answering /search/, and the one tried when it fails (None to return the error)
+    SEARCH_BACKEND: Literal["meilisearch", "postgres"] = "meilisearch"
+    SEARCH_FALLBACK_BACKEND: Literal["meilisearch", "postgres"] | None = "postgres"
+
+    # Optional shared cache (needs the redis extra); in-process caches only when unset
+    REDIS_URL: str | None = None
+    # Channel fanning websocket pushes out to every API worker (redis needs REDIS_URL);
+    # None delivers only to sockets held by the sending process
+    WEBSOCKET_PUBSUB: Literal["postgres", "redis"] | None = "postgres"
 
     MINIO_ROOT_USER: str = "admin"
     MINIO_ROOT_PASSWORD: str = "changethis"
@@ -1,8 +1,11 @@
 import uuid
+from collections.abc import Iterable
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy import insert
+from sqlmodel import Session, or_, select
 
+from app import feed
 from app.core.security import get_password_hash, verify_password
 from app.models import (
     BookCreate,
@@ -19,22 +22,17 @@ from app.models import (
     FriendshipStatus,
     Item,
     ItemCreate,
+    ItemType,
     Notification,
     NotificationType,
     User,
     UserCreate,
     UserProfile,
     UserUpdate,
+    normalize_isbn,
+    normalize_title,
 )
 from app.utils import generate_unique_id
-from app.search import (
-    sync_book_to_search,
-    delete_book_from_search,
-    sync_item_to_search,
-    delete_item_from_search,
-    sync_community_to_search,
-    delete_community_from_search
-)
 
 
 def create_collection(
@@ -111,6 +109,42 @@ def create_notification(    *,
     return db_notification
 
 
+# Rows per INSERT statement, well under the 65535 bind parameters Postgres accepts
+NOTIFICATION_INSERT_BATCH = 5_000
+
+
+def create_notifications_bulk(
+    *,
+    session: Session,
+    recipient_ids: Iterable[uuid.UUID],
+    title: str,
+    message: str,
+    type: NotificationType = NotificationType.INFO,
+    link: str | None = None,
+) -> list[uuid.UUID]:
+    """
+    Send the same notification to every recipient with multi-row INSERTs and a single
+    commit. Returns the recipients notified, duplicates removed.
+    """
+    recipient_ids = list(dict.fromkeys(recipient_ids))
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "recipient_id": recipient_id,
+            "title": title,
+            "message": message,
+            "type": type,
+            "link": link,
+            "is_read": False,
+        }
+        for recipient_id in recipient_ids
+    ]
+    for start in range(0, len(rows), NOTIFICATION_INSERT_BATCH):
+        session.execute(insert(Notification).values(rows[start : start + NOTIFICATION_INSERT_BATCH]))
+    session.commit()
+    return recipient_ids
+
+
 def create_user(*, session: Session, user_create: UserCreate) -> User:
     public_id = generate_unique_id("u", session, User)
     db_obj = User.model_validate(
@@ -166,10 +200,35 @@ def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -
     session.add(db_item)
     session.commit()
     session.refresh(db_item)
-    sync_item_to_search(db_item)
     return db_item
 
 
+def get_duplicate_item(
+    *,
+    session: Session,
+    title: str,
+    item_type: ItemType,
+    extra_data: dict | None = None,
+    exclude_id: uuid.UUID | None = None,
+) -> Item | None:
+    """
+    Find the catalogue entry an item would duplicate: same item_type and the same
+    ISBN or normalized title. An ISBN match wins.
+    """
+    isbn = normalize_isbn((extra_data or {}).get("isbn"))
+    condition = Item.normalized_title == normalize_title(title)
+    if isbn:
+        condition = or_(condition, Item.isbn == isbn)
+    statement = select(Item).where(Item.item_type == item_type, condition)
+    if exclude_id:
+        statement = statement.where(Item.id != exclude_id)
+    matches = session.exec(statement.limit(2)).all()
+    for match in matches:
+        if isbn and match.isbn == isbn:
+            return match
+    return matches[0] if matches else None
+
+
 def create_community(
     *, session: Session, community_in: CommunityCreate, creator_id: uuid.UUID
 ) -> Community:
@@ -186,8 +245,6 @@ def create_community(
     )
     session.add(membership)
     session.commit()
-
-    sync_community_to_search(db_community)
     return db_community
 
 
@@ -278,6 +335,8 @@ def accept_friend_request(
             reverse_friendship.status = FriendshipStatus.ACCEPTED
             session.add(reverse_friendship)
 
+        session.flush()
+        feed.link_friends(session, user_id, friend_id)
         session.commit()
         session.refresh(friendship)
     return friendship
@@ -292,11 +351,11 @@ def create_book(*, session: Session, book_in: BookCreate, owner_id: uuid.UUID) -
     # Add ownership
     user_item = UserItem(user_id=owner_id, item_id=db_book.id)
     session.add(user_item)
+    session.flush()
+    feed.add_owned_items(session, owner_id, [db_book.id])
     
     session.commit()
     session.refresh(db_book)
-    
-    sync_item_to_search(db_book)
     return db_book
 
 
@@ -305,7 +364,6 @@ def delete_book(*, session: Session, book_id: uuid.UUID) -> None:
     if db_book:
         session.delete(db_book)
         session.commit()
-        delete_item_from_search(book_id)
 
 
 def delete_item(*, session: Session, item_id: uuid.UUID) -> None:
@@ -313,7 +371,6 @@ def delete_item(*, session: Session, item_id: uuid.UUID) -> None:
     if db_item:
         session.delete(db_item)
         session.commit()
-        delete_item_from_search(item_id)
 
 
 def delete_community(*, session: Session, community_id: uuid.UUID) -> None:
@@ -321,4 +378,3 @@ def delete_community(*, session: Session, community_id: uuid.UUID) -> None:
     if db_community:
         session.delete(db_community)
         session.commit()
-        delete_community_from_search(community_id)
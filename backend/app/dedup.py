@@ -0,0 +1,156 @@
+import uuid
+
+from sqlalchemy import delete, tuple_, update
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, col, func, or_, select
+
+from app.models import (
+    CollectionItem,
+    CommunityItem,
+    FeedItem,
+    Item,
+    Loan,
+    UserItem,
+    normalize_isbn,
+)
+
+# Link tables keyed by (other side, item_id): rows move to the kept item
+# unless it already has the same link
+_LINKS = (
+    (UserItem, "user_id"),
+    (CommunityItem, "community_id"),
+    (CollectionItem, "collection_id"),
+    (FeedItem, "viewer_id"),
+)
+
+
+def find_duplicate_groups(session: Session) -> list[list[uuid.UUID]]:
+    """
+    Group items sharing an item_type and a normalized title or ISBN, transitively.
+    Each group lists ids oldest first; the first one is the one to keep.
+    """
+    shared_titles = (
+        select(Item.item_type, Item.normalized_title)
+        .group_by(Item.item_type, Item.normalized_title)
+        .having(func.count() > 1)
+    )
+    shared_isbns = (
+        select(Item.item_type, Item.isbn)
+        .where(col(Item.isbn).is_not(None))
+        .group_by(Item.item_type, Item.isbn)
+        .having(func.count() > 1)
+    )
+    rows = session.exec(
+        select(Item.id, Item.item_type, Item.normalized_title, Item.isbn)
+        .where(
+            or_(
+                tuple_(Item.item_type, Item.normalized_title).in_(shared_titles),
+                tuple_(Item.item_type, Item.isbn).in_(shared_isbns),
+            )
+        )
+        .order_by(Item.created_at, Item.id)
+    ).all()
+
+    # Union-find over the two keys
+    parent: dict[uuid.UUID, uuid.UUID] = {}
+
+    def root(item_id: uuid.UUID) -> uuid.UUID:
+        while parent[item_id] != item_id:
+            parent[item_id] = parent[parent[item_id]]
+            item_id = parent[item_id]
+        return item_id
+
+    first_with_key: dict[tuple, uuid.UUID] = {}
+    for item_id, item_type, normalized_title, isbn in rows:
+        parent[item_id] = item_id
+        keys = [(item_type, "title", normalized_title)]
+        if isbn:
+            keys.append((item_type, "isbn", isbn))
+        for key in keys:
+            other = first_with_key.setdefault(key, item_id)
+            a, b = root(other), root(item_id)
+            if a != b:
+                parent[b] = a
+
+    groups: dict[uuid.UUID, list[uuid.UUID]] = {}
+    for item_id, *_ in rows:
+        groups.setdefault(root(item_id), []).append(item_id)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def merge_items(session: Session, keep_id: uuid.UUID, duplicate_id: uuid.UUID) -> None:
+    """
+    Fold `duplicate_id` into `keep_id`: ownerships, community and collection links,
+    feed rows and loans move over, missing metadata is copied, then the duplicate
+    is deleted. Migration 9d2e7b4c1a63 carries its own frozen copy of this merge.
+    """
+    fields = (Item.description, Item.author, Item.image_url, Item.extra_data, Item.count, Item.created_at)
+    keep = session.exec(select(*fields).where(Item.id == keep_id)).one()
+    duplicate = session.exec(select(*fields).where(Item.id == duplicate_id)).one()
+
+    # Owners of both copies only count once
+    shared_owners = session.exec(
+        select(func.count()).where(
+            UserItem.item_id == duplicate_id,
+            col(UserItem.user_id).in_(select(UserItem.user_id).where(UserItem.item_id == keep_id)),
+        )
+    ).one()
+
+    for link, other in _LINKS:
+        kept = aliased(link)
+        values = {"item_id": keep_id}
+        if link is FeedItem:
+            values["created_at"] = keep.created_at
+        session.execute(
+            update(link)
+            .where(
+                link.item_id == duplicate_id,
+                col(getattr(link, other)).not_in(
+                    select(getattr(kept, other)).where(kept.item_id == keep_id)
+                ),
+            )
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        session.execute(
+            delete(link)
+            .where(link.item_id == duplicate_id)
+            .execution_options(synchronize_session=False)
+        )
+    session.execute(
+        update(Loan)
+        .where(Loan.item_id == duplicate_id)
+        .values(item_id=keep_id)
+        .execution_options(synchronize_session=False)
+    )
+    session.execute(
+        delete(Item).where(Item.id == duplicate_id).execution_options(synchronize_session=False)
+    )
+
+    extra_data = {**(duplicate.extra_data or {}), **(keep.extra_data or {})}
+    session.execute(
+        update(Item)
+        .where(Item.id == keep_id)
+        .values(
+            description=keep.description or duplicate.description,
+            author=keep.author or duplicate.author,
+            image_url=keep.image_url or duplicate.image_url,
+            extra_data=extra_data,
+            isbn=normalize_isbn(extra_data.get("isbn")),
+            count=keep.count + duplicate.count - shared_owners,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def merge_duplicate_items(session: Session) -> list[uuid.UUID]:
+    """
+    Collapse every duplicate group into its oldest item. Returns the removed ids.
+    The caller commits.
+    """
+    removed = []
+    for keep_id, *duplicate_ids in find_duplicate_groups(session):
+        for duplicate_id in duplicate_ids:
+            merge_items(session, keep_id, duplicate_id)
+            removed.append(duplicate_id)
+    return removed
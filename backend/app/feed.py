@@ -0,0 +1,195 @@
+import uuid
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from sqlalchemy import and_, delete, except_, insert, literal, or_, union
+from sqlmodel import Session, col, exists, func, select
+
+from app.models import FeedItem, Friendship, FriendshipStatus, Item, UserItem
+
+
+def _friend_selects(user_id: uuid.UUID):
+    return (
+        select(Friendship.friend_id.label("user_id")).where(
+            Friendship.user_id == user_id,
+            Friendship.status == FriendshipStatus.ACCEPTED,
+        ),
+        select(Friendship.user_id.label("user_id")).where(
+            Friendship.friend_id == user_id,
+            Friendship.status == FriendshipStatus.ACCEPTED,
+        ),
+    )
+
+
+def friend_ids_of(user_id: uuid.UUID):
+    """
+    Select the ids of a user's accepted friends (friendships may be one-sided rows).
+    """
+    return union(*_friend_selects(user_id))
+
+
+def _source_pairs(viewer_id: uuid.UUID | None = None):
+    """
+    The source of truth for the feed: (viewer_id, item_id) for every item owned
+    by the viewer or by one of their accepted friends.
+    """
+    own = select(UserItem.user_id.label("viewer_id"), UserItem.item_id)
+    via_friend = (
+        select(Friendship.user_id.label("viewer_id"), UserItem.item_id)
+        .join(UserItem, UserItem.user_id == Friendship.friend_id)
+        .where(Friendship.status == FriendshipStatus.ACCEPTED)
+    )
+    via_reverse_friend = (
+        select(Friendship.friend_id.label("viewer_id"), UserItem.item_id)
+        .join(UserItem, UserItem.user_id == Friendship.user_id)
+        .where(Friendship.status == FriendshipStatus.ACCEPTED)
+    )
+    if viewer_id is not None:
+        own = own.where(UserItem.user_id == viewer_id)
+        via_friend = via_friend.where(Friendship.user_id == viewer_id)
+        via_reverse_friend = via_reverse_friend.where(Friendship.friend_id == viewer_id)
+    return union(own, via_friend, via_reverse_friend).subquery()
+
+
+def _still_visible():
+    """
+    Correlated check that a feed row is still backed by an ownership.
+    """
+    friend_owner = exists().where(
+        Friendship.status == FriendshipStatus.ACCEPTED,
+        or_(
+            and_(Friendship.user_id == FeedItem.viewer_id, Friendship.friend_id == UserItem.user_id),
+            and_(Friendship.friend_id == FeedItem.viewer_id, Friendship.user_id == UserItem.user_id),
+        ),
+    )
+    return exists().where(
+        UserItem.item_id == FeedItem.item_id,
+        or_(UserItem.user_id == FeedItem.viewer_id, friend_owner),
+    )
+
+
+def _insert_missing(session: Session, pairs) -> None:
+    """
+    Insert (viewer_id, item_id) pairs from `pairs` that are not in the feed yet.
+    """
+    already = exists().where(
+        FeedItem.viewer_id == pairs.c.viewer_id,
+        FeedItem.item_id == pairs.c.item_id,
+    )
+    rows = (
+        select(pairs.c.viewer_id, pairs.c.item_id, Item.created_at)
+        .join(Item, Item.id == pairs.c.item_id)
+        .where(~already)
+    )
+    session.execute(
+        insert(FeedItem).from_select(["viewer_id", "item_id", "created_at"], rows)
+    )
+
+
+def _viewers_of(owner_id: uuid.UUID):
+    return union(select(literal(owner_id).label("user_id")), *_friend_selects(owner_id))
+
+
+def add_owned_items(session: Session, owner_id: uuid.UUID, item_ids: Iterable[uuid.UUID]) -> None:
+    """
+    Make newly owned items visible to the owner and their friends.
+    The items and ownership rows must already be flushed.
+    """
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+    viewers = _viewers_of(owner_id).subquery()
+    pairs = (
+        select(viewers.c.user_id.label("viewer_id"), Item.id.label("item_id"))
+        .select_from(viewers)
+        .join(Item, col(Item.id).in_(item_ids))
+        .subquery()
+    )
+    _insert_missing(session, pairs)
+
+
+def remove_owned_items(session: Session, owner_id: uuid.UUID, item_ids: Iterable[uuid.UUID]) -> None:
+    """
+    Drop feed rows that relied on a removed ownership, unless another owner
+    still makes the item visible. Ownership removal must already be flushed.
+    """
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+    session.execute(
+        delete(FeedItem).where(
+            col(FeedItem.item_id).in_(item_ids),
+            col(FeedItem.viewer_id).in_(_viewers_of(owner_id)),
+            ~_still_visible(),
+        )
+    )
+
+
+def link_friends(session: Session, user_id: uuid.UUID, friend_id: uuid.UUID) -> None:
+    """
+    Share each friend's items with the other once a friendship is accepted.
+    """
+    for viewer_id, owner_id in ((user_id, friend_id), (friend_id, user_id)):
+        pairs = (
+            select(literal(viewer_id).label("viewer_id"), UserItem.item_id)
+            .where(UserItem.user_id == owner_id)
+            .subquery()
+        )
+        _insert_missing(session, pairs)
+
+
+def unlink_friends(session: Session, user_id: uuid.UUID, friend_id: uuid.UUID) -> None:
+    """
+    Withdraw each friend's items from the other once a friendship is removed.
+    The friendship deletion must already be flushed.
+    """
+    for viewer_id, owner_id in ((user_id, friend_id), (friend_id, user_id)):
+        session.execute(
+            delete(FeedItem).where(
+                FeedItem.viewer_id == viewer_id,
+                col(FeedItem.item_id).in_(
+                    select(UserItem.item_id).where(UserItem.user_id == owner_id)
+                ),
+                ~_still_visible(),
+            )
+        )
+
+
+def rebuild_feed(session: Session, viewer_id: uuid.UUID | None = None) -> None:
+    """
+    Recompute the feed from ownerships and friendships, for one viewer or everyone.
+    """
+    statement = delete(FeedItem)
+    if viewer_id is not None:
+        statement = statement.where(FeedItem.viewer_id == viewer_id)
+    session.execute(statement)
+    _insert_missing(session, _source_pairs(viewer_id))
+
+
+@dataclass
+class FeedDrift:
+    missing: int
+    stale: int
+
+    @property
+    def consistent(self) -> bool:
+        return self.missing == 0 and self.stale == 0
+
+
+def check_feed(session: Session, viewer_id: uuid.UUID | None = None) -> FeedDrift:
+    """
+    Compare the feed with its source of truth without modifying anything.
+    """
+    source = _source_pairs(viewer_id)
+    source_pairs = select(source.c.viewer_id, source.c.item_id)
+    feed_pairs = select(FeedItem.viewer_id, FeedItem.item_id)
+    if viewer_id is not None:
+        feed_pairs = feed_pairs.where(FeedItem.viewer_id == viewer_id)
+
+    missing = session.exec(
+        select(func.count()).select_from(except_(source_pairs, feed_pairs).subquery())
+    ).one()
+    stale = session.exec(
+        select(func.count()).select_from(except_(feed_pairs, source_pairs).subquery())
+    ).one()
+    return FeedDrift(missing=missing, stale=stale)
@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import struct
+import threading
+import uuid
+from bisect import bisect_left
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import cached_property
+from itertools import chain
+
+from sqlalchemy import Uuid, any_, bindparam, event, union
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, col, or_, select
+
+from app.cache import LRUCache, get_shared_cache
+from app.models import (
+    CommunityMember,
+    CommunityMemberStatus,
+    Friendship,
+    FriendshipStatus,
+)
+
+logger = logging.getLogger(__name__)
+
+GLOBE_CACHE_SIZE = 10_000
+# Upper bound on staleness when a change happened in another process without a shared cache
+GLOBE_TTL = 300
+
+_GENERATION_KEY = "globe:generation"
+
+
+def _contains(ids: Sequence[uuid.UUID], value: uuid.UUID) -> bool:
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+@dataclass(frozen=True)
+class Globe:
+    """
+    A user's social reach: themselves, their friends, and everyone in the
+    communities they or their friends belong to. Ids are kept sorted so
+    membership tests are binary searches and the sets pack into 16 bytes per id.
+    """
+
+    user_ids: tuple[uuid.UUID, ...]
+    community_ids: tuple[uuid.UUID, ...]
+
+    def has_user(self, user_id: uuid.UUID) -> bool:
+        return _contains(self.user_ids, user_id)
+
+    def has_community(self, community_id: uuid.UUID) -> bool:
+        return _contains(self.community_ids, community_id)
+
+    @cached_property
+    def fingerprint(self) -> str:
+        # Users with the same reach see the same search results
+        return hashlib.blake2b(self.pack(), digest_size=16).hexdigest()
+
+    def pack(self) -> bytes:
+        return b"".join(
+            chain(
+                [struct.pack("!I", len(self.user_ids))],
+                (user_id.bytes for user_id in self.user_ids),
+                (community_id.bytes for community_id in self.community_ids),
+            )
+        )
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "Globe":
+        (users,) = struct.unpack_from("!I", data)
+        ids = [uuid.UUID(bytes=data[offset : offset + 16]) for offset in range(4, len(data), 16)]
+        return cls(user_ids=tuple(ids[:users]), community_ids=tuple(ids[users:]))
+
+
+def id_filter(session: Session, column, ids: Sequence[uuid.UUID]):
+    """
+    `column IN ids`. On Postgres the ids travel as a single uuid[] parameter
+    (`= ANY(...)`) instead of one bind parameter each.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        return column == any_(bindparam(None, list(ids), type_=ARRAY(Uuid())))
+    return col(column).in_(ids)
+
+
+def compute_globe(session: Session, user_id: uuid.UUID) -> Globe:
+    friends = select(Friendship.friend_id).where(
+        Friendship.user_id == user_id,
+        Friendship.status == FriendshipStatus.ACCEPTED,
+    )
+    communities = select(CommunityMember.community_id).where(
+        or_(CommunityMember.user_id == user_id, col(CommunityMember.user_id).in_(friends)),
+        CommunityMember.status == CommunityMemberStatus.ACCEPTED,
+    )
+    members = select(CommunityMember.user_id).where(
+        col(CommunityMember.community_id).in_(communities),
+        CommunityMember.status == CommunityMemberStatus.ACCEPTED,
+    )
+    user_ids = set(session.execute(union(friends, members)).scalars().all())
+    user_ids.add(user_id)
+    community_ids = set(session.exec(communities.distinct()).all())
+    return Globe(user_ids=tuple(sorted(user_ids)), community_ids=tuple(sorted(community_ids)))
+
+
+# Any friendship or membership change can reach many globes, so instead of
+# tracking who is affected every cached globe carries the generation it was
+# computed in and a change bumps the generation.
+_local_cache = LRUCache(maxsize=GLOBE_CACHE_SIZE, ttl=GLOBE_TTL)
+_local_generation = 0
+_generation_lock = threading.Lock()
+
+
+def _shared_key(user_id: uuid.UUID) -> str:
+    return f"globe:{user_id}"
+
+
+def get_globe(session: Session, user_id: uuid.UUID) -> Globe:
+    """
+    The user's globe, from the in-process cache, then the shared cache, then the database.
+    """
+    shared = get_shared_cache()
+    generation = _local_generation
+    shared_entry = None
+    if shared is not None:
+        try:
+            shared_generation, shared_entry = shared.mget([_GENERATION_KEY, _shared_key(user_id)])
+            generation = int(shared_generation or 0)
+        except Exception as e:
+            logger.error(f"Shared globe cache unavailable: {e}")
+            shared = None
+
+    cached = _local_cache.get(user_id)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    if shared_entry:
+        (cached_generation,) = struct.unpack_from("!Q", shared_entry)
+        if cached_generation == generation:
+            globe = Globe.unpack(shared_entry[8:])
+            _local_cache.set(user_id, (generation, globe))
+            return globe
+
+    # Computed under the generation read above: if a change lands meanwhile the
+    # entry is already outdated and will not be served
+    globe = compute_globe(session, user_id)
+    _local_cache.set(user_id, (generation, globe))
+    if shared is not None:
+        try:
+            shared.set(_shared_key(user_id), struct.pack("!Q", generation) + globe.pack(), ex=GLOBE_TTL)
+        except Exception as e:
+            logger.error(f"Could not store globe in the shared cache: {e}")
+    return globe
+
+
+def invalidate_globes() -> None:
+    global _local_generation
+    with _generation_lock:
+        _local_generation += 1
+    shared = get_shared_cache()
+    if shared is not None:
+        try:
+            shared.incr(_GENERATION_KEY)
+        except Exception as e:
+            logger.error(f"Could not invalidate shared globes: {e}")
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _note_reach_changes(session: OrmSession, flush_context) -> None:
+    if any(
+        isinstance(obj, Friendship | CommunityMember)
+        for obj in chain(session.new, session.dirty, session.deleted)
+    ):
+        session.info["globe_changed"] = True
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidate_after_commit(session: OrmSession) -> None:
+    # Only once the change is visible, so a concurrent reader cannot cache the old state
+    if session.info.pop("globe_changed", False):
+        invalidate_globes()
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _discard_reach_changes(session: OrmSession) -> None:
+    session.info.pop("globe_changed", None)
@@ -0,0 +1,226 @@
+import csv
+import io
+import json
+import uuid
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import Any, BinaryIO
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlmodel import Session, col, or_, select
+
+from app import feed
+from app.models import (
+    Item,
+    ItemCreate,
+    ItemImportReport,
+    ItemImportRowResult,
+    ItemImportStatus,
+    UserItem,
+    normalize_isbn,
+    normalize_title,
+)
+
+IMPORT_CHUNK_SIZE = 500
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# Columns mapped onto Item; any other column is stored in extra_data
+ITEM_FIELDS = {"title", "description", "author", "item_type", "image_url", "extra_data"}
+
+# (line number, parsed item or None, error message or None)
+ImportRow = tuple[int, ItemCreate | None, str | None]
+
+
+def guess_import_format(filename: str | None, content_type: str | None) -> str | None:
+    filename = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if filename.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if filename.endswith((".jsonl", ".ndjson")) or content_type in (
+        "application/jsonl",
+        "application/x-ndjson",
+    ):
+        return "jsonl"
+    return None
+
+
+def _error_message(exc: ValueError) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in exc.errors()
+        )
+    return str(exc)
+
+
+def _to_item_create(record: dict[str, Any]) -> ItemCreate:
+    fields: dict[str, Any] = {}
+    extra_data: dict[str, Any] = {}
+    for key, value in record.items():
+        if key is None or value is None or value == "":
+            continue
+        key = key.strip()
+        if key in ITEM_FIELDS:
+            fields[key] = value
+        else:
+            extra_data[key] = value
+
+    raw_extra = fields.pop("extra_data", None)
+    if isinstance(raw_extra, str):
+        # CSV cells can carry a JSON object
+        raw_extra = json.loads(raw_extra)
+    if raw_extra is not None and not isinstance(raw_extra, dict):
+        raise ValueError("extra_data must be an object")
+
+    title = str(fields.get("title") or "").strip()
+    if not title:
+        raise ValueError("title is required")
+    fields["title"] = title
+    fields["item_type"] = str(fields.get("item_type") or "general").lower()
+    return ItemCreate.model_validate({**fields, "extra_data": {**(raw_extra or {}), **extra_data}})
+
+
+def read_import_rows(stream: BinaryIO, fmt: str) -> Iterator[ImportRow]:
+    """
+    Lazily parse an uploaded CSV (with a header row) or JSON Lines file.
+    Rows are numbered by the line they end on.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    line = 0
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            for record in reader:
+                line = reader.line_num
+                try:
+                    yield line, _to_item_create(record), None
+                except ValueError as exc:
+                    yield line, None, _error_message(exc)
+        else:
+            for line, raw in enumerate(text, start=1):
+                if not raw.strip():
+                    continue
+                try:
+                    record = json.loads(raw)
+                    if not isinstance(record, dict):
+                        raise ValueError("each line must be a JSON object")
+                    yield line, _to_item_create(record), None
+                except ValueError as exc:
+                    yield line, None, _error_message(exc)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        # The rest of the file cannot be read reliably
+        yield line + 1, None, f"could not parse file: {exc}"
+    finally:
+        text.detach()
+
+
+def _dedup_keys(item_type: Any, title: str, extra_data: dict | None) -> list[tuple]:
+    keys = [(item_type, "title", normalize_title(title))]
+    isbn = normalize_isbn((extra_data or {}).get("isbn"))
+    if isbn:
+        # Checked first: an ISBN match wins over a title match
+        keys.insert(0, (item_type, "isbn", isbn))
+    return keys
+
+
+def _import_chunk(
+    session: Session, owner_id: uuid.UUID, chunk: list[ImportRow]
+) -> list[ItemImportRowResult]:
+    row_keys = {
+        line: _dedup_keys(item_in.item_type, item_in.title, item_in.extra_data)
+        for line, item_in, _ in chunk
+        if item_in
+    }
+    titles = {value for keys in row_keys.values() for _, kind, value in keys if kind == "title"}
+    isbns = {value for keys in row_keys.values() for _, kind, value in keys if kind == "isbn"}
+
+    # Every existing entry the chunk could match, by either dedup key
+    known: dict[tuple, Item] = {}
+    if row_keys:
+        for item in session.exec(
+            select(Item).where(
+                or_(col(Item.normalized_title).in_(titles), col(Item.isbn).in_(isbns))
+            )
+        ):
+            known.setdefault((item.item_type, "isbn", item.isbn), item)
+            known.setdefault((item.item_type, "title", item.normalized_title), item)
+    existing = {item.id: item for item in known.values()}
+
+    owned = set()
+    if existing:
+        owned = set(
+            session.exec(
+                select(UserItem.item_id).where(
+                    UserItem.user_id == owner_id,
+                    col(UserItem.item_id).in_(existing),
+                )
+            ).all()
+        )
+
+    results = []
+    created: list[Item] = []
+    attached: list[Item] = []
+    for line, item_in, error in chunk:
+        if item_in is None:
+            results.append(
+                ItemImportRowResult(row=line, status=ItemImportStatus.error, detail=error)
+            )
+            continue
+
+        keys = row_keys[line]
+        item = next((known[key] for key in keys if key in known), None)
+        if item is None:
+            item = Item.model_validate(item_in, update={"count": 1})
+            created.append(item)
+            for key in keys:
+                known[key] = item
+            status = ItemImportStatus.created
+        elif item.id in owned:
+            status = ItemImportStatus.already_owned
+        else:
+            # Same rule as create_item: attach the owner and bump the count
+            item.count += 1
+            if not item.image_url and item_in.image_url:
+                item.image_url = item_in.image_url
+            attached.append(item)
+            status = ItemImportStatus.attached
+        owned.add(item.id)
+        results.append(ItemImportRowResult(row=line, status=status, item_id=item.id))
+
+    new_owned = [*created, *attached]
+    if new_owned:
+        session.add_all(created)
+        session.flush()
+        session.execute(
+            insert(UserItem), [{"user_id": owner_id, "item_id": item.id} for item in new_owned]
+        )
+        feed.add_owned_items(session, owner_id, [item.id for item in new_owned])
+    # The search outbox picks the new and attached items up in this transaction
+    session.commit()
+    return results
+
+
+def import_items(
+    session: Session,
+    owner_id: uuid.UUID,
+    rows: Iterable[ImportRow],
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> ItemImportReport:
+    """
+    Import parsed rows for one owner, committing one chunk at a time.
+    """
+    report = ItemImportReport()
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        for result in _import_chunk(session, owner_id, chunk):
+            if result.status == ItemImportStatus.created:
+                report.created += 1
+            elif result.status == ItemImportStatus.attached:
+                report.attached += 1
+            elif result.status == ItemImportStatus.already_owned:
+                report.already_owned += 1
+            else:
+                report.errors += 1
+            report.rows.append(result)
+    return report
@@ -1,10 +1,23 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 import sentry_sdk
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
+from app.api.etag import ETagMiddleware
 from app.api.main import api_router
+from app.api.websocket_manager import notification_manager
 from app.core.config import settings
+from app.search import close_async_client, reconcile_index_settings
+from app.search_outbox import run_outbox_worker
+
+
+logger = logging.getLogger(__name__)
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
@@ -14,12 +27,43 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
     sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
 
+
+async def _reconcile_search_settings() -> None:
+    # In the background: an unreachable Meilisearch must not hold up startup
+    try:
+        await asyncio.to_thread(reconcile_index_settings)
+    except Exception as e:
+        logger.error(f"Could not reconcile search index settings: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    worker = asyncio.create_task(run_outbox_worker()) if settings.SEARCH_OUTBOX_WORKER else None
+    reconcile = (
+        asyncio.create_task(_reconcile_search_settings())
+        if settings.SEARCH_RECONCILE_SETTINGS
+        else None
+    )
+    await notification_manager.start()
+    yield
+    await notification_manager.stop()
+    if reconcile:
+        reconcile.cancel()
+    if worker:
+        worker.cancel()
+    await close_async_client()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+app.add_middleware(ETagMiddleware)
+
 # Set all CORS enabled origins
 if settings.all_cors_origins:
     print(f"DEBUG: Allowed CORS origins: {settings.all_cors_origins}")
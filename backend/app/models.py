@@ -1,11 +1,13 @@
 from datetime import datetime, timezone
 from enum import Enum
+import re
 import uuid
 
 from pydantic import EmailStr, field_validator
-from sqlalchemy import Column, JSON, DateTime, func
+from sqlalchemy import BigInteger, Column, Integer, JSON, DateTime, Index, Text, event, func, literal_column, update
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlmodel import Field, Relationship, SQLModel
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Field, Relationship, SQLModel, col
 
 
 # Enums
@@ -32,6 +34,13 @@ class ItemType(str, Enum):
     book = "book"
 
 
+class ItemImportStatus(str, Enum):
+    created = "created"
+    attached = "attached"
+    already_owned = "already_owned"
+    error = "error"
+
+
 class CollectionType(str, Enum):
     GENERAL = "general"
     LIBRARY = "library"
@@ -111,6 +120,39 @@ class UserItem(SQLModel, table=True):
     item_id: uuid.UUID = Field(foreign_key="item.id", primary_key=True, ondelete="CASCADE")
 
 
+# Denormalized visibility index: one row per item a viewer sees in their feed
+# (their own items and their friends' items). Maintained by app.feed.
+class FeedItem(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_feeditem_viewer_id_created_at", "viewer_id", "created_at", "item_id"),
+    )
+
+    viewer_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True, ondelete="CASCADE")
+    item_id: uuid.UUID = Field(foreign_key="item.id", primary_key=True, ondelete="CASCADE")
+    created_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+
+
+# Transactional outbox for the search index: writes record which documents
+# changed in their own transaction, app.search_outbox pushes them to Meilisearch
+class SearchOutbox(SQLModel, table=True):
+    id: int | None = Field(
+        default=None,
+        sa_column=Column(BigInteger().with_variant(Integer(), "sqlite"), primary_key=True),
+    )
+    index_name: str = Field(max_length=50)
+    document_id: uuid.UUID
+    attempts: int = Field(default=0)
+    created_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
+    # Pushes are retried with backoff by moving this forward
+    available_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
+
+
 # Support Models
 class UserSettingsSchema(SQLModel):
     autocomplete_enabled: bool = Field(default=True)
@@ -273,6 +315,10 @@ class User(UserBase, table=True):
     public_id: str | None = Field(default=None, unique=True, index=True, max_length=8)
     hashed_password: str
     has_set_password: bool = Field(default=True)
+    updated_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
     items: list["Item"] = Relationship(back_populates="owners", link_model=UserItem)
     collections: list["Collection"] = Relationship(back_populates="owner")
     communities: list["Community"] = Relationship(
@@ -311,6 +357,10 @@ class CommunityUpdate(SQLModel):
 class Community(CommunityBase, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     created_by: uuid.UUID = Field(foreign_key="user.id", nullable=False, ondelete="CASCADE")
+    updated_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
     members: list["User"] = Relationship(
         back_populates="communities", link_model=CommunityMember
     )
@@ -367,6 +417,10 @@ class Collection(CollectionBase, table=True):
         default=None,
         sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     )
+    updated_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
     items: list["Item"] = Relationship(link_model=CollectionItem)
     owner: User = Relationship(back_populates="collections")
 
@@ -377,25 +431,135 @@ class ItemBase(SQLModel):
     author: str | None = Field(default=None, max_length=255)
     item_type: ItemType = Field(default=ItemType.general)
     image_url: str | None = Field(default=None, max_length=512)
-    extra_data: dict = Field(default={}, sa_column=Column(JSON))
+    # JSONB so filters can use containment (@>) and the GIN / expression indexes
+    extra_data: dict = Field(
+        default={}, sa_column=Column(JSONB().with_variant(JSON(), "sqlite"))
+    )
     community_owner_id: uuid.UUID | None = Field(
         default=None, foreign_key="community.id", ondelete="CASCADE"
     )
 
 
 class Item(ItemBase, table=True):
+    __table_args__ = (
+        Index("ix_item_item_type_normalized_title", "item_type", "normalized_title", unique=True),
+        Index("ix_item_item_type_isbn", "item_type", "isbn", unique=True),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     title: str = Field(max_length=255, index=True)
+    # Dedup keys, derived from title and extra_data["isbn"] on every write
+    normalized_title: str = Field(default="", max_length=255)
+    isbn: str | None = Field(default=None, max_length=13)
     count: int = Field(default=1)
     created_at: datetime | None = Field(
         default=None,
         sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     )
+    updated_at: datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    )
     owners: list["User"] = Relationship(back_populates="items", link_model=UserItem)
     communities: list["Community"] = Relationship(back_populates="items", link_model=CommunityItem)
     loans: list["Loan"] = Relationship(back_populates="item")
 
 
+def normalize_title(title: str) -> str:
+    return " ".join(title.split()).lower()
+
+
+def extra_data_text(key: str):
+    # Inline the key so the expression matches the (extra_data ->> '<key>') indexes
+    return col(Item.extra_data).op("->>", return_type=Text)(literal_column(f"'{key}'"))
+
+
+def normalize_isbn(value: object) -> str | None:
+    """
+    Canonical ISBN-13 for an ISBN-10 or ISBN-13 in any formatting, None if it is neither.
+    """
+    if not value:
+        return None
+    digits = re.sub(r"[^0-9X]", "", str(value).upper())
+    if len(digits) == 10 and digits[:9].isdigit():
+        digits = "978" + digits[:9]
+        total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits))
+        return digits + str((10 - total % 10) % 10)
+    if len(digits) == 13 and digits.isdigit():
+        return digits
+    return None
+
+
+@event.listens_for(Item, "before_insert")
+@event.listens_for(Item, "before_update")
+def _set_item_dedup_keys(mapper, connection, target: Item) -> None:
+    target.normalized_title = normalize_title(target.title)
+    target.isbn = normalize_isbn((target.extra_data or {}).get("isbn"))
+
+
+# Versioned rows: updated_at moves whenever the row, or a row that changes how
+# it is serialized, is written through the ORM. ETags are derived from it.
+VERSIONED_MODELS = (User, Community, Collection, Item)
+
+# Link model -> (versioned model, foreign key) pairs it touches
+_VERSION_PARENTS: dict[type, tuple[tuple[type, str], ...]] = {
+    UserItem: ((Item, "item_id"),),
+    CommunityItem: ((Item, "item_id"),),
+    Loan: ((Item, "item_id"),),
+    CollectionItem: ((Collection, "collection_id"),),
+    CommunityMember: ((Community, "community_id"), (User, "user_id")),
+    Friendship: ((User, "user_id"), (User, "friend_id")),
+    UserInterest: ((User, "user_id"),),
+    UserProfile: ((User, "user_id"),),
+}
+
+
+@event.listens_for(OrmSession, "before_flush")
+def _touch_versioned_rows(session: OrmSession, flush_context, instances) -> None:
+    now = datetime.now(timezone.utc)
+    touched: dict[type, set[uuid.UUID]] = {}
+    for obj in session.dirty:
+        if isinstance(obj, VERSIONED_MODELS) and session.is_modified(obj):
+            obj.updated_at = now
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        for model, key in _VERSION_PARENTS.get(type(obj), ()):
+            if parent_id := getattr(obj, key):
+                touched.setdefault(model, set()).add(parent_id)
+    for model, ids in touched.items():
+        session.execute(
+            update(model)
+            .where(model.id.in_(ids))
+            .values(updated_at=now)
+            .execution_options(synchronize_session=False)
+        )
+
+
+# Search indexes fed from each model
+SEARCH_INDEXES: dict[type, str] = {Item: "items", Community: "communities"}
+
+# Link models whose rows are part of an indexed document (filterable owner and
+# community ids, availability): (index, foreign key of the document)
+_SEARCH_LINKS: dict[type, tuple[str, str]] = {
+    UserItem: ("items", "item_id"),
+    CommunityItem: ("items", "item_id"),
+    Loan: ("items", "item_id"),
+}
+
+
+@event.listens_for(OrmSession, "before_flush")
+def _record_search_changes(session: OrmSession, flush_context, instances) -> None:
+    changed: set[tuple[str, uuid.UUID]] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if index_name := SEARCH_INDEXES.get(type(obj)):
+            changed.add((index_name, obj.id))
+        elif link := _SEARCH_LINKS.get(type(obj)):
+            index_name, key = link
+            changed.add((index_name, getattr(obj, key)))
+    for index_name, document_id in changed:
+        session.add(SearchOutbox(index_name=index_name, document_id=document_id))
+
+
 # API Models (Public)
 class InterestPublic(SQLModel):
     id: uuid.UUID
@@ -435,7 +599,8 @@ class CommunityAnnouncementPublic(CommunityAnnouncementBase):
 
 class CommunityAnnouncementsPublic(SQLModel):
     data: list[CommunityAnnouncementPublic]
-    count: int
+    count: int | None
+    count_estimated: bool = False
 
 
 class CommunityMessageBase(SQLModel):
@@ -456,12 +621,15 @@ class CommunityMessagePublic(CommunityMessageBase):
 
 class CommunityMessagesPublic(SQLModel):
     data: list[CommunityMessagePublic]
-    count: int
+    count: int | None
+    count_estimated: bool = False
+    next_cursor: str | None = None
 
 
 class CommunitiesPublic(SQLModel):
     data: list[CommunityPublic]
-    count: int
+    count: int | None
+    count_estimated: bool = False
 
 
 class UserPublic(UserBase):
@@ -491,7 +659,8 @@ class FriendshipPublic(SQLModel):
 
 class UsersPublic(SQLModel):
     data: list[UserPublic]
-    count: int
+    count: int | None
+    count_estimated: bool = False
 
 
 class CollectionCreate(CollectionBase):
@@ -512,7 +681,8 @@ class CollectionPublic(CollectionBase):
 
 class CollectionsPublic(SQLModel):
     data: list[CollectionPublic]
-    count: int
+    count: int | None
+    count_estimated: bool = False
 
 
 class ItemCreate(ItemBase):
@@ -557,12 +727,44 @@ class BookPublic(ItemPublic):
 
 class BooksPublic(SQLModel):
     data: list[BookPublic]
-    count: int
+    count: int | None
+    count_estimated: bool = False
 
 
 class ItemsPublic(SQLModel):
     data: list[ItemPublic]
-    count: int
+    count: int | None
+    count_estimated: bool = False
+    next_cursor: str | None = None
+
+
+class ItemImportRowResult(SQLModel):
+    row: int
+    status: ItemImportStatus
+    item_id: uuid.UUID | None = None
+    detail: str | None = None
+
+
+class ItemImportReport(SQLModel):
+    created: int = 0
+    attached: int = 0
+    already_owned: int = 0
+    errors: int = 0
+    rows: list[ItemImportRowResult] = []
+
+
+class SearchIndexLag(SQLModel):
+    pending: int
+    failing: int
+    # Age of the oldest change not yet in the index
+    lag_seconds: float
+
+
+class SearchCacheStats(SQLModel):
+    name: str
+    size: int
+    hits: int
+    misses: int
 
 
 class LoanCreate(SQLModel):
@@ -590,7 +792,9 @@ class LoanPublic(SQLModel):
 
 class LoansPublic(SQLModel):
     data: list[LoanPublic]
-    count: int
+    count: int | None
+    count_estimated: bool = False
+    next_cursor: str | None = None
 
 
 class NotificationPublic(SQLModel):
@@ -605,67 +809,30 @@ class NotificationPublic(SQLModel):
 
 class NotificationsPublic(SQLModel):
     data: list[NotificationPublic]
-    count: int
+    count: int | None
+    count_estimated: bool = False
     unread_count: int
+    next_cursor: str | None = None
 
 
 class SearchResults(SQLModel):
     users: list[UserPublic]
     items: list[ItemPublic]
     communities: list[CommunityPublic]
+    # Sections left out because their sub-search failed or timed out
+    incomplete: list[str] = []
+    # Item matches per facet value (item_type, category, genre, available), on request
+    facets: dict[str, dict[str, int]] = {}
 
 
-class Message(SQLModel):
-    message: str
-
-
-class Token(SQLModel):
-    access_token: str
-    token_type: str = "bearer"
-
-
-class TokenPayload(SQLModel):
-    sub: str | None = None
-
-
-class NewPassword(SQLModel):
-    token: str
-    new_password: str = Field(min_length=8, max_length=40)
-
-class BookPublic(ItemPublic):
-    pass
-
-
-class BooksPublic(SQLModel):
-    data: list[BookPublic]
-    count: int
-
-
-class ItemsPublic(SQLModel):
-    data: list[ItemPublic]
-    count: int
-
-
-class NotificationPublic(SQLModel):
+class SearchSuggestion(SQLModel):
     id: uuid.UUID
-    title: str
-    message: str
-    type: NotificationType
-    is_read: bool
-    link: str | None
-    created_at: datetime
-
-
-class NotificationsPublic(SQLModel):
-    data: list[NotificationPublic]
-    count: int
-    unread_count: int
+    label: str
 
 
-class SearchResults(SQLModel):
-    users: list[UserPublic]
-    items: list[ItemPublic]
-    communities: list[CommunityPublic]
+class SearchSuggestions(SQLModel):
+    items: list[SearchSuggestion] = []
+    communities: list[SearchSuggestion] = []
 
 
 class Message(SQLModel):
@@ -683,4 +850,4 @@ class TokenPayload(SQLModel):
 
 class NewPassword(SQLModel):
     token: str
-    new_password: str = Field(min_length=8, max_length=40)
\ No newline at end of file
+    new_password: str = Field(min_length=8, max_length=40)
@@ -1,41 +1,207 @@
+import logging
 import uuid
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import httpx
 import meilisearch
+from meilisearch.errors import MeilisearchApiError
+from sqlmodel import Session, col, select
+
+from app.availability import get_any_copy_availability
 from app.core.config import settings
-from app.models import Item, Community
+from app.models import Community, CommunityItem, Item, UserItem
+
+logger = logging.getLogger(__name__)
 
 client = meilisearch.Client(settings.MEILI_URL, settings.MEILI_MASTER_KEY)
 
-def sync_item_to_search(item: Item):
-    index = client.index("items")
-    document = {
+_TYPO_TOLERANCE = {
+    "enabled": True,
+    "minWordSizeForTypos": {
+        "oneTypo": 4,
+        "twoTypos": 8
+    }
+}
+
+# Wanted settings of each index, applied by reconcile_index_settings
+INDEX_SETTINGS: dict[str, dict[str, Any]] = {
+    "items": {
+        "searchableAttributes": [
+            "title",
+            "author",
+            "description",
+            "item_type"
+        ],
+        # owner_ids / community_ids carry the visibility filter sent by /search/
+        # and the facets of item search
+        "filterableAttributes": [
+            "available",
+            "category",
+            "community_ids",
+            "created_at",
+            "genre",
+            "item_type",
+            "owner_ids"
+        ],
+        "sortableAttributes": [
+            "available",
+            "created_at",
+            "item_type"
+        ],
+        "typoTolerance": _TYPO_TOLERANCE,
+        "rankingRules": [
+            "words",
+            "typo",
+            "proximity",
+            "attribute",
+            "sort",
+            "exactness"
+        ]
+    },
+    "communities": {
+        "searchableAttributes": [
+            "name",
+            "description"
+        ],
+        "typoTolerance": _TYPO_TOLERANCE
+    },
+}
+
+# Async client for the search path, so sub-searches can run concurrently
+_async_client: httpx.AsyncClient | None = None
+
+def get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            base_url=settings.MEILI_URL,
+            headers={"Authorization": f"Bearer {settings.MEILI_MASTER_KEY}"},
+        )
+    return _async_client
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+async def search_index(index_name: str, query: str, params: dict, timeout: float) -> dict:
+    response = await get_async_client().post(
+        f"/indexes/{index_name}/search", json={"q": query, **params}, timeout=timeout
+    )
+    response.raise_for_status()
+    return response.json()
+
+def wait_for_task(meili: meilisearch.Client, task_uid: int, timeout_in_ms: int) -> None:
+    """
+    Block until Meilisearch has processed a task; raise unless it succeeded.
+    """
+    task = meili.wait_for_task(task_uid, timeout_in_ms=timeout_in_ms)
+    if task.status != "succeeded":
+        raise RuntimeError(f"Meilisearch task {task_uid} {task.status}: {task.error}")
+
+
+def _applied(wanted: Any, live: Any) -> bool:
+    # Live settings come back complete; only the keys we set are compared
+    if isinstance(wanted, dict):
+        return isinstance(live, dict) and all(_applied(value, live.get(key)) for key, value in wanted.items())
+    return wanted == live
+
+
+def reconcile_index_settings() -> list[str]:
+    """
+    Bring every index's settings in line with INDEX_SETTINGS and return the names
+    of the indexes that were updated. Settings already in place are not pushed
+    again, so running this at each startup does not trigger reindexing.
+    """
+    updated = []
+    for index_name, wanted in INDEX_SETTINGS.items():
+        index = client.index(index_name)
+        try:
+            live = index.get_settings()
+        except MeilisearchApiError:
+            # Not created yet: updating the settings creates it
+            live = {}
+        changed = {key: value for key, value in wanted.items() if not _applied(value, live.get(key))}
+        if changed:
+            index.update_settings(changed)
+            updated.append(index_name)
+            logger.info(f"Updated search settings of {index_name}: {sorted(changed)}")
+    return updated
+
+def _extra_text(extra_data: dict | None, key: str) -> str | None:
+    value = (extra_data or {}).get(key)
+    return None if value is None else str(value)
+
+def item_document(
+    item: Item,
+    owner_ids: Iterable[uuid.UUID],
+    community_ids: Iterable[uuid.UUID],
+    available: bool,
+) -> dict:
+    return {
         "id": str(item.id),
         "title": item.title,
         "description": item.description,
         "author": item.author,
         "item_type": str(item.item_type.value) if hasattr(item.item_type, 'value') else str(item.item_type),
+        # Filterable: searches only return items owned or pooled within the searcher's globe
+        "owner_ids": sorted(str(owner_id) for owner_id in owner_ids),
+        "community_ids": sorted(str(community_id) for community_id in community_ids),
+        # Filterable and sortable; a timestamp so range filters work
+        "created_at": int(item.created_at.timestamp()) if item.created_at else None,
+        "available": available,
+        # Facets, from the same metadata keys read_items filters on
+        "category": _extra_text(item.extra_data, "category"),
+        "genre": _extra_text(item.extra_data, "genre"),
     }
-    index.add_documents([document])
 
-def delete_item_from_search(item_id: uuid.UUID):
-    index = client.index("items")
-    index.delete_document(str(item_id))
+def item_documents(session: Session, items: Sequence[Item]) -> list[dict]:
+    # Owner and community ids for the whole batch in two queries
+    item_ids = [item.id for item in items]
+    owners: dict[uuid.UUID, set[uuid.UUID]] = {}
+    communities: dict[uuid.UUID, set[uuid.UUID]] = {}
+    if item_ids:
+        for item_id, user_id in session.exec(
+            select(UserItem.item_id, UserItem.user_id).where(col(UserItem.item_id).in_(item_ids))
+        ):
+            owners.setdefault(item_id, set()).add(user_id)
+        for item_id, community_id in session.exec(
+            select(CommunityItem.item_id, CommunityItem.community_id).where(
+                col(CommunityItem.item_id).in_(item_ids)
+            )
+        ):
+            communities.setdefault(item_id, set()).add(community_id)
+    available = get_any_copy_availability(
+        session, {item_id: owners.get(item_id, ()) for item_id in item_ids}
+    )
+    return [
+        item_document(
+            item, owners.get(item.id, ()), communities.get(item.id, ()), available[item.id]
+        )
+        for item in items
+    ]
+
+def visibility_filter(user_ids: Iterable[uuid.UUID], community_ids: Iterable[uuid.UUID]) -> str:
+    """
+    Meilisearch filter matching items owned by one of `user_ids` or pooled in one of `community_ids`.
+    """
+    def ids(values: Iterable[uuid.UUID]) -> str:
+        return ", ".join(f'"{value}"' for value in values)
+
+    clauses = [f"owner_ids IN [{ids(user_ids)}]"]
+    community_ids = list(community_ids)
+    if community_ids:
+        clauses.append(f"community_ids IN [{ids(community_ids)}]")
+    return " OR ".join(clauses)
 
-def sync_community_to_search(community: Community):
-    index = client.index("communities")
-    document = {
+def community_document(community: Community) -> dict:
+    return {
         "id": str(community.id),
         "name": community.name,
         "description": community.description,
     }
-    index.add_documents([document])
-
-def delete_community_from_search(community_id: uuid.UUID):
-    index = client.index("communities")
-    index.delete_document(str(community_id))
-
-# Aliases for compatibility if needed
-def sync_book_to_search(book: Item):
-    sync_item_to_search(book)
 
-def delete_book_from_search(book_id: uuid.UUID):
-    delete_item_from_search(book_id)
+def community_documents(session: Session, communities: Sequence[Community]) -> list[dict]:
+    return [community_document(community) for community in communities]
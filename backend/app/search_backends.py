@@ -0,0 +1,329 @@
+import logging
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, Protocol
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Float, String, cast, literal_column, union_all
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.engine import Connection, Engine
+from sqlmodel import Session, col, exists, func, or_, select
+
+from app.availability import available_clause
+from app.core.config import settings
+from app.globe import Globe, id_filter
+from app.models import (
+    Community,
+    CommunityItem,
+    Item,
+    ItemType,
+    UserItem,
+    extra_data_text,
+)
+from app.search import search_index, visibility_filter
+
+logger = logging.getLogger(__name__)
+
+# Meilisearch gets part of a search phase's budget, leaving room for a fallback
+MEILI_SEARCH_TIMEOUT = 1.0
+MEILI_SUGGEST_TIMEOUT = 0.15
+# Text search configuration of the search_vector columns (see migration 7b1e4d9a2c55)
+TS_CONFIG = "simple"
+# Facet counts returned with item hits when asked for
+ITEM_FACETS = ["item_type", "category", "genre", "available"]
+
+
+async def run_in_session(bind: Engine | Connection, function: Callable[..., Any], *args: Any) -> Any:
+    # A session of its own so concurrent searches can run on separate threads
+    def run() -> Any:
+        with Session(bind) as session:
+            return function(session, *args)
+
+    return await run_in_threadpool(run)
+
+
+@dataclass(frozen=True)
+class ItemFilters:
+    """
+    Narrowing and ordering of item searches, applied inside the search engine.
+    """
+
+    item_type: ItemType | None = None
+    category: str | None = None
+    genre: str | None = None
+    available: bool | None = None
+    # Newest first instead of by relevance
+    newest: bool = False
+    # Also count the matches per ITEM_FACETS value
+    facets: bool = False
+
+    def meilisearch_filter(self) -> list[str]:
+        def quoted(value: str) -> str:
+            return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+        clauses = []
+        if self.item_type is not None:
+            clauses.append(f"item_type = {quoted(self.item_type.value)}")
+        if self.category is not None:
+            clauses.append(f"category = {quoted(self.category)}")
+        if self.genre is not None:
+            clauses.append(f"genre = {quoted(self.genre)}")
+        if self.available is not None:
+            clauses.append(f"available = {str(self.available).lower()}")
+        return clauses
+
+
+@dataclass
+class ItemHits:
+    ids: list[uuid.UUID]
+    # Facet -> value -> number of matching items, when ItemFilters.facets is set
+    facets: dict[str, dict[str, int]] = field(default_factory=dict)
+
+
+class SearchBackend(Protocol):
+    """
+    Full-text search over items (with facet counts) and communities, returning
+    ids best match first, and prefix suggestions as {"id", "label"} dicts.
+    """
+
+    name: str
+
+    async def search_items(
+        self, bind: Engine | Connection, q: str, limit: int, globe: Globe, filters: ItemFilters
+    ) -> ItemHits: ...
+
+    async def search_communities(
+        self, bind: Engine | Connection, q: str, limit: int
+    ) -> list[uuid.UUID]: ...
+
+    async def suggest_items(
+        self, bind: Engine | Connection, q: str, limit: int, globe: Globe
+    ) -> list[dict]: ...
+
+    async def suggest_communities(
+        self, bind: Engine | Connection, q: str, limit: int
+    ) -> list[dict]: ...
+
+
+class MeilisearchBackend:
+    name = "meilisearch"
+
+    async def search_items(
+        self, bind: Engine | Connection, q: str, limit: int, globe: Globe, filters: ItemFilters
+    ) -> ItemHits:
+        # Visible items are owned by someone in the globe or pooled in one of its communities
+        params = {
+            "limit": limit,
+            "attributesToSearchOn": ["title", "author", "description"],
+            # Filters in a list are ANDed
+            "filter": [visibility_filter(globe.user_ids, globe.community_ids), *filters.meilisearch_filter()],
+        }
+        if filters.newest:
+            params["sort"] = ["created_at:desc"]
+        if filters.facets:
+            params["facets"] = ITEM_FACETS
+        response = await search_index("items", q, params, timeout=MEILI_SEARCH_TIMEOUT)
+        return ItemHits(
+            ids=[uuid.UUID(hit["id"]) for hit in response["hits"]],
+            facets=response.get("facetDistribution", {}),
+        )
+
+    async def search_communities(
+        self, bind: Engine | Connection, q: str, limit: int
+    ) -> list[uuid.UUID]:
+        response = await search_index("communities", q, {
+            "limit": limit,
+            "attributesToSearchOn": ["name", "description"],
+        }, timeout=MEILI_SEARCH_TIMEOUT)
+        return [uuid.UUID(hit["id"]) for hit in response["hits"]]
+
+    async def suggest_items(
+        self, bind: Engine | Connection, q: str, limit: int, globe: Globe
+    ) -> list[dict]:
+        # Meilisearch prefix-matches the last word; only the label comes back
+        response = await search_index("items", q, {
+            "limit": limit,
+            "attributesToSearchOn": ["title"],
+            "attributesToRetrieve": ["id", "title"],
+            "filter": visibility_filter(globe.user_ids, globe.community_ids),
+        }, timeout=MEILI_SUGGEST_TIMEOUT)
+        return [{"id": hit["id"], "label": hit["title"]} for hit in response["hits"]]
+
+    async def suggest_communities(
+        self, bind: Engine | Connection, q: str, limit: int
+    ) -> list[dict]:
+        response = await search_index("communities", q, {
+            "limit": limit,
+            "attributesToSearchOn": ["name"],
+            "attributesToRetrieve": ["id", "name"],
+        }, timeout=MEILI_SUGGEST_TIMEOUT)
+        return [{"id": hit["id"], "label": hit["name"]} for hit in response["hits"]]
+
+
+def _visible_items(session: Session, globe: Globe):
+    return or_(
+        exists().where(
+            UserItem.item_id == Item.id,
+            id_filter(session, UserItem.user_id, globe.user_ids),
+        ),
+        exists().where(
+            CommunityItem.item_id == Item.id,
+            id_filter(session, CommunityItem.community_id, globe.community_ids),
+        ),
+    )
+
+
+def _ranked(session: Session, model, name_column, q: str):
+    """
+    (match, rank) for `model` against `q`: its weighted search_vector matches the
+    query's words, or `name_column` is trigram-similar to it, which catches typos.
+    Off Postgres this degrades to an unranked substring match.
+    """
+    if session.get_bind().dialect.name != "postgresql":
+        return col(name_column).ilike(f"%{q}%"), None
+    vector = literal_column(f"{model.__tablename__}.search_vector", type_=TSVECTOR)
+    query = func.websearch_to_tsquery(literal_column(f"'{TS_CONFIG}'"), q)
+    match = or_(vector.op("@@")(query), col(name_column).op("%")(q))
+    rank = func.ts_rank_cd(vector, query, type_=Float) + func.similarity(name_column, q)
+    return match, rank
+
+
+def item_facets_sql(session: Session, conditions: list) -> dict[str, dict[str, int]]:
+    """
+    Matches per value of each of ITEM_FACETS among items meeting `conditions`,
+    in one statement: the matches are computed once and grouped per facet.
+    """
+    matched = select(
+        cast(Item.item_type, String).label("item_type"),
+        extra_data_text("category").label("category"),
+        extra_data_text("genre").label("genre"),
+        available_clause().label("available"),
+    ).where(*conditions).cte("matched")
+    counts = union_all(*(
+        select(literal_column(f"'{facet}'").label("facet"), cast(matched.c[facet], String).label("value"), func.count())
+        .where(matched.c[facet].is_not(None))
+        .group_by(matched.c[facet])
+        for facet in ITEM_FACETS
+    ))
+    facets: dict[str, dict[str, int]] = {facet: {} for facet in ITEM_FACETS}
+    for facet, value, count in session.execute(counts):
+        if facet == "available":
+            # Keyed like Meilisearch's boolean facets
+            value = "true" if value in ("true", "1") else "false"
+        facets[facet][value] = count
+    return facets
+
+
+def search_items_sql(
+    session: Session, q: str, limit: int, globe: Globe, filters: ItemFilters
+) -> ItemHits:
+    match, rank = _ranked(session, Item, Item.title, q)
+    conditions = [match, _visible_items(session, globe)]
+    if filters.item_type is not None:
+        conditions.append(Item.item_type == filters.item_type)
+    if filters.category is not None:
+        conditions.append(extra_data_text("category") == filters.category)
+    if filters.genre is not None:
+        conditions.append(extra_data_text("genre") == filters.genre)
+    if filters.available is not None:
+        conditions.append(available_clause() if filters.available else ~available_clause())
+
+    statement = select(Item.id).where(*conditions).limit(limit)
+    if filters.newest:
+        statement = statement.order_by(col(Item.created_at).desc())
+    elif rank is not None:
+        statement = statement.order_by(rank.desc())
+    return ItemHits(
+        ids=list(session.exec(statement).all()),
+        facets=item_facets_sql(session, conditions) if filters.facets else {},
+    )
+
+
+def search_communities_sql(session: Session, q: str, limit: int) -> list[uuid.UUID]:
+    match, rank = _ranked(session, Community, Community.name, q)
+    statement = select(Community.id).where(match).limit(limit)
+    if rank is not None:
+        statement = statement.order_by(rank.desc())
+    return list(session.exec(statement).all())
+
+
+def _prefix_match(column, q: str):
+    # Served by the trigram index; LIKE wildcards in q are matched literally
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return col(column).ilike(f"{escaped}%", escape="\\")
+
+
+def suggest_items_sql(session: Session, q: str, limit: int, globe: Globe) -> list[dict]:
+    # Ordered by the btree title index, so short prefixes stop after `limit` matches
+    rows = session.exec(
+        select(Item.id, Item.title)
+        .where(_prefix_match(Item.title, q), _visible_items(session, globe))
+        .order_by(Item.title)
+        .limit(limit)
+    ).all()
+    return [{"id": str(item_id), "label": title} for item_id, title in rows]
+
+
+def suggest_communities_sql(session: Session, q: str, limit: int) -> list[dict]:
+    rows = session.exec(
+        select(Community.id, Community.name)
+        .where(_prefix_match(Community.name, q))
+        .order_by(Community.name)
+        .limit(limit)
+    ).all()
+    return [{"id": str(community_id), "label": name} for community_id, name in rows]
+
+
+class PostgresBackend:
+    name = "postgres"
+
+    async def search_items(
+        self, bind: Engine | Connection, q: str, limit: int, globe: Globe, filters: ItemFilters
+    ) -> ItemHits:
+        return await run_in_session(bind, search_items_sql, q, limit, globe, filters)
+
+    async def search_communities(
+        self, bind: Engine | Connection, q: str, limit: int
+    ) -> list[uuid.UUID]:
+        return await run_in_session(bind, search_communities_sql, q, limit)
+
+    async def suggest_items(
+        self, bind: Engine | Connection, q: str, limit: int, globe: Globe
+    ) -> list[dict]:
+        return await run_in_session(bind, suggest_items_sql, q, limit, globe)
+
+    async def suggest_communities(
+        self, bind: Engine | Connection, q: str, limit: int
+    ) -> list[dict]:
+        return await run_in_session(bind, suggest_communities_sql, q, limit)
+
+
+BACKENDS: dict[str, SearchBackend] = {
+    backend.name: backend for backend in (MeilisearchBackend(), PostgresBackend())
+}
+
+
+def search_backends() -> list[SearchBackend]:
+    """
+    The configured primary backend, then the fallback if one is set.
+    """
+    names = [settings.SEARCH_BACKEND]
+    if settings.SEARCH_FALLBACK_BACKEND and settings.SEARCH_FALLBACK_BACKEND not in names:
+        names.append(settings.SEARCH_FALLBACK_BACKEND)
+    return [BACKENDS[name] for name in names]
+
+
+async def search_with_fallback(method: str, *args: Any) -> Any:
+    """
+    Call `method` on each configured backend in turn until one succeeds.
+    """
+    backends = search_backends()
+    for backend in backends:
+        try:
+            return await getattr(backend, method)(*args)
+        except Exception as e:
+            if backend is backends[-1]:
+                raise
+            logger.error(f"Search backend {backend.name} failed, falling back: {e!r}")
+    return []
@@ -0,0 +1,21 @@
+from app.cache import LRUCache
+from app.models import SearchCacheStats
+
+SEARCH_CACHE_SIZE = 5_000
+# Upper bound on staleness for changes that do not go through the search outbox
+SEARCH_CACHE_TTL = 60
+SUGGEST_CACHE_SIZE = 10_000
+SUGGEST_CACHE_TTL = 30
+
+# /search/ sections, keyed on the normalized query, limit, index versions and,
+# for items, the caller's globe fingerprint
+result_cache = LRUCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+# /search/suggest sections, items per user
+suggestion_cache = LRUCache(maxsize=SUGGEST_CACHE_SIZE, ttl=SUGGEST_CACHE_TTL)
+
+
+def search_cache_stats() -> list[SearchCacheStats]:
+    return [
+        SearchCacheStats(name=name, size=len(cache), hits=cache.hits, misses=cache.misses)
+        for name, cache in (("results", result_cache), ("suggestions", suggestion_cache))
+    ]
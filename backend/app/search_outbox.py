@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import uuid
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert
+from sqlmodel import Session, col, func, select
+
+from app.cache import get_shared_cache
+from app.core.db import engine
+from app.models import Community, Item, SearchIndexLag, SearchOutbox
+from app.search import client, community_documents, item_documents, wait_for_task
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 1000
+# Seconds between polls while the outbox is empty
+OUTBOX_POLL_INTERVAL = 1.0
+OUTBOX_MAX_BACKOFF = 300
+# How long a drain waits for Meilisearch to apply a batch before retrying it
+OUTBOX_TASK_TIMEOUT_MS = 30_000
+
+# Index name -> (model, builder turning a batch of rows into documents)
+_INDEXES = {
+    "items": (Item, item_documents),
+    "communities": (Community, community_documents),
+}
+
+
+# Bumped whenever documents of an index change, so cached search results built
+# from the previous contents are no longer served
+_index_versions: dict[str, int] = {}
+
+
+def _version_key(index_name: str) -> str:
+    return f"search:version:{index_name}"
+
+
+def bump_index_versions(index_names: Iterable[str]) -> None:
+    index_names = list(index_names)
+    for index_name in index_names:
+        _index_versions[index_name] = _index_versions.get(index_name, 0) + 1
+    shared = get_shared_cache()
+    if shared is not None and index_names:
+        try:
+            pipeline = shared.pipeline()
+            for index_name in index_names:
+                pipeline.incr(_version_key(index_name))
+            pipeline.execute()
+        except Exception as e:
+            logger.error(f"Could not bump shared search index versions: {e}")
+
+
+def index_versions(index_names: Iterable[str]) -> tuple:
+    """
+    Current versions of the indexes, both this process's and, with a shared
+    cache, the ones bumped by drainers running elsewhere.
+    """
+    index_names = list(index_names)
+    versions: list = [_index_versions.get(index_name, 0) for index_name in index_names]
+    shared = get_shared_cache()
+    if shared is not None:
+        try:
+            versions += shared.mget([_version_key(index_name) for index_name in index_names])
+        except Exception as e:
+            logger.error(f"Shared search index versions unavailable: {e}")
+    return tuple(versions)
+
+
+def enqueue_search_sync(session: Session, index_name: str, document_ids: Iterable[uuid.UUID]) -> None:
+    """
+    Record changes made with core statements, which the flush hook does not see.
+    The caller commits.
+    """
+    rows = [{"index_name": index_name, "document_id": document_id} for document_id in document_ids]
+    if rows:
+        session.execute(insert(SearchOutbox), rows)
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(2**attempts, OUTBOX_MAX_BACKOFF))
+
+
+def drain_outbox(session: Session, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """
+    Push one batch of pending changes and return how many outbox rows it covered.
+    Changes to the same document are coalesced and the document is built from
+    its current row, so the latest version wins; a row that no longer exists is
+    deleted from the index. Rows are locked with SKIP LOCKED so several drainers
+    can run side by side. Entries are only removed once Meilisearch reports the
+    tasks as succeeded; on any failure the batch is retried later with backoff.
+    """
+    now = datetime.now(timezone.utc)
+    entries = session.exec(
+        select(SearchOutbox)
+        .where(SearchOutbox.available_at <= now)
+        .order_by(SearchOutbox.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not entries:
+        return 0
+    entry_ids = [entry.id for entry in entries]
+
+    pending: dict[str, set[uuid.UUID]] = {}
+    for entry in entries:
+        pending.setdefault(entry.index_name, set()).add(entry.document_id)
+
+    try:
+        task_uids = []
+        for index_name, document_ids in pending.items():
+            model, to_documents = _INDEXES[index_name]
+            rows = session.exec(select(model).where(col(model.id).in_(document_ids))).all()
+            removed = document_ids - {row.id for row in rows}
+            index = client.index(index_name)
+            if rows:
+                task_uids.append(index.add_documents(to_documents(session, rows)).task_uid)
+            if removed:
+                task_uids.append(index.delete_documents([str(document_id) for document_id in removed]).task_uid)
+        # Accepted is not applied: a rejected document fails its task, not the request
+        for task_uid in task_uids:
+            wait_for_task(client, task_uid, OUTBOX_TASK_TIMEOUT_MS)
+    except Exception as e:
+        _retry_later(session, entry_ids, now)
+        logger.error(f"Search sync failed for {len(entries)} outbox entries, will retry: {e}")
+        return len(entries)
+
+    session.execute(delete(SearchOutbox).where(col(SearchOutbox.id).in_(entry_ids)))
+    session.commit()
+    bump_index_versions(pending)
+    return len(entries)
+
+
+def _retry_later(session: Session, entry_ids: list[int], now: datetime) -> None:
+    # The failure may have aborted the transaction (and released the row locks),
+    # so start over and only touch the entries no other drainer has picked up since
+    session.rollback()
+    entries = session.exec(
+        select(SearchOutbox)
+        .where(col(SearchOutbox.id).in_(entry_ids))
+        .with_for_update(skip_locked=True)
+    ).all()
+    for entry in entries:
+        entry.attempts += 1
+        entry.available_at = now + _backoff(entry.attempts)
+    session.commit()
+
+
+def search_index_lag(session: Session) -> SearchIndexLag:
+    pending, failing, oldest = session.exec(
+        select(
+            func.count(),
+            func.count().filter(col(SearchOutbox.attempts) > 0),
+            func.min(SearchOutbox.created_at),
+        )
+    ).one()
+    lag_seconds = 0.0
+    if oldest is not None:
+        if oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        lag_seconds = max(0.0, (datetime.now(timezone.utc) - oldest).total_seconds())
+    return SearchIndexLag(pending=pending, failing=failing, lag_seconds=lag_seconds)
+
+
+def _drain() -> int:
+    with Session(engine) as session:
+        return drain_outbox(session)
+
+
+async def run_outbox_worker() -> None:
+    """
+    Drain the outbox until cancelled, polling while it is empty.
+    """
+    while True:
+        try:
+            handled = await asyncio.to_thread(_drain)
+        except Exception as e:
+            logger.error(f"Search outbox drain failed: {e}")
+            handled = 0
+        if handled < OUTBOX_BATCH_SIZE:
+            await asyncio.sleep(OUTBOX_POLL_INTERVAL)
@@ -0,0 +1,190 @@
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from meilisearch.errors import MeilisearchApiError
+from sqlmodel import Session, col, func, select
+
+from app.search import client, wait_for_task
+from app.search_outbox import _INDEXES, bump_index_versions
+
+logger = logging.getLogger(__name__)
+
+REINDEX_CHUNK_SIZE = 1000
+# How long a worker waits for Meilisearch to index one chunk
+REINDEX_TASK_TIMEOUT_MS = 10 * 60 * 1000
+
+
+def _wait(task_uid: int) -> None:
+    wait_for_task(client, task_uid, REINDEX_TASK_TIMEOUT_MS)
+
+
+def _push(index_uid: str, documents: list[dict]) -> int:
+    _wait(client.index(index_uid).add_documents(documents).task_uid)
+    return len(documents)
+
+
+def _filters(model, after: str | None, since: datetime | None) -> list:
+    filters = []
+    if after is not None:
+        filters.append(col(model.id) > uuid.UUID(after))
+    if since is not None:
+        filters.append(col(model.updated_at) >= since)
+    return filters
+
+
+def stream_chunks(session: Session, model, filters: list, chunk_size: int) -> Iterator[list]:
+    """
+    Rows matching `filters` in id order, `chunk_size` at a time, fetched through
+    a server-side cursor so the table is never held in memory at once.
+    """
+    statement = select(model).where(*filters).order_by(col(model.id))
+    result = session.exec(statement.execution_options(yield_per=chunk_size))
+    for rows in result.partitions():
+        yield rows
+        # Documents are built, drop the rows from the identity map
+        session.expunge_all()
+
+
+def _load_checkpoint(path: Path | None) -> dict[str, Any]:
+    if path is None or not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def _save_checkpoint(path: Path | None, checkpoint: dict[str, Any]) -> None:
+    if path is None:
+        return
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(checkpoint))
+    tmp.replace(path)
+
+
+def _prepare_target(index_name: str, target: str) -> None:
+    # The live index is created if missing: a swap needs both sides to exist
+    try:
+        live_settings = client.get_index(index_name).get_settings()
+    except MeilisearchApiError:
+        _wait(client.create_index(index_name, {"primaryKey": "id"}).task_uid)
+        live_settings = client.get_index(index_name).get_settings()
+    try:
+        _wait(client.delete_index(target).task_uid)
+    except MeilisearchApiError:
+        pass
+    _wait(client.create_index(target, {"primaryKey": "id"}).task_uid)
+    _wait(client.index(target).update_settings(live_settings).task_uid)
+
+
+def _delete_missing(session: Session, index_name: str, model, page_size: int) -> int:
+    # Every document is checked: a row deleted during a full run may sit in any chunk
+    index = client.index(index_name)
+    missing: list[str] = []
+    offset = 0
+    while True:
+        page = index.get_documents({"fields": ["id"], "limit": page_size, "offset": offset})
+        ids = [str(document.id) for document in page.results]
+        existing = session.exec(select(model.id).where(col(model.id).in_([uuid.UUID(i) for i in ids]))).all()
+        missing += set(ids) - {str(row_id) for row_id in existing}
+        offset += len(ids)
+        if len(ids) < page_size:
+            break
+    if missing:
+        _wait(index.delete_documents(missing).task_uid)
+    return len(missing)
+
+
+def reindex(
+    session: Session,
+    index_name: str,
+    *,
+    since: datetime | None = None,
+    chunk_size: int = REINDEX_CHUNK_SIZE,
+    workers: int = 1,
+    checkpoint_path: Path | None = None,
+) -> int:
+    """
+    Rebuild a search index from the database and return how many documents were pushed.
+
+    A full run builds `<index>_reindex` with the live index's settings and swaps
+    it in once complete, so searches keep hitting the old index meanwhile, then
+    re-pushes rows changed while it ran and deletes documents whose row is gone.
+    With `since` only rows updated from
+    then on are pushed, straight into the live index. Progress is saved to
+    `checkpoint_path` after every chunk so an interrupted run started again with
+    the same arguments resumes where it stopped.
+    """
+    model, to_documents = _INDEXES[index_name]
+    checkpoint = _load_checkpoint(checkpoint_path)
+    mode = since.isoformat() if since else "full"
+    state = checkpoint.get(index_name)
+    if state is None or state["mode"] != mode:
+        state = {
+            "mode": mode,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "last_id": None,
+            "done": 0,
+            "swapped": False,
+        }
+        if since is None:
+            _prepare_target(index_name, f"{index_name}_reindex")
+    else:
+        logger.info(f"{index_name}: resuming after {state['last_id']} ({state['done']} documents done)")
+    target = index_name if since else f"{index_name}_reindex"
+
+    filters = _filters(model, state["last_id"], since)
+    total = state["done"] + session.exec(select(func.count()).select_from(model).where(*filters)).one()
+    started = time.monotonic()
+    pushed = 0
+
+    def record(future: Future, last_id: str) -> None:
+        nonlocal pushed
+        count = future.result()
+        pushed += count
+        state["last_id"] = last_id
+        state["done"] += count
+        checkpoint[index_name] = state
+        _save_checkpoint(checkpoint_path, checkpoint)
+        rate = pushed / max(time.monotonic() - started, 1e-6)
+        eta = (total - state["done"]) / rate if rate else 0
+        logger.info(f"{index_name}: {state['done']}/{total} documents, {rate:.0f}/s, ETA {eta:.0f}s")
+
+    # Rows are read and turned into documents here, pushes run on the workers.
+    # The checkpoint only moves past a chunk once every chunk before it is indexed.
+    in_flight: deque[tuple[Future, str]] = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for rows in stream_chunks(session, model, filters, chunk_size):
+            documents = to_documents(session, rows)
+            in_flight.append((executor.submit(_push, target, documents), str(rows[-1].id)))
+            while in_flight and (len(in_flight) > 2 * workers or in_flight[0][0].done()):
+                record(*in_flight.popleft())
+        while in_flight:
+            record(*in_flight.popleft())
+
+    if since is None:
+        if not state["swapped"]:
+            _wait(client.swap_indexes([{"indexes": [index_name, target]}]).task_uid)
+            state["swapped"] = True
+            checkpoint[index_name] = state
+            _save_checkpoint(checkpoint_path, checkpoint)
+            _wait(client.delete_index(target).task_uid)
+        # Changes synced to the old index during the run were swapped out with it:
+        # push rows updated since, and drop documents of rows deleted since
+        catch_up = datetime.fromisoformat(state["started_at"])
+        for rows in stream_chunks(session, model, _filters(model, None, catch_up), chunk_size):
+            pushed += _push(index_name, to_documents(session, rows))
+        removed = _delete_missing(session, index_name, model, chunk_size)
+        if removed:
+            logger.info(f"{index_name}: deleted {removed} documents of rows removed during the run")
+        logger.info(f"{index_name}: swapped in the rebuilt index")
+
+    bump_index_versions([index_name])
+    checkpoint.pop(index_name, None)
+    _save_checkpoint(checkpoint_path, checkpoint)
+    return pushed
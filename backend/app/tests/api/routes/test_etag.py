@@ -0,0 +1,102 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app import crud
+from app.api.deps import get_current_user
+from app.main import app
+from app.models import Community, CommunityMember, Item, User, UserCreate
+from app.tests.utils.utils import random_email
+
+
+def _user(db: Session) -> User:
+    return crud.create_user(session=db, user_create=UserCreate(email=random_email(), password="password"))
+
+
+def _revalidate(client: TestClient, url: str) -> str:
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    return etag
+
+
+def test_item_etag_follows_item_and_ownership_changes(client: TestClient, db: Session) -> None:
+    owner, other = _user(db), _user(db)
+    item = Item(title="Dune")
+    item.owners.append(owner)
+    db.add(item)
+    db.commit()
+    app.dependency_overrides[get_current_user] = lambda: owner
+    url = f"/api/v1/items/{item.id}"
+
+    etag = _revalidate(client, url)
+
+    # A new owner changes the response without touching the item's columns
+    item.owners.append(other)
+    db.commit()
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["owners"]) == 2
+    etag = response.headers["etag"]
+
+    item.description = "A desert planet"
+    db.commit()
+    assert _revalidate(client, url) != etag
+
+
+def test_user_etag_follows_membership_changes(client: TestClient, db: Session) -> None:
+    user = _user(db)
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    etag = _revalidate(client, "/api/v1/users/me")
+
+    community = Community(name=random_email(), created_by=user.id)
+    db.add(community)
+    db.flush()
+    db.add(CommunityMember(community_id=community.id, user_id=user.id))
+    db.commit()
+    assert _revalidate(client, "/api/v1/users/me") != etag
+
+    etag = _revalidate(client, f"/api/v1/communities/{community.id}")
+    community.description = "Book club"
+    db.commit()
+    assert _revalidate(client, f"/api/v1/communities/{community.id}") != etag
+
+
+def test_list_pages_get_a_body_hash_etag(client: TestClient, db: Session) -> None:
+    user, friend = _user(db), _user(db)
+    app.dependency_overrides[get_current_user] = lambda: user
+
+    etag = _revalidate(client, "/api/v1/friends/")
+
+    crud.create_friend_request(session=db, user_id=user.id, friend_id=friend.id)
+    crud.accept_friend_request(session=db, user_id=user.id, friend_id=friend.id)
+    assert _revalidate(client, "/api/v1/friends/") != etag
+
+
+def test_conditional_get_requires_a_caller_who_can_read_the_resource(client: TestClient, db: Session) -> None:
+    owner, friend, stranger = _user(db), _user(db), _user(db)
+    crud.create_friend_request(session=db, user_id=owner.id, friend_id=friend.id)
+    crud.accept_friend_request(session=db, user_id=owner.id, friend_id=friend.id)
+    item = Item(title="Dune")
+    item.owners.append(owner)
+    db.add(item)
+    db.commit()
+    url = f"/api/v1/items/{item.id}"
+
+    # No existence oracle for anonymous callers
+    assert client.get(url, headers={"If-None-Match": "*"}).status_code == 401
+    assert client.get(f"/api/v1/users/{owner.id}", headers={"If-None-Match": "*"}).status_code == 401
+
+    app.dependency_overrides[get_current_user] = lambda: stranger
+    response = client.get(url, headers={"If-None-Match": "*"})
+    assert response.status_code == 400
+    assert "etag" not in response.headers
+
+    app.dependency_overrides[get_current_user] = lambda: friend
+    assert client.get(url, headers={"If-None-Match": "*"}).status_code == 304
@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app import crud
+from app.api.deps import get_current_user
+from app.main import app
+from app.models import Community, CommunityMember, Item, Loan, User, UserCreate
+from app.tests.utils.queries import assert_max_queries
+from app.tests.utils.utils import random_email
+
+# Statements allowed for one page, whatever its size
+MAX_PAGE_QUERIES = 12
+
+
+def _user(db: Session) -> User:
+    return crud.create_user(session=db, user_create=UserCreate(email=random_email(), password="password"))
+
+
+def _seed(db: Session, owner: User, rows: int) -> None:
+    community = Community(name=random_email(), created_by=owner.id)
+    db.add(community)
+    db.flush()
+    when = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for _ in range(rows):
+        requester = _user(db)
+        db.add(CommunityMember(community_id=community.id, user_id=requester.id))
+        crud.create_friend_request(session=db, user_id=owner.id, friend_id=requester.id)
+        crud.accept_friend_request(session=db, user_id=owner.id, friend_id=requester.id)
+        item = Item(title=random_email())
+        item.owners.append(owner)
+        db.add(item)
+        db.flush()
+        db.add(Loan(item_id=item.id, owner_id=owner.id, requester_id=requester.id,
+                    community_id=community.id, start_date=when, end_date=when))
+    db.commit()
+
+
+def _query_count(client: TestClient, db: Session, owner: User, url: str) -> int:
+    app.dependency_overrides[get_current_user] = lambda: owner
+    db.expire_all()
+    with assert_max_queries(db, MAX_PAGE_QUERIES) as statements:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def test_list_pages_use_a_fixed_number_of_queries(client: TestClient, db: Session) -> None:
+    small, large = _user(db), _user(db)
+    _seed(db, small, 2)
+    _seed(db, large, 8)
+
+    for url in ["/api/v1/loans/incoming", "/api/v1/friends/"]:
+        assert _query_count(client, db, small, url) == _query_count(client, db, large, url), url
@@ -0,0 +1,223 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app import crud, search_backends, search_cache, search_outbox
+from app.api.deps import get_current_user
+from app.api.routes import search
+from app.main import app
+from app.models import Item, User, UserCreate, UserProfile
+from app.tests.utils.utils import random_email
+
+
+def _user(db: Session, full_name: str) -> User:
+    return crud.create_user(
+        session=db, user_create=UserCreate(email=random_email(), password="password", full_name=full_name)
+    )
+
+
+def test_search_sends_visibility_filter_and_returns_partial_results(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    me, friend = _user(db, "Me"), _user(db, "Dune Fan")
+    crud.create_friend_request(session=db, user_id=me.id, friend_id=friend.id)
+    crud.accept_friend_request(session=db, user_id=me.id, friend_id=friend.id)
+    dune = Item(title="Dune")
+    dune.owners.append(friend)
+    db.add(dune)
+    db.commit()
+
+    requests = {}
+
+    async def fake_search_index(index_name: str, query: str, params: dict, timeout: float) -> dict:
+        requests[index_name] = params
+        if index_name == "communities":
+            # Slower than the phase budget
+            await asyncio.sleep(1)
+        return {"hits": [{"id": str(dune.id)}]}
+
+    monkeypatch.setattr(search_backends, "search_index", fake_search_index)
+    monkeypatch.setattr(search, "SEARCH_PHASE_TIMEOUT", 0.2)
+    app.dependency_overrides[get_current_user] = lambda: me
+
+    response = client.get("/api/v1/search/", params={"q": "dune"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["title"] for item in body["items"]] == ["Dune"]
+    assert [user["full_name"] for user in body["users"]] == ["Dune Fan"]
+    assert body["communities"] == []
+    assert body["incomplete"] == ["communities"]
+    assert f'"{friend.id}"' in requests["items"]["filter"][0]
+
+
+def test_search_falls_back_to_the_database_when_meilisearch_fails(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    me = _user(db, "Reader")
+    emma = Item(title="Emma")
+    emma.owners.append(me)
+    db.add(emma)
+    db.commit()
+
+    async def failing_search_index(index_name: str, query: str, params: dict, timeout: float) -> dict:
+        raise ConnectionError("meilisearch is down")
+
+    monkeypatch.setattr(search_backends, "search_index", failing_search_index)
+    app.dependency_overrides[get_current_user] = lambda: me
+
+    response = client.get("/api/v1/search/", params={"q": "emm"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["title"] for item in body["items"]] == ["Emma"]
+    assert body["incomplete"] == []
+
+
+def test_suggest_returns_labels_caches_prefixes_and_honors_the_setting(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    me, friend = _user(db, "Reader"), _user(db, "Friend")
+    crud.create_friend_request(session=db, user_id=me.id, friend_id=friend.id)
+    crud.accept_friend_request(session=db, user_id=me.id, friend_id=friend.id)
+    dune = Item(title="Dune Messiah")
+    dune.owners.append(me)
+    db.add(dune)
+    db.commit()
+    search_cache.suggestion_cache.clear()
+
+    calls = []
+
+    async def fake_search_index(index_name: str, query: str, params: dict, timeout: float) -> dict:
+        calls.append(index_name)
+        if index_name == "items":
+            assert params["attributesToRetrieve"] == ["id", "title"]
+            return {"hits": [{"id": str(dune.id), "title": dune.title}]}
+        raise ConnectionError("meilisearch is down")
+
+    monkeypatch.setattr(search_backends, "search_index", fake_search_index)
+    app.dependency_overrides[get_current_user] = lambda: me
+
+    for _ in range(2):
+        response = client.get("/api/v1/search/suggest", params={"q": "Dun"})
+        assert response.status_code == 200
+        assert response.json() == {
+            "items": [{"id": str(dune.id), "label": "Dune Messiah"}],
+            "communities": [],
+        }
+    # The second request was answered from the cache
+    assert sorted(calls) == ["communities", "items"]
+
+    # Item suggestions are shared with users whose globe is the same
+    app.dependency_overrides[get_current_user] = lambda: friend
+    response = client.get("/api/v1/search/suggest", params={"q": "dun"})
+    assert response.json()["items"] == [{"id": str(dune.id), "label": "Dune Messiah"}]
+    assert len(calls) == 2
+    app.dependency_overrides[get_current_user] = lambda: me
+
+    me.settings = {"autocomplete_enabled": False}
+    response = client.get("/api/v1/search/suggest", params={"q": "Dune"})
+    assert response.json() == {"items": [], "communities": []}
+    assert len(calls) == 2
+
+
+def test_search_results_are_cached_per_globe_until_the_index_changes(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    me, friend = _user(db, "Me"), _user(db, "Friend")
+    crud.create_friend_request(session=db, user_id=me.id, friend_id=friend.id)
+    crud.accept_friend_request(session=db, user_id=me.id, friend_id=friend.id)
+    dune = Item(title="Dune")
+    dune.owners.append(friend)
+    db.add(dune)
+    db.commit()
+
+    calls = []
+
+    async def fake_search_index(index_name: str, query: str, params: dict, timeout: float) -> dict:
+        calls.append((index_name, query))
+        return {"hits": [{"id": str(dune.id)}] if index_name == "items" else []}
+
+    monkeypatch.setattr(search_backends, "search_index", fake_search_index)
+
+    def search_as(user: User, q: str) -> list[str]:
+        app.dependency_overrides[get_current_user] = lambda: user
+        response = client.get("/api/v1/search/", params={"q": q})
+        assert response.status_code == 200
+        return [item["title"] for item in response.json()["items"]]
+
+    hits = search_cache.result_cache.hits
+    assert search_as(me, "Cached Dune") == ["Dune"]
+    # Same normalized query, and the friend's globe is the same as mine
+    assert search_as(friend, "  cached   dune ") == ["Dune"]
+    assert search_cache.result_cache.hits == hits + 2
+    assert sorted(calls) == [("communities", "cached dune"), ("items", "cached dune")]
+
+    search_outbox.bump_index_versions(["items"])
+    assert search_as(me, "cached dune") == ["Dune"]
+    assert len(calls) == 4
+
+
+def test_search_cache_stats_are_for_superusers_only(client: TestClient, db: Session) -> None:
+    user = _user(db, "Curious")
+    app.dependency_overrides[get_current_user] = lambda: user
+    assert client.get("/api/v1/utils/search-cache/").status_code == 403
+
+    user.is_superuser = True
+    response = client.get("/api/v1/utils/search-cache/")
+    assert response.status_code == 200
+    assert {stats["name"] for stats in response.json()} == {"results", "suggestions"}
+
+
+def test_user_search_matches_aliases_in_the_globe_and_public_ids_globally(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    me, friend, stranger = _user(db, "Me"), _user(db, "Friend"), _user(db, "Zanzibar Stranger")
+    crud.create_friend_request(session=db, user_id=me.id, friend_id=friend.id)
+    crud.accept_friend_request(session=db, user_id=me.id, friend_id=friend.id)
+    profile = db.get(UserProfile, friend.id)
+    profile.alias = "Zanzibar Reader"
+    db.commit()
+
+    async def no_hits(index_name: str, query: str, params: dict, timeout: float) -> dict:
+        return {"hits": []}
+
+    monkeypatch.setattr(search_backends, "search_index", no_hits)
+    app.dependency_overrides[get_current_user] = lambda: me
+
+    response = client.get("/api/v1/search/", params={"q": "zanzibar"})
+    assert [user["id"] for user in response.json()["users"]] == [str(friend.id)]
+
+    # Outside the globe only an exact public_id finds someone
+    response = client.get("/api/v1/search/", params={"q": stranger.public_id.upper()})
+    assert [user["id"] for user in response.json()["users"]] == [str(stranger.id)]
+
+
+def test_search_returns_facets_with_the_hits(
+    client: TestClient, db: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    me = _user(db, "Reader")
+    dune = Item(title="Dune", extra_data={"genre": "sf"})
+    dune.owners.append(me)
+    db.add(dune)
+    db.commit()
+
+    requests = {}
+
+    async def fake_search_index(index_name: str, query: str, params: dict, timeout: float) -> dict:
+        requests[index_name] = params
+        if index_name == "communities":
+            return {"hits": []}
+        return {"hits": [{"id": str(dune.id)}], "facetDistribution": {"genre": {"sf": 1}}}
+
+    monkeypatch.setattr(search_backends, "search_index", fake_search_index)
+    app.dependency_overrides[get_current_user] = lambda: me
+
+    response = client.get(
+        "/api/v1/search/", params={"q": "faceted dune", "genre": "sf", "available": True, "facets": True}
+    )
+    body = response.json()
+    assert [item["title"] for item in body["items"]] == ["Dune"]
+    assert body["facets"] == {"genre": {"sf": 1}}
+    assert requests["items"]["filter"][1:] == ['genre = "sf"', "available = true"]
+    assert "genre" in requests["items"]["facets"]
@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session
+
+from app import crud
+from app.availability import get_item_availability, get_owner_availability
+from app.models import Item, Loan, LoanStatus, UserCreate
+
+
+def _loan(item: Item, owner_id, requester_id, status: LoanStatus) -> Loan:
+    now = datetime.now(timezone.utc)
+    return Loan(
+        item_id=item.id,
+        owner_id=owner_id,
+        requester_id=requester_id,
+        status=status,
+        start_date=now,
+        end_date=now + timedelta(days=7),
+    )
+
+
+def test_owner_availability_resolves_all_pairs(db: Session):
+    alice = crud.create_user(session=db, user_create=UserCreate(email="a@example.com", password="password"))
+    bob = crud.create_user(session=db, user_create=UserCreate(email="b@example.com", password="password"))
+    carol = crud.create_user(session=db, user_create=UserCreate(email="c@example.com", password="password"))
+
+    book = Item(title="Dune")
+    book.owners.extend([alice, bob])
+    lamp = Item(title="Lamp")
+    lamp.owners.append(alice)
+    db.add(book)
+    db.add(lamp)
+    db.commit()
+
+    db.add(_loan(book, alice.id, carol.id, LoanStatus.ACTIVE))
+    db.add(_loan(lamp, alice.id, carol.id, LoanStatus.RETURNED))
+    db.commit()
+
+    availability = get_owner_availability(
+        db, [(book.id, alice.id), (book.id, bob.id), (lamp.id, alice.id)]
+    )
+    assert availability == {
+        (book.id, alice.id): False,
+        (book.id, bob.id): True,
+        (lamp.id, alice.id): True,
+    }
+    assert get_owner_availability(db, []) == {}
+
+
+def test_item_availability_ignores_return_pending(db: Session):
+    owner = crud.create_user(session=db, user_create=UserCreate(email="o@example.com", password="password"))
+    borrower = crud.create_user(session=db, user_create=UserCreate(email="r@example.com", password="password"))
+
+    pending = Item(title="Board game")
+    returning = Item(title="Tent")
+    db.add(pending)
+    db.add(returning)
+    db.commit()
+
+    db.add(_loan(pending, owner.id, borrower.id, LoanStatus.PENDING))
+    db.add(_loan(returning, owner.id, borrower.id, LoanStatus.RETURN_PENDING))
+    db.commit()
+
+    availability = get_item_availability(db, [pending.id, returning.id])
+    assert availability == {pending.id: False, returning.id: True}
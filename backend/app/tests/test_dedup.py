@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+
+from sqlmodel import Session, select
+
+from app import crud, dedup, feed
+from app.models import (
+    Collection,
+    CollectionItem,
+    FeedItem,
+    Item,
+    ItemType,
+    Loan,
+    User,
+    UserCreate,
+    UserItem,
+    normalize_isbn,
+    normalize_title,
+)
+
+
+def _user(db: Session, email: str) -> User:
+    return crud.create_user(session=db, user_create=UserCreate(email=email, password="password"))
+
+
+def test_normalizers():
+    assert normalize_title("  The   Left Hand\tof DARKNESS ") == "the left hand of darkness"
+    assert normalize_isbn("0-441-01359-7") == "9780441013593"
+    assert normalize_isbn("978-0-441-01359-3") == "9780441013593"
+    assert normalize_isbn("not an isbn") is None
+    assert normalize_isbn(None) is None
+
+
+def test_duplicate_lookup_uses_normalized_keys(db: Session):
+    dune = Item(title="Dune", item_type=ItemType.book, extra_data={"isbn": "0441013597"})
+    emma = Item(title="Emma", item_type=ItemType.book)
+    db.add_all([dune, emma])
+    db.commit()
+    assert dune.normalized_title == "dune" and dune.isbn == "9780441013593"
+
+    def lookup(title, extra_data=None, item_type=ItemType.book):
+        return crud.get_duplicate_item(session=db, title=title, item_type=item_type, extra_data=extra_data)
+
+    assert lookup("  DUNE ") == dune
+    assert lookup("Dune (Deluxe Edition)", {"isbn": "978-0441013593"}) == dune
+    # The ISBN wins over a title match
+    assert lookup("Emma", {"isbn": "9780441013593"}) == dune
+    assert lookup("Dune", item_type=ItemType.general) is None
+
+
+def test_merge_collapses_duplicates_and_their_links(db: Session):
+    # Rows written before the unique indexes existed
+    for index in Item.__table__.indexes:
+        if index.unique:
+            index.drop(db.get_bind())
+    alice = _user(db, "alice@example.com")
+    bob = _user(db, "bob@example.com")
+
+    def day(n: int) -> datetime:
+        return datetime(2026, 1, n, tzinfo=timezone.utc)
+
+    keep = Item(title="Dune", item_type=ItemType.book, count=1, created_at=day(1))
+    keep.owners.append(alice)
+    db.add(keep)
+    db.commit()
+    same_title = Item(title="dune ", item_type=ItemType.book, count=2,
+                      extra_data={"isbn": "0441013597"}, created_at=day(2))
+    same_title.owners.extend([alice, bob])
+    same_isbn = Item(title="Dune: 40th Anniversary", item_type=ItemType.book, extra_data={"isbn": "9780441013593"},
+                     created_at=day(3))
+    same_isbn.owners.append(bob)
+    other_type = Item(title="Dune", item_type=ItemType.general, created_at=day(4))
+    db.add_all([same_title, same_isbn, other_type])
+    collection = Collection(title="Shelf", owner_id=bob.id)
+    db.add(collection)
+    db.flush()
+    db.add(CollectionItem(collection_id=collection.id, item_id=same_isbn.id))
+    db.add(Loan(item_id=same_title.id, owner_id=bob.id, requester_id=alice.id,
+                     start_date=keep.created_at, end_date=keep.created_at))
+    feed.rebuild_feed(db)
+    db.commit()
+
+    duplicate_ids = [same_title.id, same_isbn.id]
+    assert dedup.find_duplicate_groups(db) == [[keep.id, *duplicate_ids]]
+    removed = dedup.merge_duplicate_items(db)
+    db.commit()
+
+    assert removed == duplicate_ids
+    assert dedup.find_duplicate_groups(db) == []
+    db.refresh(keep)
+    assert keep.count == 2  # Owners of several copies count once
+    assert keep.isbn == "9780441013593"
+    owners = set(db.exec(select(UserItem.user_id).where(UserItem.item_id == keep.id)).all())
+    assert owners == {alice.id, bob.id}
+    assert db.exec(select(CollectionItem.item_id)).all() == [keep.id]
+    assert db.exec(select(Loan.item_id)).all() == [keep.id]
+    assert set(db.exec(select(FeedItem.item_id)).all()) == {keep.id}
+    assert feed.check_feed(db).consistent
+    assert db.get(Item, other_type.id) is not None
@@ -0,0 +1,90 @@
+from sqlmodel import Session, delete, select
+
+from app import crud, feed
+from app.models import FeedItem, Friendship, Item, User, UserCreate, UserItem
+
+
+def _user(db: Session, email: str) -> User:
+    return crud.create_user(session=db, user_create=UserCreate(email=email, password="password"))
+
+
+def _own(db: Session, user: User, title: str) -> Item:
+    item = Item(title=title)
+    item.owners.append(user)
+    db.add(item)
+    db.flush()
+    feed.add_owned_items(db, user.id, [item.id])
+    db.commit()
+    return item
+
+
+def _feed(db: Session, viewer: User) -> set:
+    return set(db.exec(select(FeedItem.item_id).where(FeedItem.viewer_id == viewer.id)).all())
+
+
+def _unfriend(db: Session, a: User, b: User) -> None:
+    for friendship in db.exec(select(Friendship)).all():
+        if {friendship.user_id, friendship.friend_id} == {a.id, b.id}:
+            db.delete(friendship)
+    db.flush()
+    feed.unlink_friends(db, a.id, b.id)
+    db.commit()
+
+
+def test_feed_follows_friendships_and_ownership(db: Session):
+    alice = _user(db, "alice@example.com")
+    bob = _user(db, "bob@example.com")
+    carol = _user(db, "carol@example.com")
+
+    book = _own(db, alice, "Dune")
+    assert _feed(db, alice) == {book.id}
+    assert _feed(db, bob) == set()
+
+    crud.create_friend_request(session=db, user_id=alice.id, friend_id=bob.id)
+    crud.accept_friend_request(session=db, user_id=alice.id, friend_id=bob.id)
+    crud.create_friend_request(session=db, user_id=carol.id, friend_id=bob.id)
+    crud.accept_friend_request(session=db, user_id=carol.id, friend_id=bob.id)
+    assert _feed(db, bob) == {book.id}
+
+    # Carol owns a copy too, so Bob keeps seeing it after unfriending Alice
+    book.owners.append(carol)
+    db.flush()
+    feed.add_owned_items(db, carol.id, [book.id])
+    db.commit()
+    _unfriend(db, alice, bob)
+    assert _feed(db, bob) == {book.id}
+
+    # Once Carol gives hers away, nobody Bob knows owns it any more
+    db.exec(delete(UserItem).where(UserItem.user_id == carol.id))
+    db.flush()
+    feed.remove_owned_items(db, carol.id, [book.id])
+    db.commit()
+    assert _feed(db, bob) == set()
+    assert _feed(db, carol) == set()
+    assert _feed(db, alice) == {book.id}
+    assert feed.check_feed(db).consistent
+
+
+def test_check_and_rebuild_repair_drift(db: Session):
+    alice = _user(db, "alice@example.com")
+    bob = _user(db, "bob@example.com")
+    crud.create_friend_request(session=db, user_id=alice.id, friend_id=bob.id)
+    crud.accept_friend_request(session=db, user_id=alice.id, friend_id=bob.id)
+    lamp = _own(db, alice, "Lamp")
+    orphan = Item(title="Orphan")
+    db.add(orphan)
+    db.commit()
+
+    # Lose Bob's legitimate row and add one nothing justifies
+    db.exec(delete(FeedItem).where(FeedItem.viewer_id == bob.id))
+    db.add(FeedItem(viewer_id=bob.id, item_id=orphan.id, created_at=lamp.created_at))
+    db.commit()
+
+    drift = feed.check_feed(db)
+    assert (drift.missing, drift.stale) == (1, 1)
+    assert feed.check_feed(db, alice.id).consistent
+
+    feed.rebuild_feed(db, bob.id)
+    db.commit()
+    assert feed.check_feed(db).consistent
+    assert _feed(db, bob) == {lamp.id}
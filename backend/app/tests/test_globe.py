@@ -0,0 +1,67 @@
+import uuid
+
+import pytest
+from sqlmodel import Session
+
+from app import crud, globe
+from app.cache import LRUCache
+from app.models import Community, CommunityMember, User, UserCreate
+from app.tests.utils.queries import count_queries
+
+
+@pytest.fixture(autouse=True)
+def clear_globe_cache():
+    globe._local_cache.clear()
+
+
+def _user(db: Session, name: str) -> User:
+    return crud.create_user(session=db, user_create=UserCreate(email=f"{name}@example.com", password="password"))
+
+
+def test_globe_is_cached_until_reach_changes(db: Session):
+    me, friend, neighbour, stranger = (_user(db, name) for name in ["me", "friend", "neighbour", "stranger"])
+    club = Community(name="Club", created_by=friend.id)
+    db.add(club)
+    db.flush()
+    db.add_all([
+        CommunityMember(community_id=club.id, user_id=friend.id),
+        CommunityMember(community_id=club.id, user_id=neighbour.id),
+    ])
+    crud.create_friend_request(session=db, user_id=me.id, friend_id=friend.id)
+    crud.accept_friend_request(session=db, user_id=me.id, friend_id=friend.id)
+
+    reach = globe.get_globe(db, me.id)
+    assert set(reach.user_ids) == {me.id, friend.id, neighbour.id}
+    assert reach.community_ids == (club.id,)
+    assert reach.has_user(neighbour.id) and not reach.has_user(stranger.id)
+
+    with count_queries(db) as statements:
+        assert globe.get_globe(db, me.id) is reach
+    assert statements == []
+
+    # The stranger joining the club brings them into my globe
+    db.add(CommunityMember(community_id=club.id, user_id=stranger.id))
+    db.commit()
+    assert globe.get_globe(db, me.id).has_user(stranger.id)
+
+
+def test_globe_packs_into_sorted_ids():
+    reach = globe.Globe(
+        user_ids=tuple(sorted(uuid.uuid4() for _ in range(3))),
+        community_ids=(uuid.uuid4(),),
+    )
+    assert len(reach.pack()) == 4 + 16 * 4
+    assert globe.Globe.unpack(reach.pack()) == reach
+
+
+def test_lru_cache_evicts_least_recently_used_and_expired():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    expired = LRUCache(maxsize=2, ttl=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None
@@ -0,0 +1,75 @@
+import io
+
+from sqlmodel import Session, delete, select
+
+from app import crud, feed, item_import
+from app.models import Item, ItemImportStatus, SearchOutbox, User, UserCreate, UserItem
+
+
+def _user(db: Session, email: str) -> User:
+    return crud.create_user(session=db, user_create=UserCreate(email=email, password="password"))
+
+
+def _rows(body: str, fmt: str):
+    return item_import.read_import_rows(io.BytesIO(body.encode()), fmt)
+
+
+def test_csv_import_creates_attaches_and_reports(db: Session):
+    alice = _user(db, "alice@example.com")
+    bob = _user(db, "bob@example.com")
+    dune = Item(title="Dune", item_type="book")
+    dune.owners.append(alice)
+    db.add(dune)
+    db.flush()
+    feed.add_owned_items(db, alice.id, [dune.id])
+    db.commit()
+    db.execute(delete(SearchOutbox))
+
+    body = (
+        "title,item_type,author,isbn\n"
+        "Dune,book,Frank Herbert,9780441013593\n"
+        "Emma,book,Jane Austen,\n"
+        "EMMA,BOOK,,\n"
+        ",book,,\n"
+        "Lamp,furniture,,\n"
+    )
+    report = item_import.import_items(db, bob.id, _rows(body, "csv"), chunk_size=2)
+
+    assert [(r.row, r.status) for r in report.rows] == [
+        (2, ItemImportStatus.attached),
+        (3, ItemImportStatus.created),
+        (4, ItemImportStatus.already_owned),
+        (5, ItemImportStatus.error),
+        (6, ItemImportStatus.error),
+    ]
+    assert (report.created, report.attached, report.already_owned, report.errors) == (1, 1, 1, 2)
+    assert "title is required" in report.rows[3].detail
+
+    db.refresh(dune)
+    assert dune.count == 2
+    emma = db.exec(select(Item).where(Item.title == "Emma")).one()
+    assert (emma.author, emma.extra_data) == ("Jane Austen", {})
+    owned = set(db.exec(select(UserItem.item_id).where(UserItem.user_id == bob.id)).all())
+    assert owned == {dune.id, emma.id}
+    assert feed.check_feed(db).consistent
+    # Both items the owner gained are queued for the search index
+    queued = set(db.exec(select(SearchOutbox.document_id)).all())
+    assert queued == {dune.id, emma.id}
+
+
+def test_jsonl_import_keeps_unknown_keys_as_extra_data(db: Session):
+    alice = _user(db, "alice@example.com")
+    body = (
+        '{"title": "Dune", "item_type": "book", "isbn": "9780441013593", "extra_data": {"genre": "scifi"}}\n'
+        "\n"
+        "not json\n"
+    )
+    report = item_import.import_items(db, alice.id, _rows(body, "jsonl"))
+
+    assert [(r.row, r.status) for r in report.rows] == [
+        (1, ItemImportStatus.created),
+        (3, ItemImportStatus.error),
+    ]
+    dune = db.get(Item, report.rows[0].item_id)
+    assert dune.extra_data == {"genre": "scifi", "isbn": "9780441013593"}
+    assert db.exec(select(SearchOutbox.document_id)).all() == [dune.id]
@@ -0,0 +1,30 @@
+from sqlmodel import Session, func, select
+
+from app import crud
+from app.models import Notification, NotificationType, User
+
+
+def test_bulk_notifications_are_inserted_once_per_recipient(db: Session):
+    users = [User(email=f"member{i}@example.com", hashed_password="x") for i in range(3)]
+    db.add_all(users)
+    db.commit()
+    ids = [user.id for user in users]
+
+    notified = crud.create_notifications_bulk(
+        session=db,
+        recipient_ids=ids + ids[:1],
+        title="New Announcement",
+        message="Meetup on Friday",
+        type=NotificationType.SUCCESS,
+        link="/communities/x",
+    )
+
+    assert notified == ids
+    rows = db.exec(select(Notification)).all()
+    assert sorted(row.recipient_id for row in rows) == sorted(ids)
+    assert {(row.title, row.type, row.is_read, row.link) for row in rows} == {
+        ("New Announcement", NotificationType.SUCCESS, False, "/communities/x")
+    }
+    assert all(row.created_at is not None for row in rows)
+    assert crud.create_notifications_bulk(session=db, recipient_ids=[], title="t", message="m") == []
+    assert db.exec(select(func.count()).select_from(Notification)).one() == 3
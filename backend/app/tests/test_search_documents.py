@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session
+
+from app import search
+from app.globe import Globe
+from app.models import Item, ItemType, Loan, LoanStatus, User
+from app.search_backends import ItemFilters, search_items_sql
+from app.tests.utils.search_client import FakeClient
+
+
+def test_settings_are_only_pushed_when_they_differ(monkeypatch: pytest.MonkeyPatch):
+    client = FakeClient()
+    monkeypatch.setattr(search, "client", client)
+
+    assert search.reconcile_index_settings() == ["items", "communities"]
+    # Meilisearch returns every setting, with more keys than we set
+    items = client.indexes["items"]
+    items.settings = {**items.settings, "distinctAttribute": None, "typoTolerance": {
+        **items.settings["typoTolerance"], "disableOnWords": []
+    }}
+    assert search.reconcile_index_settings() == []
+
+    items.settings["sortableAttributes"] = []
+    assert search.reconcile_index_settings() == ["items"]
+    assert items.updates[-1] == {"sortableAttributes": search.INDEX_SETTINGS["items"]["sortableAttributes"]}
+
+
+def test_item_documents_carry_sort_and_availability_fields(db: Session):
+    owner = User(email="owner@example.com", hashed_password="x")
+    borrower = User(email="borrower@example.com", hashed_password="x")
+    lent = Item(title="Dune", extra_data={"genre": "sf"})
+    shelved = Item(title="Emma", item_type=ItemType.book, extra_data={"genre": "classic", "category": "novel"})
+    lent.owners.append(owner)
+    shelved.owners.append(owner)
+    db.add_all([lent, shelved])
+    db.commit()
+    now = datetime.now(timezone.utc)
+    db.add(Loan(
+        item_id=lent.id, owner_id=owner.id, requester_id=borrower.id, status=LoanStatus.ACTIVE,
+        start_date=now, end_date=now + timedelta(days=7),
+    ))
+    db.commit()
+
+    documents = {document["title"]: document for document in search.item_documents(db, [lent, shelved])}
+    assert documents["Dune"]["available"] is False
+    assert documents["Emma"]["available"] is True
+    assert isinstance(documents["Emma"]["created_at"], int)
+    assert documents["Emma"]["category"] == "novel"
+    assert documents["Dune"]["category"] is None
+
+    # The SQL backend applies the same filters and counts the same facets
+    globe = Globe(user_ids=(owner.id,), community_ids=())
+
+    def ids(**filters) -> list:
+        return search_items_sql(db, "", 10, globe, ItemFilters(**filters)).ids
+
+    assert ids(available=True) == [shelved.id]
+    assert ids(available=False) == [lent.id]
+    assert ids(item_type=ItemType.book) == [shelved.id]
+    assert ids(genre="sf") == [lent.id]
+    assert ids(category="novel", genre="sf") == []
+
+    hits = search_items_sql(db, "", 10, globe, ItemFilters(facets=True))
+    assert hits.facets == {
+        "item_type": {"general": 1, "book": 1},
+        "category": {"novel": 1},
+        "genre": {"sf": 1, "classic": 1},
+        "available": {"true": 1, "false": 1},
+    }
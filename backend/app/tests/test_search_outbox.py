@@ -0,0 +1,122 @@
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlmodel import Session, select
+
+from app import search_outbox
+from app.models import Community, CommunityItem, Item, SearchOutbox, User, UserItem
+from app.search import visibility_filter
+from app.tests.utils.search_client import FakeClient
+
+
+def _user(db: Session) -> User:
+    user = User(email="owner@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_writes_are_coalesced_into_batched_pushes(db: Session, monkeypatch: pytest.MonkeyPatch):
+    client = FakeClient()
+    monkeypatch.setattr(search_outbox, "client", client)
+    owner = _user(db)
+
+    dune, emma = Item(title="Dune"), Item(title="Emma")
+    db.add_all([dune, emma])
+    db.add(Community(name="Readers", created_by=owner.id))
+    db.commit()
+    dune.title = "Dune Messiah"
+    db.commit()
+    db.delete(emma)
+    db.commit()
+    assert len(db.exec(select(SearchOutbox)).all()) == 5
+
+    assert search_outbox.drain_outbox(db) == 5
+    items = client.indexes["items"]
+    assert [[document["title"] for document in batch] for batch in items.added] == [["Dune Messiah"]]
+    assert items.deleted == [[str(emma.id)]]
+    assert [len(batch) for batch in client.indexes["communities"].added] == [1]
+    assert db.exec(select(SearchOutbox)).all() == []
+    assert search_outbox.drain_outbox(db) == 0
+
+
+def test_failed_pushes_are_retried_with_backoff(db: Session, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(search_outbox, "client", FakeClient(fail_after=0))
+    db.add(Item(title="Dune"))
+    db.commit()
+
+    assert search_outbox.drain_outbox(db) == 1
+    entry = db.exec(select(SearchOutbox)).one()
+    assert entry.attempts == 1
+    assert entry.available_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+    # Not due yet
+    assert search_outbox.drain_outbox(db) == 0
+
+    lag = search_outbox.search_index_lag(db)
+    assert (lag.pending, lag.failing) == (1, 1)
+    assert lag.lag_seconds >= 0
+
+
+def _assert_retried(db: Session, attempts: int = 1) -> None:
+    db.expire_all()
+    entry = db.exec(select(SearchOutbox)).one()
+    assert entry.attempts == attempts
+    assert entry.available_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)
+
+
+def test_tasks_failing_in_meilisearch_are_retried(db: Session, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(search_outbox, "client", FakeClient(task_status="failed"))
+    db.add(Item(title="Dune"))
+    db.commit()
+
+    assert search_outbox.drain_outbox(db) == 1
+    _assert_retried(db)
+
+
+def test_database_errors_while_building_documents_are_retried(
+    db: Session, monkeypatch: pytest.MonkeyPatch
+):
+    def broken_documents(db: Session, _rows: list) -> list[dict]:
+        # A failed flush leaves the transaction unusable until rolled back
+        db.add(SearchOutbox(index_name=None, document_id=uuid.uuid4()))
+        db.flush()
+        return []
+
+    monkeypatch.setattr(search_outbox, "client", FakeClient())
+    monkeypatch.setitem(search_outbox._INDEXES, "items", (Item, broken_documents))
+    db.add(Item(title="Dune"))
+    db.commit()
+
+    assert search_outbox.drain_outbox(db) == 1
+    _assert_retried(db)
+
+
+def test_item_documents_carry_visibility_ids(db: Session, monkeypatch: pytest.MonkeyPatch):
+    client = FakeClient()
+    monkeypatch.setattr(search_outbox, "client", client)
+    owner = _user(db)
+    club = Community(name="Club", created_by=owner.id)
+    dune = Item(title="Dune")
+    db.add_all([club, dune])
+    db.commit()
+    search_outbox.drain_outbox(db)
+
+    # Link rows alone queue the item again
+    db.add(UserItem(user_id=owner.id, item_id=dune.id))
+    db.add(CommunityItem(community_id=club.id, item_id=dune.id, added_by=owner.id))
+    db.commit()
+    assert set(db.exec(select(SearchOutbox.document_id)).all()) == {dune.id}
+
+    search_outbox.drain_outbox(db)
+    [document] = client.indexes["items"].added[-1]
+    assert document["owner_ids"] == [str(owner.id)]
+    assert document["community_ids"] == [str(club.id)]
+
+
+def test_visibility_filter():
+    user_id, community_id = uuid.uuid4(), uuid.uuid4()
+    assert visibility_filter([user_id], []) == f'owner_ids IN ["{user_id}"]'
+    assert visibility_filter([user_id], [community_id]) == (
+        f'owner_ids IN ["{user_id}"] OR community_ids IN ["{community_id}"]'
+    )
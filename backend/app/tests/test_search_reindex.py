@@ -0,0 +1,89 @@
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import delete
+from sqlmodel import Session
+
+from app import search_reindex
+from app.models import Item
+from app.tests.utils.search_client import FakeClient
+
+
+@pytest.fixture(name="meili")
+def meili_fixture(monkeypatch: pytest.MonkeyPatch) -> FakeClient:
+    meili = FakeClient()
+    monkeypatch.setattr(search_reindex, "client", meili)
+    return meili
+
+
+def _items(db: Session, count: int) -> list[Item]:
+    items = [Item(title=f"Book {n}") for n in range(count)]
+    db.add_all(items)
+    db.commit()
+    return items
+
+
+def test_full_reindex_builds_a_fresh_index_and_swaps_it_in(db: Session, meili: FakeClient):
+    items = _items(db, 5)
+    live = meili.index("items")
+    live.settings = {"filterableAttributes": ["owner_ids"]}
+    live.documents["stale"] = {"id": "stale"}
+
+    pushed = search_reindex.reindex(db, "items", chunk_size=2, workers=2)
+
+    assert pushed >= 5
+    assert meili.pushes >= 3
+    rebuilt = meili.indexes["items"]
+    assert set(rebuilt.documents) == {str(item.id) for item in items}
+    assert rebuilt.settings == {"filterableAttributes": ["owner_ids"]}
+    assert "items_reindex" not in meili.indexes
+
+
+def test_interrupted_reindex_resumes_from_checkpoint(
+    db: Session, meili: FakeClient, tmp_path: Path
+):
+    items = _items(db, 5)
+    checkpoint = tmp_path / "reindex.json"
+    meili.fail_after = 2
+
+    with pytest.raises(ConnectionError):
+        search_reindex.reindex(db, "items", chunk_size=2, checkpoint_path=checkpoint)
+    state = json.loads(checkpoint.read_text())["items"]
+    assert state["done"] == 4
+
+    meili.fail_after = None
+    search_reindex.reindex(db, "items", chunk_size=2, checkpoint_path=checkpoint)
+
+    # Only the remaining chunk and the catch-up were pushed on the second run
+    assert set(meili.indexes["items"].documents) == {str(item.id) for item in items}
+    assert json.loads(checkpoint.read_text()) == {}
+
+
+def test_since_pushes_recent_rows_into_the_live_index(db: Session, meili: FakeClient):
+    _items(db, 3)
+    assert search_reindex.reindex(db, "items", since=datetime(2000, 1, 1)) == 3
+    assert search_reindex.reindex(db, "items", since=datetime(2999, 1, 1)) == 0
+    assert len(meili.indexes["items"].documents) == 3
+    assert "items_reindex" not in meili.indexes
+
+
+def test_rows_deleted_during_a_full_run_leave_no_documents(
+    db: Session, meili: FakeClient, monkeypatch: pytest.MonkeyPatch
+):
+    items = _items(db, 5)
+    model, to_documents = search_reindex._INDEXES["items"]
+    built: list[list] = []
+
+    def documents_deleting_a_pushed_row(db: Session, rows: list) -> list[dict]:
+        built.append([row.id for row in rows])
+        if len(built) == 2:
+            # Its delete goes to the old index, which the swap throws away
+            db.execute(delete(Item).where(Item.id == built[0][0]))
+        return to_documents(db, rows)
+
+    monkeypatch.setitem(search_reindex._INDEXES, "items", (model, documents_deleting_a_pushed_row))
+    search_reindex.reindex(db, "items", chunk_size=2)
+
+    assert set(meili.indexes["items"].documents) == {str(item.id) for item in items} - {str(built[0][0])}
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import uuid
+from collections.abc import AsyncIterator
+from types import SimpleNamespace
+
+import psycopg
+import pytest
+
+from app.api import websocket_manager
+from app.api.websocket_manager import (
+    ConnectionManager,
+    PostgresBackbone,
+    create_backbone,
+)
+from app.core.config import settings
+
+
+class FakeBackbone:
+    """
+    In-memory stand-in for LISTEN/NOTIFY shared by several managers (workers).
+    """
+
+    def __init__(self) -> None:
+        self.subscribers: list[asyncio.Queue] = []
+
+    async def publish(self, payload: str) -> None:
+        for queue in self.subscribers:
+            queue.put_nowait(payload)
+
+    async def listen(self) -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        self.subscribers.append(queue)
+        while True:
+            yield await queue.get()
+
+    async def close(self) -> None:
+        pass
+
+
+class FakePostgres:
+    """
+    Stands in for the database server behind psycopg connections: NOTIFY on one
+    connection reaches every connection that ran LISTEN on the channel.
+    """
+
+    def __init__(self) -> None:
+        self.listeners: list[asyncio.Queue] = []
+        self.connects: list[dict] = []
+        self.stale = 0
+
+    async def connect(self, dsn: str, **options) -> "FakeConnection":
+        self.connects.append({"dsn": dsn, **options})
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, server: FakePostgres) -> None:
+        self.server = server
+        self.closed = False
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def __aenter__(self) -> "FakeConnection":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def execute(self, query: str, params: tuple = ()) -> None:
+        if self.server.stale:
+            self.server.stale -= 1
+            raise psycopg.OperationalError("server closed the connection unexpectedly")
+        if query.startswith("LISTEN"):
+            self.server.listeners.append(self.queue)
+        elif query.startswith("SELECT pg_notify"):
+            channel, payload = params
+            for queue in self.server.listeners:
+                queue.put_nowait(SimpleNamespace(channel=channel, payload=payload))
+
+    async def notifies(self) -> AsyncIterator[SimpleNamespace]:
+        while True:
+            yield await self.queue.get()
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeWebSocket:
+    def __init__(self, closed: bool = False, stalled: bool = False) -> None:
+        self.sent: list[dict] = []
+        self.closed = closed
+        self.stalled = stalled
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, text: str) -> None:
+        if self.closed:
+            raise RuntimeError("websocket is closed")
+        if self.stalled:
+            await asyncio.sleep(3600)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed = True
+
+
+async def settle() -> None:
+    # Let the listener and the per-socket send tasks run
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_messages_reach_sockets_held_by_other_workers():
+    async def scenario() -> None:
+        backbone = FakeBackbone()
+        worker_a, worker_b = ConnectionManager(), ConnectionManager()
+        await worker_a.start(backbone)
+        await worker_b.start(backbone)
+        await asyncio.sleep(0)
+
+        owner, other = uuid.uuid4(), uuid.uuid4()
+        owner_socket, other_socket, stale_socket = FakeWebSocket(), FakeWebSocket(), FakeWebSocket(closed=True)
+        await worker_b.connect(owner_socket, owner)
+        await worker_b.connect(stale_socket, owner)
+        await worker_a.connect(other_socket, other)
+
+        await worker_a.send_personal_message({"type": "loan_request"}, owner)
+        await worker_b.broadcast({"type": "maintenance"})
+        await settle()
+
+        assert owner_socket.sent == [{"type": "loan_request"}, {"type": "maintenance"}]
+        assert other_socket.sent == [{"type": "maintenance"}]
+        assert [sender.websocket for sender in worker_b.active_connections[owner]] == [owner_socket]
+
+        await worker_a.stop()
+        await worker_b.stop()
+
+    asyncio.run(scenario())
+
+
+def test_delivers_locally_without_a_backbone():
+    async def scenario() -> None:
+        manager = ConnectionManager()
+        user = uuid.uuid4()
+        socket = FakeWebSocket()
+        await manager.connect(socket, user)
+        await manager.send_personal_message({"type": "friend_request"}, user)
+        await settle()
+        assert socket.sent == [{"type": "friend_request"}]
+
+    asyncio.run(scenario())
+
+
+def test_multicast_publishes_one_envelope_per_chunk_of_recipients(monkeypatch):
+    async def scenario() -> None:
+        monkeypatch.setattr(websocket_manager, "MULTICAST_CHUNK_SIZE", 2)
+        backbone = FakeBackbone()
+        published = []
+        publish = backbone.publish
+
+        async def counting_publish(payload: str) -> None:
+            published.append(payload)
+            await publish(payload)
+
+        backbone.publish = counting_publish
+        manager = ConnectionManager()
+        await manager.start(backbone)
+        await asyncio.sleep(0)
+
+        users = [uuid.uuid4() for _ in range(3)]
+        sockets = [FakeWebSocket() for _ in users]
+        for socket, user in zip(sockets, users, strict=True):
+            await manager.connect(socket, user)
+        await manager.send_multicast({"type": "new_notification"}, users)
+        await settle()
+
+        assert len(published) == 2
+        assert all(socket.sent == [{"type": "new_notification"}] for socket in sockets)
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_slow_clients_are_queued_coalesced_and_dropped(monkeypatch):
+    async def scenario() -> None:
+        monkeypatch.setattr(websocket_manager, "SEND_QUEUE_SIZE", 2)
+        monkeypatch.setattr(websocket_manager, "SEND_TIMEOUT", 0.05)
+        manager = ConnectionManager()
+        user, slow_user = uuid.uuid4(), uuid.uuid4()
+        socket, slow_socket = FakeWebSocket(), FakeWebSocket(stalled=True)
+        await manager.connect(socket, user)
+        await manager.connect(slow_socket, slow_user)
+        await settle()
+
+        for message in [{"type": "first"}, {"type": "ping"}, {"type": "ping"}, {"type": "last"}]:
+            await manager.send_multicast(message, [user, slow_user])
+        # Nothing was sent yet: enqueueing never waits on a socket
+        assert socket.sent == []
+        sender = manager.active_connections[user][0]
+        assert sender.dropped == 1
+
+        await settle()
+        assert socket.sent == [{"type": "ping"}, {"type": "last"}]
+
+        await asyncio.sleep(0.1)
+        assert slow_socket.closed
+        assert slow_user not in manager.active_connections
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_create_backbone_follows_settings(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "WEBSOCKET_PUBSUB", "postgres")
+    backbone = create_backbone()
+    assert isinstance(backbone, PostgresBackbone)
+    assert backbone.dsn.startswith("postgresql://")
+    monkeypatch.setattr(settings, "WEBSOCKET_PUBSUB", "redis")
+    monkeypatch.setattr(settings, "REDIS_URL", None)
+    assert create_backbone() is None
+    monkeypatch.setattr(settings, "WEBSOCKET_PUBSUB", None)
+    assert create_backbone() is None
+
+
+def test_postgres_backbone_carries_pushes_and_replaces_stale_connections(monkeypatch: pytest.MonkeyPatch):
+    async def scenario() -> None:
+        server = FakePostgres()
+        monkeypatch.setattr(psycopg.AsyncConnection, "connect", server.connect)
+        monkeypatch.setattr(settings, "WEBSOCKET_PUBSUB", "postgres")
+        worker_a, worker_b = ConnectionManager(), ConnectionManager()
+        await worker_a.start()
+        await worker_b.start()
+        await settle()
+
+        user = uuid.uuid4()
+        socket = FakeWebSocket()
+        await worker_b.connect(socket, user)
+        await worker_a.send_personal_message({"type": "loan_request"}, user)
+        await settle()
+        assert socket.sent == [{"type": "loan_request"}]
+
+        # The publisher connection went stale: one retry on a fresh connection
+        server.stale = 1
+        await worker_a.send_personal_message({"type": "new_notification"}, user)
+        await settle()
+        assert socket.sent == [{"type": "loan_request"}, {"type": "new_notification"}]
+        assert len(server.connects) == 4
+        assert all(options["connect_timeout"] == websocket_manager.PUBSUB_CONNECT_TIMEOUT for options in server.connects)
+
+        await worker_a.stop()
+        await worker_b.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+
+@contextmanager
+def count_queries(session: Session) -> Iterator[list[str]]:
+    """
+    Record every SQL statement sent through the session's engine.
+    """
+    statements: list[str] = []
+    engine = session.get_bind()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+@contextmanager
+def assert_max_queries(session: Session, max_queries: int) -> Iterator[list[str]]:
+    """
+    Fail if the block issues more than `max_queries` statements, listing them.
+    """
+    with count_queries(session) as statements:
+        yield statements
+    assert len(statements) <= max_queries, (
+        f"{len(statements)} statements issued, expected at most {max_queries}:\n"
+        + "\n".join(statements)
+    )
@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+from meilisearch.errors import MeilisearchApiError
+
+
+class FakeIndex:
+    """
+    In-memory Meilisearch index. Documents are kept by id and every batch sent is
+    recorded in `added` and `deleted`. `settings` is None until the index exists.
+    """
+
+    def __init__(self, client: "FakeClient", uid: str, settings: dict | None = None) -> None:
+        self.client = client
+        self.uid = uid
+        self.settings = settings
+        self.documents: dict[str, dict] = {}
+        self.added: list[list[dict]] = []
+        self.deleted: list[list[str]] = []
+        self.updates: list[dict] = []
+
+    def add_documents(self, documents: list[dict]) -> SimpleNamespace:
+        self.client.push()
+        self.added.append(documents)
+        self.documents.update((document["id"], document) for document in documents)
+        return self.client.task()
+
+    def delete_documents(self, ids: list[str]) -> SimpleNamespace:
+        self.client.push()
+        self.deleted.append(ids)
+        for document_id in ids:
+            self.documents.pop(document_id, None)
+        return self.client.task()
+
+    def get_documents(self, parameters: dict) -> SimpleNamespace:
+        ids = sorted(self.documents)[parameters["offset"] : parameters["offset"] + parameters["limit"]]
+        return SimpleNamespace(results=[SimpleNamespace(id=document_id) for document_id in ids])
+
+    def get_settings(self) -> dict:
+        if self.settings is None:
+            raise self.client.missing(self.uid)
+        return dict(self.settings)
+
+    def update_settings(self, settings: dict) -> SimpleNamespace:
+        self.updates.append(settings)
+        self.settings = {**(self.settings or {}), **settings}
+        return self.client.task()
+
+
+class FakeClient:
+    """
+    In-memory Meilisearch client. Tasks complete at once with `task_status`, and
+    document pushes raise ConnectionError once `fail_after` of them went through.
+    """
+
+    def __init__(self, fail_after: int | None = None, task_status: str = "succeeded") -> None:
+        self.indexes: dict[str, FakeIndex] = {}
+        self.fail_after = fail_after
+        self.task_status = task_status
+        self.pushes = 0
+        self.tasks = 0
+
+    def push(self) -> None:
+        if self.fail_after is not None and self.pushes >= self.fail_after:
+            raise ConnectionError("meilisearch is down")
+        self.pushes += 1
+
+    def task(self) -> SimpleNamespace:
+        self.tasks += 1
+        return SimpleNamespace(task_uid=self.tasks)
+
+    def wait_for_task(self, task_uid: int, timeout_in_ms: int) -> SimpleNamespace:
+        error = None if self.task_status == "succeeded" else {"code": "invalid_document_id"}
+        return SimpleNamespace(status=self.task_status, error=error)
+
+    def missing(self, uid: str) -> MeilisearchApiError:
+        return MeilisearchApiError(f"index {uid} not found", SimpleNamespace(status_code=404, text=""))
+
+    def get_index(self, uid: str) -> FakeIndex:
+        if uid not in self.indexes:
+            raise self.missing(uid)
+        return self.indexes[uid]
+
+    def index(self, uid: str) -> FakeIndex:
+        return self.indexes.setdefault(uid, FakeIndex(self, uid))
+
+    def create_index(self, uid: str, options: dict) -> SimpleNamespace:
+        self.indexes[uid] = FakeIndex(self, uid, settings={})
+        return self.task()
+
+    def delete_index(self, uid: str) -> SimpleNamespace:
+        if uid not in self.indexes:
+            raise self.missing(uid)
+        del self.indexes[uid]
+        return self.task()
+
+    def swap_indexes(self, parameters: list[dict]) -> SimpleNamespace:
+        for swap in parameters:
+            a, b = swap["indexes"]
+            self.indexes[a], self.indexes[b] = self.indexes[b], self.indexes[a]
+        return self.task()
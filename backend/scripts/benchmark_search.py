@@ -0,0 +1,373 @@
+"""
+Benchmark GET /search/, GET /items/ and GET /communities/{id}/items on a
+synthetic social graph.
+
+Run it against a scratch database, e.g. POSTGRES_DB=bench:
+
+    python scripts/benchmark_search.py --generate --scale 100k --search postgres
+
+--generate fills an empty database: users with power-law (preferential
+attachment) friendships, communities with Pareto-sized memberships, items with
+shared ownership, community pools and loans. Without it the existing data is
+measured. Requests go through the app in-process, authenticated as random
+generated users, and report p50/p95/p99 latency and SQL statements per request.
+"""
+import argparse
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+from sqlmodel import Session, col, func, select
+
+from app import search_backends
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.core.db import engine
+from app.feed import rebuild_feed
+from app.main import app
+from app.models import (
+    Community,
+    CommunityItem,
+    CommunityMember,
+    CommunityMemberRole,
+    CommunityMemberStatus,
+    Friendship,
+    FriendshipStatus,
+    Item,
+    ItemType,
+    Loan,
+    LoanStatus,
+    User,
+    UserItem,
+    UserProfile,
+    normalize_title,
+)
+from app.search_cache import result_cache, suggestion_cache
+from app.search_reindex import reindex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Items per scale; the rest of the graph is sized from it
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+ITEMS_PER_USER = 10
+USERS_PER_COMMUNITY = 50
+# New users befriend this many existing ones, picked proportionally to their degree
+FRIENDS_PER_USER = 4
+POOLED_SHARE = 0.2
+LOANED_SHARE = 0.05
+INSERT_BATCH = 5_000
+# Unmeasured requests per endpoint first, so connection setup and imports stay out of the numbers
+WARMUP_REQUESTS = 10
+BENCH_EMAIL_DOMAIN = "bench.example.com"
+
+FIRST_NAMES = ["Ada", "Ben", "Chloe", "David", "Emma", "Farid", "Grace", "Hugo", "Ines", "Jonas",
+               "Kira", "Leo", "Maya", "Noah", "Olga", "Pablo", "Quinn", "Rosa", "Sami", "Tess"]
+LAST_NAMES = ["Adler", "Brandt", "Costa", "Dubois", "Evans", "Fischer", "Garcia", "Hansen",
+              "Ivanova", "Jensen", "Kowalski", "Larsen", "Moreau", "Novak", "Okafor", "Petrov"]
+TITLE_WORDS = ["dune", "river", "shadow", "garden", "empire", "winter", "silver", "glass",
+               "night", "ocean", "stone", "forest", "letters", "city", "storm", "harvest",
+               "mirror", "lantern", "voyage", "orchard", "kingdom", "echo", "atlas", "ember"]
+
+
+def _batches(rows: Iterator[dict]) -> Iterator[list[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == INSERT_BATCH:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(session: Session, model, rows: Iterator[dict]) -> None:
+    # Core inserts: no per-row ORM overhead, and the search outbox hook stays out of it
+    for batch in _batches(rows):
+        session.execute(insert(model), batch)
+
+
+def generate(session: Session, item_count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    user_count = max(item_count // ITEMS_PER_USER, FRIENDS_PER_USER + 1)
+    community_count = max(user_count // USERS_PER_COMMUNITY, 1)
+    user_ids = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(user_count)]
+
+    logger.info(f"Generating {user_count} users")
+    _insert(session, User, ({
+        "id": user_id,
+        "email": f"bench-{n}@{BENCH_EMAIL_DOMAIN}",
+        "hashed_password": "!",
+        "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "public_id": f"u{n:07x}",
+        "is_active": True,
+        "is_superuser": False,
+        "is_verified": True,
+        "has_set_password": False,
+        "settings": {},
+    } for n, user_id in enumerate(user_ids)))
+    _insert(session, UserProfile, ({
+        "user_id": user_id,
+        "alias": f"{rng.choice(TITLE_WORDS)}{n}" if rng.random() < 0.3 else None,
+    } for n, user_id in enumerate(user_ids)))
+
+    # Preferential attachment: every friendship end goes into `endpoints`, so
+    # sampling from it favours users who already have many friends
+    logger.info("Generating friendships")
+    endpoints = list(user_ids[:FRIENDS_PER_USER])
+    friendships: set[tuple[uuid.UUID, uuid.UUID]] = set()
+    for user_id in user_ids[FRIENDS_PER_USER:]:
+        targets = set()
+        while len(targets) < FRIENDS_PER_USER:
+            targets.add(rng.choice(endpoints))
+        for target in targets:
+            friendships.add((user_id, target))
+            endpoints += [user_id, target]
+    _insert(session, Friendship, (
+        {"user_id": a, "friend_id": b, "status": FriendshipStatus.ACCEPTED}
+        for pair in friendships
+        for a, b in (pair, pair[::-1])
+    ))
+
+    logger.info(f"Generating {community_count} communities")
+    community_ids = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(community_count)]
+    memberships: dict[uuid.UUID, list[uuid.UUID]] = {}
+    for community_id in community_ids:
+        size = min(user_count, int(rng.paretovariate(1.2) * 5))
+        memberships[community_id] = rng.sample(user_ids, size)
+    _insert(session, Community, ({
+        "id": community_id,
+        "name": f"{rng.choice(TITLE_WORDS).title()} club {n}",
+        "description": f"Readers of {rng.choice(TITLE_WORDS)} and {rng.choice(TITLE_WORDS)}",
+        "is_closed": False,
+        "created_by": memberships[community_id][0],
+    } for n, community_id in enumerate(community_ids)))
+    _insert(session, CommunityMember, ({
+        "community_id": community_id,
+        "user_id": user_id,
+        "role": CommunityMemberRole.ADMIN if position == 0 else CommunityMemberRole.MEMBER,
+        "status": CommunityMemberStatus.ACCEPTED,
+        "notifications_enabled": True,
+    } for community_id, members in memberships.items() for position, user_id in enumerate(members)))
+    communities_of: dict[uuid.UUID, list[uuid.UUID]] = {}
+    for community_id, members in memberships.items():
+        for user_id in members:
+            communities_of.setdefault(user_id, []).append(community_id)
+
+    logger.info(f"Generating {item_count} items")
+    item_ids = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(item_count)]
+    owners = {
+        # Mostly one owner, sometimes shared; well-connected users own more
+        item_id: {rng.choice(endpoints) for _ in range(rng.choices([1, 2, 3], [80, 15, 5])[0])}
+        for item_id in item_ids
+    }
+    now = datetime.now(timezone.utc)
+
+    def item_rows() -> Iterator[dict]:
+        for n, item_id in enumerate(item_ids):
+            title = f"{rng.choice(TITLE_WORDS).title()} {rng.choice(TITLE_WORDS)} {n}"
+            yield {
+                "id": item_id,
+                "title": title,
+                "normalized_title": normalize_title(title),
+                "description": " ".join(rng.choices(TITLE_WORDS, k=12)),
+                "author": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "item_type": ItemType.book,
+                "extra_data": {},
+                "count": 1,
+                "created_at": now - timedelta(minutes=n),
+            }
+
+    _insert(session, Item, item_rows())
+    _insert(session, UserItem, (
+        {"user_id": user_id, "item_id": item_id}
+        for item_id, item_owners in owners.items()
+        for user_id in item_owners
+    ))
+
+    def pooled_rows() -> Iterator[dict]:
+        for item_id, item_owners in owners.items():
+            owner = next(iter(item_owners))
+            if communities_of.get(owner) and rng.random() < POOLED_SHARE:
+                yield {
+                    "community_id": rng.choice(communities_of[owner]),
+                    "item_id": item_id,
+                    "added_by": owner,
+                    "is_donation_pending": False,
+                }
+
+    _insert(session, CommunityItem, pooled_rows())
+
+    def loan_rows() -> Iterator[dict]:
+        for item_id in rng.sample(item_ids, int(item_count * LOANED_SHARE)):
+            start = now - timedelta(days=rng.randrange(60))
+            yield {
+                "id": uuid.UUID(int=rng.getrandbits(128), version=4),
+                "item_id": item_id,
+                "owner_id": next(iter(owners[item_id])),
+                "requester_id": rng.choice(user_ids),
+                "status": rng.choice([LoanStatus.PENDING, LoanStatus.ACTIVE, LoanStatus.RETURNED]),
+                "start_date": start,
+                "end_date": start + timedelta(days=21),
+            }
+
+    _insert(session, Loan, loan_rows())
+
+    logger.info("Rebuilding the item feed")
+    rebuild_feed(session)
+    session.commit()
+
+
+class StatementCounter:
+    def __init__(self) -> None:
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args) -> None:
+        self.count += 1
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    if len(values) < 2:
+        values = values * 2 or [0.0, 0.0]
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def run_benchmark(session: Session, requests: int, seed: int, cold: bool) -> dict[str, dict]:
+    rng = random.Random(seed)
+    viewers = session.exec(
+        select(User).where(col(User.email).endswith(f"@{BENCH_EMAIL_DOMAIN}")).order_by(func.random()).limit(100)
+    ).all()
+    if not viewers:
+        raise SystemExit("No generated users found, run with --generate first")
+    memberships = session.exec(
+        select(CommunityMember.user_id, CommunityMember.community_id)
+        .where(col(CommunityMember.user_id).in_([viewer.id for viewer in viewers]))
+    ).all()
+    community_of = dict(memberships)
+    for viewer in viewers:
+        session.expunge(viewer)
+
+    counter = StatementCounter()
+    client = TestClient(app)
+
+    def search_url(_viewer: User) -> str:
+        return f"/api/v1/search/?q={rng.choice(TITLE_WORDS)}&limit=10"
+
+    def items_url(_viewer: User) -> str:
+        return "/api/v1/items/?limit=20"
+
+    def community_items_url(viewer: User) -> str | None:
+        community_id = community_of.get(viewer.id)
+        return f"/api/v1/communities/{community_id}/items?limit=20" if community_id else None
+
+    results = {}
+    for name, url_for in (
+        ("search", search_url),
+        ("items", items_url),
+        ("community_items", community_items_url),
+    ):
+        latencies, statements = [], []
+        warmup = WARMUP_REQUESTS
+        while len(latencies) < requests:
+            viewer = rng.choice(viewers)
+            url = url_for(viewer)
+            if url is None:
+                continue
+            if cold:
+                result_cache.clear()
+                suggestion_cache.clear()
+            app.dependency_overrides[get_current_user] = lambda viewer=viewer: viewer
+            before = counter.count
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                logger.error(f"{url} answered {response.status_code}: {response.text[:200]}")
+            if warmup:
+                warmup -= 1
+                continue
+            latencies.append(elapsed)
+            statements.append(counter.count - before)
+        results[name] = {
+            **{key: round(value, 2) for key, value in _percentiles(latencies).items()},
+            "statements": round(statistics.mean(statements), 1),
+            "requests": requests,
+        }
+        logger.info(
+            f"{name}: p50 {results[name]['p50']}ms, p95 {results[name]['p95']}ms, "
+            f"p99 {results[name]['p99']}ms, {results[name]['statements']} statements/request"
+        )
+    app.dependency_overrides.clear()
+    return results
+
+
+def _stub_search_index(session: Session):
+    # Stands in for Meilisearch: instant hits drawn from real ids
+    item_ids = [str(item_id) for item_id in session.exec(select(Item.id).limit(10_000)).all()]
+    community_ids = [str(community_id) for community_id in session.exec(select(Community.id).limit(10_000)).all()]
+
+    # timeout is passed by keyword, so it is taken as **_options
+    async def search_index(index_name: str, _query: str, params: dict, **_options: float) -> dict:
+        ids = item_ids if index_name == "items" else community_ids
+        return {"hits": [{"id": id_} for id_ in random.sample(ids, min(params["limit"], len(ids)))]}
+
+    return search_index
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    parser.add_argument("--generate", action="store_true", help="Fill an empty database first.")
+    parser.add_argument(
+        "--search",
+        choices=["meilisearch", "postgres", "stub"],
+        default="stub",
+        help="Search backend: a running Meilisearch, Postgres full-text, or an instant stub.",
+    )
+    parser.add_argument("--reindex", action="store_true", help="Rebuild the Meilisearch indexes first.")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per endpoint.")
+    parser.add_argument("--cold", action="store_true", help="Clear the search caches before each request.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON, to compare runs.")
+    args = parser.parse_args()
+
+    settings.SEARCH_OUTBOX_WORKER = False
+    with Session(engine) as session:
+        if args.generate:
+            if session.exec(select(func.count()).select_from(Item)).one():
+                logger.error("The database already has items; --generate needs an empty one")
+                return 1
+            generate(session, SCALES[args.scale], args.seed)
+        if args.reindex:
+            for index_name in ("items", "communities"):
+                reindex(session, index_name)
+
+        settings.SEARCH_BACKEND = "postgres" if args.search == "postgres" else "meilisearch"
+        settings.SEARCH_FALLBACK_BACKEND = None
+        if args.search == "stub":
+            search_backends.search_index = _stub_search_index(session)
+        results = run_benchmark(session, args.requests, args.seed, args.cold)
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "scale": args.scale,
+            "search": args.search,
+            "cold": args.cold,
+            "results": results,
+        }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
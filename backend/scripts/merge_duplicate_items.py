@@ -0,0 +1,52 @@
+import argparse
+import logging
+import sys
+
+from sqlalchemy import update
+from sqlmodel import Session, col, func
+
+from app.core.db import engine
+from app.dedup import find_duplicate_groups, merge_duplicate_items
+from app.models import Item
+from app.search_outbox import enqueue_search_sync
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Merge catalogue items sharing an item_type and a normalized title or ISBN."
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report duplicate groups; exit with status 1 if there are any.",
+    )
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        groups = find_duplicate_groups(session)
+        logger.info(
+            f"Found {len(groups)} duplicate groups ({sum(len(g) - 1 for g in groups)} items to merge)."
+        )
+        if args.dry_run:
+            return 1 if groups else 0
+        if not groups:
+            return 0
+
+        removed = merge_duplicate_items(session)
+        kept = [group[0] for group in groups]
+        # Kept items gained owners: move their version so cached copies revalidate
+        session.execute(
+            update(Item).where(col(Item.id).in_(kept)).values(updated_at=func.now())
+        )
+        # Merges use core statements, which the search outbox hook does not see
+        enqueue_search_sync(session, "items", [*kept, *removed])
+        session.commit()
+        logger.info(f"Merged {len(removed)} items.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
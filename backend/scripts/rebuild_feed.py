@@ -0,0 +1,49 @@
+import argparse
+import logging
+import sys
+import uuid
+
+from sqlmodel import Session
+
+from app.core.db import engine
+from app.feed import check_feed, rebuild_feed
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Check or rebuild the denormalized item feed (feeditem table)."
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only report drift; exit with status 1 if the feed is inconsistent.",
+    )
+    parser.add_argument(
+        "--user", type=uuid.UUID, default=None, help="Limit to a single viewer id."
+    )
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        drift = check_feed(session, args.user)
+        logger.info(f"Feed drift: {drift.missing} missing rows, {drift.stale} stale rows.")
+        if args.check:
+            return 0 if drift.consistent else 1
+
+        if drift.consistent:
+            logger.info("Feed is consistent, nothing to rebuild.")
+            return 0
+
+        logger.info("Rebuilding feed...")
+        rebuild_feed(session, args.user)
+        session.commit()
+
+        drift = check_feed(session, args.user)
+        logger.info(f"After rebuild: {drift.missing} missing rows, {drift.stale} stale rows.")
+        return 0 if drift.consistent else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
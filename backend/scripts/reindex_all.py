@@ -1,29 +1,56 @@
+import argparse
 import logging
-from sqlmodel import Session, select
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlmodel import Session
+
 from app.core.db import engine
-from app.models import Item, Community, ItemType
-from app.search import sync_item_to_search, sync_community_to_search
+from app.search_reindex import REINDEX_CHUNK_SIZE, reindex
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def reindex_all() -> None:
-    with Session(engine) as session:
-        # Reindex Items (including Books)
-        logger.info("Reindexing items...")
-        items = session.exec(select(Item)).all()
-        for item in items:
-            sync_item_to_search(item)
-        logger.info(f"Reindexed {len(items)} items.")
 
-        # Reindex Communities
-        logger.info("Reindexing communities...")
-        communities = session.exec(select(Community)).all()
-        for community in communities:
-            sync_community_to_search(community)
-        logger.info(f"Reindexed {len(communities)} communities.")
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Rebuild the Meilisearch indexes from the database without search downtime."
+    )
+    parser.add_argument(
+        "--index",
+        choices=["items", "communities"],
+        action="append",
+        help="Index to rebuild, may be repeated (default: all).",
+    )
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="Only push rows updated since this ISO timestamp, into the live index.",
+    )
+    parser.add_argument("--chunk-size", type=int, default=REINDEX_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=2, help="Chunks pushed in parallel.")
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=Path("reindex.checkpoint.json"),
+        help="Progress file; rerun with the same arguments to resume an interrupted run.",
+    )
+    args = parser.parse_args()
+
+    for index_name in args.index or ["items", "communities"]:
+        with Session(engine) as session:
+            pushed = reindex(
+                session,
+                index_name,
+                since=args.since,
+                chunk_size=args.chunk_size,
+                workers=args.workers,
+                checkpoint_path=args.checkpoint,
+            )
+        logger.info(f"Reindexed {pushed} {index_name} documents.")
+    return 0
 
-    logger.info("Reindexing complete.")
 
 if __name__ == "__main__":
-    reindex_all()
\ No newline at end of file
+    sys.exit(main())